@@ -1,33 +1,93 @@
-from typing import Annotated, Optional
+from typing import Annotated, Awaitable, Callable, Optional
 from fastapi import Depends, HTTPException, Security, status, Request
-from fastapi.security import APIKeyHeader, HTTPBearer
+from fastapi.security import APIKeyHeader, HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.security.api_key import APIKeyHeader
 from app.core.config import settings
+from app.services.rate_limit_service import client_ip, parse_limit, rate_limiter
+from app.services.token_service import token_verifier
 import os
 import logging
+import secrets
+import firebase_admin
 
 logger = logging.getLogger(__name__)
 
 # API key security scheme
 API_KEY_HEADER = APIKeyHeader(name="X-API-KEY", auto_error=False)
 
-async def verify_api_key(request: Request, api_key: str = Security(API_KEY_HEADER)):
-    # Log all incoming headers for debugging purposes
-    logger.info(f"Incoming request headers: {request.headers}")
+async def verify_api_key(request: Request, api_key: str = Security(API_KEY_HEADER)) -> str:
     if not api_key:
         logger.error("API key is missing from request.")
         raise HTTPException(status_code=403, detail="Missing API key")
     if api_key != settings.API_KEY:
-        logger.error(f"Invalid API key provided. Got: '{api_key[:5]}...'")
+        logger.error("Invalid API key provided.")
         raise HTTPException(status_code=403, detail="Invalid API key")
     return api_key
 
+ADMIN_KEY_HEADER = APIKeyHeader(name="X-ADMIN-KEY", auto_error=False)
+
+async def verify_admin_key(admin_key: str = Security(ADMIN_KEY_HEADER)) -> str:
+    if not settings.ADMIN_API_KEY:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not admin_key or not secrets.compare_digest(admin_key, settings.ADMIN_API_KEY):
+        logger.error("Invalid or missing admin key.")
+        raise HTTPException(status_code=403, detail="Invalid admin key")
+    return admin_key
+
 # Bearer token security scheme for user authentication
-oauth2_scheme = HTTPBearer()
-
-async def get_current_user(request: Request):
-    from app.services.firebase_service import firebase_service
-    # This is a placeholder for actual user authentication
-    # You would typically decode a JWT here or verify a session token
-    # For now, we'll just return a dummy user object
-    return {"user_id": "test_user_123", "email": "test@example.com"} 
\ No newline at end of file
+oauth2_scheme = HTTPBearer(auto_error=False)
+
+async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Security(oauth2_scheme)) -> dict:
+    """
+    Claims of the caller's Firebase ID token (``uid``, ``email``, ...). Verified tokens are
+    cached until they expire, so repeated calls cost a dictionary lookup.
+    A request without a bearer token (API key only, as the web app sends) and every
+    request without Firebase (local development) is anonymous: ``{}``. A token that is
+    sent must be valid.
+    """
+    if not firebase_admin._apps or credentials is None:
+        return {}
+    try:
+        return await token_verifier.verify(credentials.credentials)
+    except ValueError as e:
+        logger.warning(f"Rejected ID token: {e}")
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    except Exception as e:
+        logger.error(f"❌ Token verification unavailable: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Authentication unavailable")
+
+
+def rate_limit(limit: str, scope: str, per_user: bool = False, per_path_param: Optional[str] = None) -> Callable[..., Awaitable[None]]:
+    """
+    Dependency enforcing ``limit`` (e.g. "5/minute") across all API workers and containers.
+    Keyed on the authenticated user when ``per_user`` is set and a uid is known, otherwise
+    on the real client IP. ``per_path_param`` narrows the key to one value of that path
+    parameter, so clients behind one NAT address polling different tasks do not share a
+    budget. The X-RateLimit-* headers are added by RateLimitHeadersMiddleware.
+    """
+    parsed = parse_limit(limit)
+
+    async def check(request: Request, identity: str) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        result = await rate_limiter.hit(scope, identity, parsed)
+        request.state.rate_limit = result
+        if not result.allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Rate limit exceeded: {parsed}",
+                headers={**result.headers, "Retry-After": str(result.reset_seconds)},
+            )
+
+    async def per_user_dependency(request: Request, user: dict = Depends(get_current_user)) -> None:
+        uid = user.get("uid")
+        await check(request, f"user:{uid}" if uid else f"ip:{client_ip(request)}")
+
+    async def per_ip_dependency(request: Request) -> None:
+        identity = f"ip:{client_ip(request)}"
+        if per_path_param:
+            identity += f":{per_path_param}:{request.path_params.get(per_path_param)}"
+        await check(request, identity)
+
+    return per_user_dependency if per_user else per_ip_dependency
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from typing import Optional
+import logging
+
+from app.api.dependencies import verify_admin_key
+from app.core.logging_config import get_level_overrides, set_level_overrides
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["admin"], dependencies=[Depends(verify_admin_key)])
+
+
+class LogLevelsRequest(BaseModel):
+    # logger name -> level ("DEBUG", "WARNING", ...); null removes the override
+    levels: dict[str, Optional[str]]
+
+
+@router.get("/admin/log-levels")
+async def log_levels() -> dict[str, dict[str, str]]:
+    """
+    Returns the per-logger level overrides shared by all API and worker processes.
+    """
+    return {"overrides": await get_level_overrides()}
+
+
+@router.put("/admin/log-levels")
+async def update_log_levels(request: LogLevelsRequest) -> dict[str, dict[str, str]]:
+    """
+    Sets per-logger levels at runtime. Applied here immediately and by every other
+    process within LOG_LEVEL_REFRESH_SECONDS.
+    """
+    try:
+        overrides = await set_level_overrides(request.levels)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.warning(f"⚠️ Log level overrides changed: {request.levels}")
+    return {"overrides": overrides}
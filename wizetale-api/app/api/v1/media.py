@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends
+import logging
+
+from app.api.dependencies import verify_admin_key
+from app.services.eviction_service import get_eviction_stats
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["media"])
+
+
+@router.get("/media/stats", dependencies=[Depends(verify_admin_key)])
+async def media_stats() -> dict:
+    """
+    Returns the latest disk usage and eviction statistics published by the eviction daemon.
+    """
+    return await get_eviction_stats()
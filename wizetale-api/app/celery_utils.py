@@ -1,6 +1,10 @@
 from celery import Celery
 from app.core.config import settings
 
+# Task names shared by the API (which enqueues by name) and the worker (which registers the task)
+VIDEO_TASK_NAME = "generate_story_video_task"
+REVOICE_TASK_NAME = "revoice_story_video_task"
+
 def create_celery_app() -> Celery:
     """
     Create and configure a Celery application instance.
@@ -15,7 +19,7 @@ def create_celery_app() -> Celery:
         "worker",
         broker=settings.CELERY_BROKER_URL,
         backend=settings.CELERY_RESULT_BACKEND,
-        include=['app.api.v1.generate']
+        include=['app.tasks.video']
     )
     celery_app.conf.update(
         task_track_started=True,
@@ -15,8 +15,20 @@ class Settings(BaseSettings):
     API_PORT: int = 8000
     API_HOST: str = "0.0.0.0"
     LOG_LEVEL: str = "INFO"
+    # Per-logger levels ("httpx=WARNING,app.services.runware_service=DEBUG"); overrides set
+    # through /api/v1/admin/log-levels are stored in Redis and refreshed by every process
+    LOG_LEVELS: str = ""
+    LOG_LEVEL_REFRESH_SECONDS: int = 15
+    # Fraction of INFO/DEBUG records kept per logger; by default the per-request access
+    # logs (status polls) and the per-call httpx lines are sampled
+    LOG_SAMPLE_RATES: str = "uvicorn.access=0.1,gunicorn.access=0.1,httpx=0.2"
+    LOG_FORMAT: str = "text"  # "text" or "json"
+    LOG_QUEUE_SIZE: int = 10000
     DEBUG: bool = False
     API_KEY: str = "your_default_api_key" # The internal API key for securing the API
+    # Secret for /api/v1/admin (X-ADMIN-KEY). API_KEY ships with the web app and nginx adds
+    # it to every /api/ request, so it cannot guard admin routes. Unset: admin routes are off
+    ADMIN_API_KEY: Optional[str] = None
 
     # Stability AI API for image generation
     STABILITY_API_KEY: Optional[str] = None
@@ -40,6 +52,69 @@ class Settings(BaseSettings):
     GOOGLE_APPLICATION_CREDENTIALS_PATH: Optional[str] = None
     FIREBASE_STORAGE_BUCKET: Optional[str] = None
 
+    # Upload finished videos to Firebase Storage and return the storage URL
+    STORAGE_UPLOAD_ENABLED: bool = False
+    STORAGE_UPLOAD_PART_SIZE: int = 8 * 1024 * 1024
+    STORAGE_UPLOAD_WORKERS: int = 4
+
+    # When set (e.g. "/_protected_media/"), serve_video delegates the file transfer to
+    # nginx through X-Accel-Redirect instead of streaming it from the API worker
+    MEDIA_ACCEL_REDIRECT_PREFIX: Optional[str] = None
+
+    # MP4 layout of rendered videos: "faststart" or "fragmented"
+    VIDEO_CONTAINER_MODE: str = "faststart"
+
+    # Ken Burns engine: "zoompan" (ffmpeg filter) or "numpy" (subpixel frames piped to ffmpeg)
+    VIDEO_MOTION_ENGINE: str = "zoompan"
+
+    # /generate: most (language, voice) variants one job may produce
+    GENERATE_MAX_VARIANTS: int = 5
+
+    # Re-voicing: how far the new narration may stretch the existing video track (as a
+    # fraction of its duration) while the stream is still copied; beyond it, one re-encode
+    REVOICE_MAX_STRETCH: float = 0.25
+
+    # Default subtitle delivery: "burn", "soft" (WebVTT sidecar + mov_text track), "webvtt",
+    # "mov_text" or "none" (see SUBTITLE_MODES); a request can pick its own
+    SUBTITLE_MODE: str = "burn"
+
+    # Also package rendered videos as an HLS 360p/480p/720p ladder
+    HLS_PACKAGING_ENABLED: bool = False
+
+    # Write-behind Firestore persistence of story, task and usage records
+    FIRESTORE_FLUSH_INTERVAL: float = 2.0
+    FIRESTORE_BATCH_SIZE: int = 200  # Firestore allows at most 500 writes per batch
+    FIRESTORE_MAX_RETRIES: int = 5
+    FIRESTORE_MAX_PENDING: int = 10000
+
+    # Media eviction daemon: byte quotas enforced with LRU eviction
+    MEDIA_QUOTA_BYTES: int = 50 * 1024**3
+    MEDIA_USER_QUOTA_BYTES: int = 2 * 1024**3
+    MEDIA_EVICTION_LOW_WATERMARK: float = 0.9  # evict down to this fraction of a quota
+    MEDIA_MAX_IDLE_DAYS: int = 7
+    MEDIA_EVICTION_INTERVAL: int = 60
+    # nginx log of versioned media it serves itself ("$msec $uri" lines); read by the
+    # daemon for access times, truncated once it grows past the limit. Empty: not read
+    MEDIA_ACCESS_LOG: str = ""
+    MEDIA_ACCESS_LOG_MAX_BYTES: int = 64 * 1024**2
+
+    # /enhance-prompt: concurrent completions per API worker, and how long a request may
+    # wait for a free slot before getting 503
+    ENHANCE_PROMPT_CONCURRENCY: int = 4
+    ENHANCE_PROMPT_WAIT_SECONDS: float = 2.0
+    # Redis result cache keyed on the normalized description and language
+    ENHANCE_PROMPT_CACHE_TTL: int = 7 * 24 * 3600
+    ENHANCE_PROMPT_CACHE_MAX_ENTRIES: int = 20000
+    ENHANCE_PROMPT_CACHE_VARIANTS: int = 1  # completions kept per key, served round-robin
+
+    # Decoded Firebase ID tokens kept in memory (per API worker) until they expire
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+
+    # Cluster-wide rate limits (Redis sliding window). Forwarded client addresses are
+    # only trusted from these networks (nginx on the Docker network)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_TRUSTED_PROXIES: str = "127.0.0.1/32,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16"
+
     # Default values
     DEFAULT_PERSONA: str = "narrator"
     DEFAULT_LANGUAGE: str = "en"
@@ -50,6 +125,10 @@ class Settings(BaseSettings):
     CELERY_BROKER_URL: str = "redis://redis:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://redis:6379/1"
 
+    # Task status polling cache (seconds). In-flight states change often, finished ones never do.
+    TASK_STATUS_CACHE_TTL: int = 2
+    TASK_FINISHED_CACHE_TTL: int = 300
+
     class Config:
         case_sensitive = True
         env_file = ".env"
@@ -0,0 +1,321 @@
+"""
+Logging Setup
+Usage:
+    # Once per process, before anything logs (app/main.py, worker.py)
+    from app.core.logging_config import setup_logging
+    setup_logging()
+
+    # High-volume message: keep ~1% of them
+    logger.info(f"Polled task {task_id}", extra={"sample_rate": 0.01})
+
+    # Change levels at runtime in every API and worker process
+    await set_level_overrides({"app.services.runware_service": "DEBUG", "httpx": None})
+
+Log calls only render the message and put the record on a bounded in-memory queue.
+A background thread redacts secrets, formats and writes the records in batches, so a
+slow stderr (docker log driver) never blocks a request. When the queue is full, records
+are dropped and counted instead of blocking.
+
+Settings: LOG_LEVEL (root), LOG_LEVELS ("httpx=WARNING,app.services.runware_service=DEBUG"),
+LOG_SAMPLE_RATES ("uvicorn.access=0.1": fraction of INFO/DEBUG records kept per logger),
+LOG_FORMAT ("text" or "json"). Overrides stored in Redis are picked up every
+LOG_LEVEL_REFRESH_SECONDS by a thread of their own, over one kept-open connection, so a
+slow Redis never holds up the writer.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Optional, TextIO
+
+from app.core.config import settings
+
+if TYPE_CHECKING:
+    import redis as redis_sync
+
+LOG_LEVELS_KEY = "log-levels"
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+BATCH_SIZE = 256
+
+# Loggers the servers configure with their own handlers; routed to the root queue instead
+SERVER_LOGGERS = ["uvicorn", "uvicorn.error", "uvicorn.access", "gunicorn.error", "gunicorn.access"]
+
+_STANDARD_ATTRS = set(logging.LogRecord("", 0, "", 0, "", None, None).__dict__) | {"message", "asctime", "sample_rate"}
+
+_BEARER = re.compile(r"(Bearer\s+)[A-Za-z0-9\-._~+/]+=*", re.IGNORECASE)
+_KEY_FIELD = re.compile(r"((?:x-api-key|api[_-]?key)['\"]?\s*[:=]\s*['\"]?)[^\s'\",}&]+", re.IGNORECASE)
+
+
+def _parse_pairs(value: str) -> dict[str, str]:
+    pairs = {}
+    for item in value.split(","):
+        name, _, setting = item.partition("=")
+        if name.strip() and setting.strip():
+            pairs[name.strip()] = setting.strip()
+    return pairs
+
+
+class Redactor:
+    """Masks bearer tokens, ``api_key=``-style fields and the configured secret values."""
+
+    def __init__(self, secrets: list[Optional[str]]):
+        # Short values (e.g. test defaults) would mask ordinary words
+        values = sorted({s for s in secrets if s and len(s) >= 8}, key=len, reverse=True)
+        self._secrets = re.compile("|".join(map(re.escape, values))) if values else None
+
+    def __call__(self, text: str) -> str:
+        if self._secrets:
+            text = self._secrets.sub("[REDACTED]", text)
+        text = _BEARER.sub(r"\1[REDACTED]", text)
+        return _KEY_FIELD.sub(r"\1[REDACTED]", text)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of INFO/DEBUG records per logger; warnings and errors always pass."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._by_logger: dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._by_logger.get(name)
+        if rate is None:
+            rate = 1.0
+            for prefix, value in self.rates.items():
+                if name == prefix or name.startswith(prefix + "."):
+                    rate = value
+            self._by_logger[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = getattr(record, "sample_rate", None)
+        if rate is None:
+            rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "pid": record.process,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking on a full queue."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogWriter(threading.Thread):
+    """Drains the queue in batches: one write and one flush per batch."""
+
+    def __init__(self, handler: DroppingQueueHandler, stream: TextIO, formatter: logging.Formatter, redactor: Redactor):
+        super().__init__(name="wizetale-log-writer", daemon=True)
+        self.handler = handler
+        self.queue = handler.queue
+        self.stream = stream
+        self.formatter = formatter
+        self.redactor = redactor
+
+    def run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [self.queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                stopping = True
+                batch = [record for record in batch if record is not None]
+            self._write(batch)
+
+    def _write(self, batch: list[logging.LogRecord]) -> None:
+        lines: list[str] = []
+        if self.handler.dropped:
+            dropped, self.handler.dropped = self.handler.dropped, 0
+            lines.append(f"{datetime.now():%Y-%m-%d %H:%M:%S} - {__name__} - WARNING - "
+                         f"⚠️ Log queue full, dropped {dropped} records")
+        for record in batch:
+            try:
+                record.msg = self.redactor(record.msg)
+                lines.append(self.formatter.format(record))
+            except Exception:
+                lines.append(f"Unformattable log record from {record.name}")
+        if not lines:
+            return
+        try:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+        except Exception:
+            pass
+
+    def stop(self, timeout: float = 2.0) -> None:
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self.join(timeout)
+
+
+class LevelRefresher(threading.Thread):
+    """Applies the Redis level overrides every LOG_LEVEL_REFRESH_SECONDS."""
+
+    def __init__(self, applied: dict[str, str]):
+        super().__init__(name="wizetale-log-levels", daemon=True)
+        self.applied = applied
+        self._client: Optional["redis_sync.Redis"] = None
+
+    def _read_overrides(self) -> dict[str, str]:
+        if self._client is None:
+            import redis as redis_sync
+
+            self._client = redis_sync.Redis.from_url(settings.REDIS_URL, decode_responses=True,
+                                                     socket_timeout=1, socket_connect_timeout=1)
+        return self._client.hgetall(LOG_LEVELS_KEY)
+
+    def run(self) -> None:
+        while True:
+            try:
+                overrides = self._read_overrides()
+                self.applied = apply_levels({**_parse_pairs(settings.LOG_LEVELS), **overrides}, self.applied)
+            except Exception:
+                # Redis down: keep the current levels, try again at the next refresh
+                pass
+            time.sleep(settings.LOG_LEVEL_REFRESH_SECONDS)
+
+
+def apply_levels(levels: dict[str, str], previous: Optional[dict[str, str]] = None) -> dict[str, str]:
+    """Set per-logger levels; loggers that were in ``previous`` but not in ``levels`` go back to NOTSET."""
+    applied: dict[str, str] = {}
+    for name, level in levels.items():
+        try:
+            logging.getLogger(name).setLevel(level.upper())
+            applied[name] = level.upper()
+        except ValueError:
+            logging.getLogger(__name__).warning(f"⚠️ Ignoring invalid log level {name}={level}")
+    for name in set(previous or {}) - set(applied):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    return applied
+
+
+async def get_level_overrides() -> dict[str, str]:
+    from app.services.redis_service import get_shared_redis
+    return await get_shared_redis().hgetall(LOG_LEVELS_KEY)
+
+
+async def set_level_overrides(levels: dict[str, Optional[str]]) -> dict[str, str]:
+    """
+    Store per-logger overrides for every process (``None`` removes one) and apply them
+    here immediately; the other processes pick them up at their next refresh.
+    """
+    from app.services.redis_service import get_shared_redis
+
+    for name, level in levels.items():
+        if level is not None and not isinstance(logging.getLevelName(level.upper()), int):
+            raise ValueError(f"Invalid log level for {name}: {level}")
+    redis = get_shared_redis()
+    removed = [name for name, level in levels.items() if level is None]
+    stored = {name: level.upper() for name, level in levels.items() if level is not None}
+    if removed:
+        await redis.hdel(LOG_LEVELS_KEY, *removed)
+    if stored:
+        await redis.hset(LOG_LEVELS_KEY, mapping=stored)
+    overrides = await redis.hgetall(LOG_LEVELS_KEY)
+    if _refresher is not None:
+        _refresher.applied = apply_levels({**_parse_pairs(settings.LOG_LEVELS), **overrides}, _refresher.applied)
+    return overrides
+
+
+_handler: Optional[DroppingQueueHandler] = None
+_writer: Optional[LogWriter] = None
+_refresher: Optional[LevelRefresher] = None
+# Captured once: Celery later replaces sys.stdout/sys.stderr with proxies that log
+_stream: Optional[TextIO] = None
+
+
+def _start_writer() -> None:
+    global _writer, _refresher
+    formatter = JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+    redactor = Redactor([settings.API_KEY, settings.ADMIN_API_KEY, settings.RUNWARE_API_KEY,
+                         settings.AZURE_OPENAI_API_KEY, settings.AZURE_SPEECH_KEY, settings.STABILITY_API_KEY])
+    _writer = LogWriter(_handler, _stream, formatter, redactor)
+    _writer.start()
+    # A new one after fork as well: the parent's connection must not be shared
+    applied = _refresher.applied if _refresher is not None else apply_levels(_parse_pairs(settings.LOG_LEVELS))
+    _refresher = LevelRefresher(applied)
+    _refresher.start()
+
+
+def _after_fork_in_child() -> None:
+    # The parent's writer thread does not exist in the child and its queue lock may be
+    # held mid-put: give the child its own queue and writer
+    if _handler is not None:
+        _handler.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        _handler.dropped = 0
+        _start_writer()
+
+
+def _stop_writer() -> None:
+    if _writer is not None and _writer.is_alive():
+        _writer.stop()
+
+
+def route_server_loggers() -> None:
+    """Send uvicorn/gunicorn records through the root queue (they install their own stream handlers)."""
+    for name in SERVER_LOGGERS:
+        server_logger = logging.getLogger(name)
+        server_logger.handlers.clear()
+        server_logger.propagate = True
+
+
+def setup_logging() -> None:
+    """Install the queue handler on the root logger and start the writer thread (idempotent)."""
+    global _handler, _stream
+    if _handler is None:
+        _stream = sys.stderr
+        _handler = DroppingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+        _handler.addFilter(SamplingFilter({name: float(rate) for name, rate in _parse_pairs(settings.LOG_SAMPLE_RATES).items()}))
+        root = logging.getLogger()
+        for existing in root.handlers[:]:
+            root.removeHandler(existing)
+        root.addHandler(_handler)
+        root.setLevel(settings.LOG_LEVEL.upper())
+        _start_writer()
+        os.register_at_fork(after_in_child=_after_fork_in_child)
+        atexit.register(_stop_writer)
+    route_server_loggers()
+
+
+def flush_logging() -> None:
+    """Write out everything queued so far (e.g. before a worker process exits)."""
+    _stop_writer()
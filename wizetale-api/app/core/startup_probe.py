@@ -0,0 +1,86 @@
+"""
+Startup Timing Probe
+Usage:
+    # First import of app/main.py
+    from app.core import startup_probe
+    ...
+    startup_probe.mark("imports")
+    startup_probe.report()   # logs the timeline, RSS and any worker-only SDK that got loaded
+
+    # Per-module import cost of the API process (runs ``python -X importtime`` in a child)
+    python -m app.core.startup_probe --top 25
+"""
+import argparse
+import logging
+import resource
+import subprocess
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# Only the Celery worker needs these; the API should never load them
+WORKER_ONLY_MODULES = [
+    "azure.cognitiveservices.speech",
+    "openai",
+    "app.services.video_pipeline",
+    "app.tasks.video",
+]
+
+_started = time.perf_counter()
+_marks: list[tuple[str, float]] = []
+
+
+def mark(label: str) -> None:
+    _marks.append((label, time.perf_counter() - _started))
+
+
+def report() -> None:
+    timeline = ", ".join(f"{label} {seconds:.2f}s" for label, seconds in _marks)
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    logger.info(f"⏱️ Startup: {timeline} (peak RSS {rss_mb:.0f} MB)")
+    loaded = [name for name in WORKER_ONLY_MODULES if name in sys.modules]
+    if loaded:
+        logger.warning(f"⚠️ Worker-only modules loaded in the API process: {', '.join(loaded)}")
+
+
+def import_profile(module: str = "app.main") -> tuple[list[tuple[int, int, str]], float]:
+    """``(self µs, cumulative µs, name)`` for every module imported by ``module``, and the child's peak RSS (MB)."""
+    code = f"import resource, {module}; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{process.stderr[-2000:]}")
+
+    entries: list[tuple[int, int, str]] = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return entries, int(process.stdout.strip().splitlines()[-1]) / 1024
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import-time profile of the API process")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    entries, rss_mb = import_profile(args.module)
+    total = max((cumulative for _, cumulative, name in entries if name.strip() == args.module), default=0)
+    # Self time summed per top-level package: which dependencies the import actually pays for
+    by_package: dict[str, int] = {}
+    for self_us, _, name in entries:
+        package = name.strip().split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+
+    print(f"⏱️ import {args.module}: {total / 1e6:.2f}s, peak RSS {rss_mb:.0f} MB")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1e3:>10.1f} ms  {package}")
+    loaded = [name for name in WORKER_ONLY_MODULES if any(entry[2].strip() == name for entry in entries)]
+    if loaded:
+        print(f"⚠️ Worker-only modules imported: {', '.join(loaded)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,26 @@
+from app.core import startup_probe
+
 import logging
+import mimetypes
 import os
-import re
 import asyncio
 import firebase_admin
-import redis.asyncio as redis
 from firebase_admin import credentials
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Header
+from fastapi import Depends, FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
+from fastapi.responses import JSONResponse, Response
 from pathlib import Path
 from celery.result import AsyncResult
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
-from fastapi_cache.decorator import cache
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Setup logging (queue-backed, see app/core/logging_config.py)
+from app.core.logging_config import setup_logging
+setup_logging()
 
 # Initialize Firebase Admin SDK
 try:
@@ -41,11 +38,16 @@ except Exception as e:
 
 # Import other components after Firebase is initialized
 from app.core.config import settings
-from app.api.v1 import generate
+from app.api.v1 import admin, generate, media
 from app.celery_utils import celery_app
+from app.services.redis_service import get_shared_redis
+from app.services.media_service import CachedStaticFiles, cache_headers_for
+from app.services.eviction_service import record_access
+from app.services.metrics_service import RequestMetricsMiddleware, render_metrics
+from app.services.rate_limit_service import RateLimitHeadersMiddleware
+from app.api.dependencies import rate_limit
 
-# Initialize Limiter with stricter limits
-limiter = Limiter(key_func=get_remote_address)
+startup_probe.mark("imports")
 
 app = FastAPI(
     title="Wizetale API",
@@ -53,9 +55,6 @@ app = FastAPI(
     version="1.0.0"
 )
 
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
 # CORS settings
 environment = os.getenv("ENVIRONMENT", "development")
 origins = [
@@ -74,88 +73,93 @@ app.add_middleware(
     allow_headers=["*", "X-API-Key"],
 )
 
+app.add_middleware(RateLimitHeadersMiddleware)
+app.add_middleware(RequestMetricsMiddleware)
+
 # Static files setup
 static_dir = Path("static")
 static_dir.mkdir(exist_ok=True)
-app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
 # Mount directories for generated files
 generated_videos_dir = Path("generated_videos")
 generated_videos_dir.mkdir(exist_ok=True)
-app.mount("/generated_videos", StaticFiles(directory=str(generated_videos_dir)), name="generated_videos")
+app.mount("/generated_videos", CachedStaticFiles(directory=str(generated_videos_dir)), name="generated_videos")
 
 generated_audio_dir = Path("generated_audio")
 generated_audio_dir.mkdir(exist_ok=True)
-app.mount("/generated_audio", StaticFiles(directory=str(generated_audio_dir)), name="generated_audio")
+app.mount("/generated_audio", CachedStaticFiles(directory=str(generated_audio_dir)), name="generated_audio")
 
 generated_images_dir = Path("generated_images")
 generated_images_dir.mkdir(exist_ok=True)
-app.mount("/generated_images", StaticFiles(directory=str(generated_images_dir)), name="generated_images")
+app.mount("/generated_images", CachedStaticFiles(directory=str(generated_images_dir)), name="generated_images")
 
 @app.on_event("startup")
-async def startup():
+async def startup() -> None:
     """Initialize Redis cache on startup"""
     try:
-        redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-        redis_client = redis.from_url(redis_url, decode_responses=True)
-        FastAPICache.init(RedisBackend(redis_client), prefix="wizetale-cache")
+        FastAPICache.init(RedisBackend(get_shared_redis()), prefix="wizetale-cache")
         logging.info("✅ Redis cache initialized successfully.")
     except Exception as e:
         logging.warning(f"⚠️ Redis cache initialization failed: {e}. Running without cache.")
-
-@app.get("/static/{user_id}/{video_name}")
-async def serve_video(user_id: str, video_name: str, range: str = Header(None)):
-    video_path = static_dir / user_id / video_name
-    if not video_path.is_file():
+    startup_probe.report()
+
+@app.api_route("/static/{user_id}/{video_name}", methods=["GET", "HEAD"])
+async def serve_video(user_id: str, video_name: str, request: Request) -> Response:
+    """
+    Serves a user's generated media. Behind nginx the bytes are handed off with
+    X-Accel-Redirect so nginx streams them with sendfile and answers every Range
+    form itself, with its own validators; otherwise FileResponse handles single,
+    suffix and multi-range requests directly, with a strong ETag for
+    content-versioned files. In production nginx serves versioned files itself and
+    the eviction daemon takes their access times from its log (MEDIA_ACCESS_LOG).
+    """
+    video_path = (static_dir / user_id / video_name).resolve()
+    if static_dir.resolve() not in video_path.parents or not video_path.is_file():
         return JSONResponse(content={"error": "Video not found"}, status_code=404)
-    
-    file_size = video_path.stat().st_size
-    range_header = range
-    
-    if range_header:
-        range_match = re.match(r'bytes=(\d+)-(\d*)', range_header)
-        if range_match:
-            start = int(range_match.group(1))
-            end = int(range_match.group(2)) if range_match.group(2) else file_size - 1
-            end = min(end, file_size - 1)
-            content_length = end - start + 1
-            
-            def generate_video_chunk():
-                with open(video_path, 'rb') as video_file:
-                    video_file.seek(start)
-                    remaining = content_length
-                    while remaining > 0:
-                        chunk_size = min(8192, remaining)
-                        chunk = video_file.read(chunk_size)
-                        if not chunk: break
-                        remaining -= len(chunk)
-                        yield chunk
-            
-            headers = {
-                'Content-Range': f'bytes {start}-{end}/{file_size}',
-                'Accept-Ranges': 'bytes',
-                'Content-Length': str(content_length),
-                'Content-Type': 'video/mp4',
-            }
-            return StreamingResponse(generate_video_chunk(), status_code=206, headers=headers)
-            
-    return FileResponse(video_path, media_type="video/mp4", headers={"Accept-Ranges": "bytes"})
+
+    await record_access(video_path)
+
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        headers = cache_headers_for(video_path)
+        headers["X-Accel-Redirect"] = f"{settings.MEDIA_ACCEL_REDIRECT_PREFIX}{user_id}/{video_name}"
+        media_type, _ = mimetypes.guess_type(video_path.name)
+        return Response(headers=headers, media_type=media_type)
+
+    return static_files.file_response(video_path, video_path.stat(), request.scope)
+
+# Registered after serve_video so the route above takes precedence over the mount
+static_files = CachedStaticFiles(directory=str(static_dir))
+app.mount("/static", static_files, name="static")
 
 # Include API routers
 app.include_router(generate.router, prefix="/api/v1")
+app.include_router(media.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
+startup_probe.mark("routes")
 
-@app.get("/ping", status_code=200)
-@limiter.limit("100/minute")
-async def ping(request: Request):
+@app.get("/ping", status_code=200, dependencies=[Depends(rate_limit("100/minute", scope="ping"))])
+async def ping(request: Request) -> dict:
     return {"status": "pong"}
 
-@app.get("/health", status_code=200)
-@limiter.limit("60/minute")
-async def health_check(request: Request):
+@app.get("/health", status_code=200, dependencies=[Depends(rate_limit("60/minute", scope="health"))])
+async def health_check(request: Request) -> dict:
     return {"status": "ok"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus scrape endpoint, aggregated across all gunicorn workers."""
+    scrape_values: dict[str, tuple[str, float]] = {}
+    try:
+        # Celery's default queue is a Redis list on the broker
+        queue_depth = await get_shared_redis().llen("celery")
+        scrape_values["wizetale_celery_queue_depth"] = ("Tasks waiting in the Celery queue", queue_depth)
+    except Exception as e:
+        logging.warning(f"Could not read Celery queue depth: {e}")
+    output, content_type = render_metrics(scrape_values)
+    return Response(content=output, media_type=content_type)
+
 @app.websocket("/ws/status/{task_id}")
-async def websocket_endpoint(websocket: WebSocket, task_id: str):
+async def websocket_endpoint(websocket: WebSocket, task_id: str) -> None:
     await websocket.accept()
     task_result = AsyncResult(task_id, app=celery_app)
     
@@ -0,0 +1,364 @@
+"""
+Media Eviction Service
+Usage:
+    # Celery task: protect a user's directory while a job writes into it
+    pin_artifacts(f"static/{user_id}", task_id)
+    ...
+    unpin_artifacts(f"static/{user_id}", task_id)
+
+    # API: remember that an artifact was served
+    await record_access(path)
+    # nginx serves versioned media itself; the daemon reads its access log (MEDIA_ACCESS_LOG)
+
+    # Daemon (see eviction_daemon.py)
+    EvictionDaemon().run_forever()
+
+An *artifact* is one top-level entry of a user's directory (``static/<uid>/video-<digest>.mp4``,
+``static/<uid>/hls-<digest>/``) or of a ``generated_*`` directory. The daemon keeps an
+in-memory index of them, rescanning only directories whose mtime changed or that an
+in-flight task is writing to, and evicts least recently accessed artifacts until the
+per-user and global byte quotas are met.
+"""
+import logging
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Union
+
+import redis as redis_sync
+
+from app.core.config import settings
+from app.services.redis_service import get_shared_redis
+
+logger = logging.getLogger(__name__)
+
+USER_ROOT = "static"
+MEDIA_ROOTS = [USER_ROOT, "generated_videos", "generated_audio", "generated_images"]
+
+ACCESS_KEY = "media:access"            # zset: artifact key -> last access timestamp
+PINS_KEY = "media:pins"                # zset: "<container>|<task_id>" -> lease expiry timestamp
+STATS_KEY = "media:eviction:stats"     # hash: latest daemon statistics
+
+PIN_LEASE_SECONDS = 3 * 3600
+ACCESS_RECORD_INTERVAL = 60  # seconds between access writes for the same artifact per process
+
+_last_recorded: dict[str, float] = {}
+
+
+def artifact_key(path: Union[str, os.PathLike[str]]) -> Optional[str]:
+    """Map any file below a media root to the key of the artifact it belongs to."""
+    parts = Path(os.path.relpath(path)).parts
+    if not parts or parts[0] not in MEDIA_ROOTS:
+        return None
+    depth = 3 if parts[0] == USER_ROOT else 2
+    if len(parts) < depth:
+        return None
+    return "/".join(parts[:depth])
+
+
+async def record_access(path: Union[str, os.PathLike[str]]) -> None:
+    """Note that an artifact was served. Writes are debounced per process."""
+    key = artifact_key(path)
+    if not key:
+        return
+    now = time.time()
+    if now - _last_recorded.get(key, 0) < ACCESS_RECORD_INTERVAL:
+        return
+    if len(_last_recorded) > 10000:
+        _last_recorded.clear()
+    _last_recorded[key] = now
+    try:
+        await get_shared_redis().zadd(ACCESS_KEY, {key: now})
+    except Exception as e:
+        logger.warning(f"Failed to record media access for {key}: {e}")
+
+
+def _sync_redis() -> redis_sync.Redis:
+    return redis_sync.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+
+def pin_artifacts(container: str, task_id: str) -> None:
+    """Keep the eviction daemon away from ``container`` until unpinned or the lease expires."""
+    try:
+        _sync_redis().zadd(PINS_KEY, {f"{container}|{task_id}": time.time() + PIN_LEASE_SECONDS})
+    except Exception as e:
+        logger.warning(f"Failed to pin {container} for task {task_id}: {e}")
+
+
+def unpin_artifacts(container: str, task_id: str) -> None:
+    try:
+        _sync_redis().zrem(PINS_KEY, f"{container}|{task_id}")
+    except Exception as e:
+        logger.warning(f"Failed to unpin {container} for task {task_id}: {e}")
+
+
+class AccessLogReader:
+    """
+    Follows nginx's ``$msec $uri`` access log from where the last read stopped and
+    returns the newest access per artifact key. A replaced or truncated file is read
+    from the start. Past ``max_bytes`` the file is truncated in place: nginx appends
+    with O_APPEND, so it carries on at the new end.
+    """
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._inode: Optional[int] = None
+        self._offset = 0
+
+    def read(self) -> dict[str, float]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return {}
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            self._inode, self._offset = st.st_ino, 0
+        accessed: dict[str, float] = {}
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Still being written; read again next cycle
+                    break
+                self._offset += len(line)
+                fields = line.split()
+                if len(fields) != 2:
+                    continue
+                try:
+                    when = float(fields[0])
+                except ValueError:
+                    continue
+                key = artifact_key(fields[1].decode("utf-8", "replace").lstrip("/"))
+                if key and when > accessed.get(key, 0):
+                    accessed[key] = when
+        if self._offset > self.max_bytes:
+            # Lines appended between the read above and here are lost; they are single accesses
+            os.truncate(self.path, 0)
+            self._offset = 0
+        return accessed
+
+
+@dataclass
+class Artifact:
+    key: str
+    container: str
+    user_id: Optional[str]
+    size: int
+    last_access: float
+
+
+def _measure(entry: os.DirEntry[str]) -> tuple[int, float]:
+    """Total size and newest mtime of a file or directory tree."""
+    if not entry.is_dir(follow_symlinks=False):
+        st = entry.stat(follow_symlinks=False)
+        return st.st_size, st.st_mtime
+    size, newest = 0, entry.stat(follow_symlinks=False).st_mtime
+    with os.scandir(entry.path) as it:
+        for child in it:
+            child_size, child_mtime = _measure(child)
+            size += child_size
+            newest = max(newest, child_mtime)
+    return size, newest
+
+
+class ArtifactIndex:
+    """Incremental index of media artifacts, refreshed with ``os.scandir``."""
+
+    def __init__(self, base_dir: Path):
+        self.base_dir = Path(base_dir)
+        self.artifacts: dict[str, Artifact] = {}
+        self._container_mtimes: dict[str, float] = {}
+        self._recently_pinned: set[str] = set()
+
+    def _containers(self) -> dict[str, float]:
+        """Directories that directly hold artifacts, with their mtimes."""
+        containers: dict[str, float] = {}
+        for root in MEDIA_ROOTS:
+            root_path = self.base_dir / root
+            if not root_path.is_dir():
+                continue
+            if root != USER_ROOT:
+                containers[root] = root_path.stat().st_mtime
+                continue
+            with os.scandir(root_path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        containers[f"{root}/{entry.name}"] = entry.stat(follow_symlinks=False).st_mtime
+        return containers
+
+    def _scan_container(self, container: str) -> None:
+        user_id = container.split("/", 1)[1] if container.startswith(f"{USER_ROOT}/") else None
+        for key in [k for k, a in self.artifacts.items() if a.container == container]:
+            del self.artifacts[key]
+        with os.scandir(self.base_dir / container) as it:
+            for entry in it:
+                size, mtime = _measure(entry)
+                key = f"{container}/{entry.name}"
+                self.artifacts[key] = Artifact(key, container, user_id, size, mtime)
+
+    def refresh(self, pinned: set[str]) -> int:
+        """Rescan changed and in-flight containers; returns how many were scanned."""
+        containers = self._containers()
+        scanned = 0
+        for container, mtime in containers.items():
+            busy = container in pinned or container in self._recently_pinned
+            if busy or self._container_mtimes.get(container) != mtime:
+                try:
+                    self._scan_container(container)
+                    self._container_mtimes[container] = mtime
+                    scanned += 1
+                except FileNotFoundError:
+                    pass
+        for gone in set(self._container_mtimes) - set(containers):
+            del self._container_mtimes[gone]
+            for key in [k for k, a in self.artifacts.items() if a.container == gone]:
+                del self.artifacts[key]
+        # Rescan once more after a task finishes, to pick up its final writes
+        self._recently_pinned = set(pinned)
+        return scanned
+
+
+class EvictionDaemon:
+    """Enforces MEDIA_QUOTA_BYTES and MEDIA_USER_QUOTA_BYTES with LRU eviction."""
+
+    def __init__(self, base_dir: Path = Path(".")):
+        self.base_dir = Path(base_dir)
+        self.index = ArtifactIndex(self.base_dir)
+        self.redis = _sync_redis()
+        self.access_log = (AccessLogReader(Path(settings.MEDIA_ACCESS_LOG), settings.MEDIA_ACCESS_LOG_MAX_BYTES)
+                           if settings.MEDIA_ACCESS_LOG else None)
+        self.evicted_count = 0
+        self.evicted_bytes = 0
+
+    def _pinned_containers(self) -> set[str]:
+        now = time.time()
+        self.redis.zremrangebyscore(PINS_KEY, "-inf", now)
+        return {member.split("|", 1)[0] for member in self.redis.zrangebyscore(PINS_KEY, now, "+inf")}
+
+    def _is_pinned(self, container: str) -> bool:
+        # Re-checked right before deleting, in case a task started during this cycle
+        return container in self._pinned_containers()
+
+    def plan(self, pinned: set[str], now: float) -> list[Artifact]:
+        """Pick the artifacts to delete, least recently accessed first."""
+        candidates = sorted(
+            (a for a in self.index.artifacts.values() if a.container not in pinned),
+            key=lambda a: a.last_access,
+        )
+        victims: dict[str, Artifact] = {}
+
+        max_idle = settings.MEDIA_MAX_IDLE_DAYS * 86400
+        for artifact in candidates:
+            if now - artifact.last_access > max_idle:
+                victims[artifact.key] = artifact
+
+        # Once over a quota, evict down to the low watermark so we do not run at the limit
+        watermark = settings.MEDIA_EVICTION_LOW_WATERMARK
+
+        user_usage: dict[str, int] = {}
+        for artifact in self.index.artifacts.values():
+            if artifact.user_id and artifact.key not in victims:
+                user_usage[artifact.user_id] = user_usage.get(artifact.user_id, 0) + artifact.size
+        for user_id, usage in user_usage.items():
+            if usage <= settings.MEDIA_USER_QUOTA_BYTES:
+                continue
+            target = settings.MEDIA_USER_QUOTA_BYTES * watermark
+            for artifact in candidates:
+                if usage <= target:
+                    break
+                if artifact.user_id == user_id and artifact.key not in victims:
+                    victims[artifact.key] = artifact
+                    usage -= artifact.size
+
+        total = sum(a.size for a in self.index.artifacts.values() if a.key not in victims)
+        if total > settings.MEDIA_QUOTA_BYTES:
+            target = settings.MEDIA_QUOTA_BYTES * watermark
+            for artifact in candidates:
+                if total <= target:
+                    break
+                if artifact.key not in victims:
+                    victims[artifact.key] = artifact
+                    total -= artifact.size
+
+        return list(victims.values())
+
+    def _delete(self, artifact: Artifact) -> bool:
+        if self._is_pinned(artifact.container):
+            return False
+        path = self.base_dir / artifact.key
+        try:
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to evict {artifact.key}: {e}")
+            return False
+        self.redis.zrem(ACCESS_KEY, artifact.key)
+        self.index.artifacts.pop(artifact.key, None)
+        logger.info(f"Evicted {artifact.key} ({artifact.size / 1024 / 1024:.1f} MB)")
+        return True
+
+    def run_once(self) -> dict:
+        started = time.time()
+        pinned = self._pinned_containers()
+        scanned = self.index.refresh(pinned)
+
+        if self.access_log:
+            # Only artifacts that exist: requests for evicted or unknown files are logged too
+            served = {key: when for key, when in self.access_log.read().items() if key in self.index.artifacts}
+            if served:
+                self.redis.zadd(ACCESS_KEY, served, gt=True)
+
+        # Recorded accesses override the file times where they are newer
+        accessed = dict(self.redis.zrange(ACCESS_KEY, 0, -1, withscores=True))
+        for artifact in self.index.artifacts.values():
+            artifact.last_access = max(artifact.last_access, accessed.get(artifact.key, 0))
+
+        for artifact in self.plan(pinned, started):
+            if self._delete(artifact):
+                self.evicted_count += 1
+                self.evicted_bytes += artifact.size
+
+        users = {a.user_id for a in self.index.artifacts.values() if a.user_id}
+        stats = {
+            "artifacts": len(self.index.artifacts),
+            "total_bytes": sum(a.size for a in self.index.artifacts.values()),
+            "users": len(users),
+            "pinned_containers": len(pinned),
+            "scanned_containers": scanned,
+            "evicted_count_total": self.evicted_count,
+            "evicted_bytes_total": self.evicted_bytes,
+            "quota_bytes": settings.MEDIA_QUOTA_BYTES,
+            "user_quota_bytes": settings.MEDIA_USER_QUOTA_BYTES,
+            "last_cycle_seconds": round(time.time() - started, 3),
+            "last_run": started,
+        }
+        self.redis.hset(STATS_KEY, mapping=stats)
+        return stats
+
+    def run_forever(self, interval: Optional[int] = None, stop: Optional[threading.Event] = None) -> None:
+        interval = interval or settings.MEDIA_EVICTION_INTERVAL
+        logger.info(f"🧹 Media eviction daemon started (quota {settings.MEDIA_QUOTA_BYTES / 1024**3:.1f} GB, "
+                    f"per user {settings.MEDIA_USER_QUOTA_BYTES / 1024**3:.1f} GB, every {interval}s)")
+        while not (stop and stop.is_set()):
+            try:
+                stats = self.run_once()
+                logger.info(f"Eviction cycle: {stats['artifacts']} artifacts, "
+                            f"{stats['total_bytes'] / 1024**3:.2f} GB, evicted total {stats['evicted_count_total']}")
+            except Exception as e:
+                logger.error(f"❌ Eviction cycle failed: {e}", exc_info=True)
+            if stop:
+                stop.wait(interval)
+            else:
+                time.sleep(interval)
+
+
+async def get_eviction_stats() -> dict:
+    """Latest statistics published by the daemon."""
+    return await get_shared_redis().hgetall(STATS_KEY)
@@ -1,12 +1,160 @@
 import firebase_admin
 from firebase_admin import credentials, storage, auth, firestore
 import os
+import math
 import asyncio
+import hashlib
 import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Optional
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Cloud Storage can compose at most 32 source objects into one
+MAX_COMPOSE_PARTS = 32
+
+
+class OverlappedUpload:
+    """
+    Uploads a file to Cloud Storage as fixed-size part objects sent in parallel
+    and composed server-side into the final blob.
+
+    Once started, parts are uploaded while the file is still being written.
+    Part 0 holds the container header that muxers patch on close, so it always
+    goes last. On finish, any part whose bytes changed after it was sent is
+    re-sent, together with any part that failed. A failure costs one part,
+    not the whole file.
+    """
+
+    def __init__(self, bucket: Any, source_path: Path, part_prefix: str, part_size: int, executor: ThreadPoolExecutor) -> None:
+        self.bucket = bucket
+        self.source_path = Path(source_path)
+        self.part_prefix = part_prefix
+        self.part_size = part_size
+        self.executor = executor
+        self._futures: dict[int, Future[str]] = {}
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def start(self, poll_interval: float = 1.0) -> "OverlappedUpload":
+        """Begin sending parts as soon as the writer has produced them."""
+        def _watch() -> None:
+            while not self._stop.wait(poll_interval):
+                try:
+                    self._submit_ready_parts()
+                except Exception as e:
+                    logger.warning(f"Overlapped upload watcher error: {e}")
+
+        self._watcher = threading.Thread(target=_watch, name=f"upload-{self.part_prefix}", daemon=True)
+        self._watcher.start()
+        return self
+
+    def _part_name(self, index: int) -> str:
+        return f"{self.part_prefix}/part-{index:02d}"
+
+    def _read_range(self, start: int, end: int) -> bytes:
+        with open(self.source_path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def _upload_part(self, index: int, start: int, end: int) -> str:
+        data = self._read_range(start, end)
+        self.bucket.blob(self._part_name(index)).upload_from_string(data, content_type="application/octet-stream")
+        return hashlib.md5(data).hexdigest()
+
+    def _submit(self, index: int, start: int, end: int) -> None:
+        self._futures[index] = self.executor.submit(self._upload_part, index, start, end)
+
+    def _submit_ready_parts(self) -> None:
+        if not self.source_path.exists():
+            return
+        size = self.source_path.stat().st_size
+        # The last slot is reserved for the tail, which is only known once writing stops
+        for index in range(1, MAX_COMPOSE_PARTS - 1):
+            if index in self._futures:
+                continue
+            if size < (index + 1) * self.part_size:
+                break
+            self._submit(index, index * self.part_size, (index + 1) * self.part_size)
+
+    def _ranges(self, size: int) -> list[tuple[int, int, int]]:
+        full_parts = min(size // self.part_size, MAX_COMPOSE_PARTS - 1)
+        ranges = [(i, i * self.part_size, (i + 1) * self.part_size) for i in range(full_parts)]
+        if full_parts * self.part_size < size:
+            ranges.append((full_parts, full_parts * self.part_size, size))
+        return ranges
+
+    def _sent_digest(self, index: int) -> Optional[str]:
+        future = self._futures.get(index)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            logger.warning(f"Upload of part {index} failed, resending: {e}")
+            return None
+
+    def finish(self, destination_blob_name: str, content_type: Optional[str] = None,
+               cache_control: Optional[str] = None, source_path: Optional[Path] = None) -> str:
+        """Send the remaining parts, compose them and return the public URL.
+
+        ``source_path`` lets the writer rename the finished file before the upload completes.
+        """
+        self._stop.set()
+        if self._watcher:
+            self._watcher.join()
+        if source_path:
+            self.source_path = Path(source_path)
+
+        size = self.source_path.stat().st_size
+        if not self._futures:
+            # Nothing was sent while writing; size the parts to fit one compose call
+            self.part_size = max(self.part_size, math.ceil(size / MAX_COMPOSE_PARTS))
+
+        ranges = self._ranges(size)
+        for index, start, end in ranges:
+            sent = self._sent_digest(index)
+            if sent is None or sent != hashlib.md5(self._read_range(start, end)).hexdigest():
+                self._submit(index, start, end)
+
+        pending = [self._futures[index] for index, _, _ in ranges]
+        wait(pending)
+        for future in pending:
+            future.result()
+
+        destination = self.bucket.blob(destination_blob_name)
+        destination.content_type = content_type
+        destination.cache_control = cache_control
+        destination.compose([self.bucket.blob(self._part_name(index)) for index, _, _ in ranges])
+        destination.make_public()
+        self._delete_parts()
+
+        logger.info(f"✅ File {self.source_path} uploaded to {destination_blob_name} in {len(ranges)} parts.")
+        return destination.public_url
+
+    def abort(self) -> None:
+        """Stop the watcher and remove any parts already sent."""
+        self._stop.set()
+        if self._watcher:
+            self._watcher.join()
+        for future in self._futures.values():
+            future.cancel()
+        wait(list(self._futures.values()))
+        self._delete_parts()
+
+    def _delete_parts(self) -> None:
+        try:
+            self.bucket.delete_blobs(
+                [self.bucket.blob(self._part_name(index)) for index in self._futures],
+                on_error=lambda blob: None,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to delete upload parts under {self.part_prefix}: {e}")
+
+
 class FirebaseService:
     def __init__(self):
         try:
@@ -14,6 +162,8 @@ class FirebaseService:
         except Exception as e:
             logger.error(f"❌ Failed to get Firestore client. Is Firebase initialized? Error: {e}")
             self.db = None
+        # Bounded pool for storage part uploads, separate from the default executor
+        self.upload_executor = ThreadPoolExecutor(max_workers=settings.STORAGE_UPLOAD_WORKERS)
     
     def verify_id_token(self, id_token: str) -> dict:
         if not firebase_admin._apps:
@@ -30,48 +180,43 @@ class FirebaseService:
             logger.error(f"❌ Token verification failed: {e}", exc_info=True)
             raise
 
-    async def save_story_to_firestore(self, user_id: str, story_data: dict):
-        if not self.db:
-            msg = "Cannot save story, Firestore not initialized."
+    def start_upload(self, source_file_path: Path, part_prefix: str, watch: bool = True) -> OverlappedUpload:
+        """
+        Begin uploading a file that is still being written; call ``finish`` once it is done.
+        Pass ``watch=False`` when the writer rewrites the file on close, so parts are only sent at the end.
+        """
+        if not firebase_admin._apps:
+            msg = "Cannot upload file, Firebase not initialized."
             logger.error(f"❌ {msg}")
             raise ConnectionError(msg)
-        
-        def _save_sync():
-            try:
-                user_stories_ref = self.db.collection('users').document(user_id).collection('stories')
-                doc_ref = user_stories_ref.add(story_data)
-                logger.info(f"✅ Story data saved to Firestore for user {user_id} with doc ID: {doc_ref[1].id}")
-                return doc_ref[1].id
-            except Exception as e:
-                logger.error(f"❌ Failed to save story to Firestore: {e}", exc_info=True)
-                raise
-        
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, _save_sync)
 
-    async def upload_file(self, source_file_path: str, destination_blob_name: str) -> str:
+        upload = OverlappedUpload(
+            storage.bucket(), source_file_path, part_prefix,
+            settings.STORAGE_UPLOAD_PART_SIZE, self.upload_executor,
+        )
+        return upload.start() if watch else upload
+
+    async def upload_file(self, source_file_path: str, destination_blob_name: str,
+                          content_type: Optional[str] = None, cache_control: Optional[str] = None) -> str:
         def _upload_sync():
             if not firebase_admin._apps:
                 msg = "Cannot upload file, Firebase not initialized."
                 logger.error(f"❌ {msg}")
                 raise ConnectionError(msg)
             
+            upload = OverlappedUpload(
+                storage.bucket(), Path(source_file_path), f"uploads/{destination_blob_name}",
+                settings.STORAGE_UPLOAD_PART_SIZE, self.upload_executor,
+            )
             try:
-                bucket = storage.bucket() 
-                logger.info(f"✅ Got bucket: {bucket.name}")
-                blob = bucket.blob(destination_blob_name)
-
                 logger.info(f"📤 Uploading {source_file_path} to {destination_blob_name}...")
-                blob.upload_from_filename(source_file_path)
-                
-                blob.make_public()
-
-                logger.info(f"✅ File {source_file_path} uploaded to {destination_blob_name}.")
-                return blob.public_url
+                return upload.finish(destination_blob_name, content_type, cache_control)
             except Exception as e:
                 logger.error(f"❌ File upload to Firebase failed: {e}", exc_info=True)
+                upload.abort()
                 raise
         
+        # The coordinator mostly waits on the upload pool, so it stays off that pool
         loop = asyncio.get_event_loop()
         return await loop.run_in_executor(None, _upload_sync)
 
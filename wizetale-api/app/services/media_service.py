@@ -0,0 +1,99 @@
+"""
+Media Service Utility
+Usage:
+    from app.services.media_service import publish_versioned, CachedStaticFiles
+    final_path = publish_versioned(rendered_path, user_dir)   # video.mp4 -> user_dir/video-<digest>.mp4
+    app.mount("/static", CachedStaticFiles(directory="static"), name="static")
+
+Finished media is published under a content-addressed file name, so its URL
+never changes meaning. Such files are served with a strong ETag (the digest) and
+``Cache-Control: immutable``; everything else must be revalidated.
+"""
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Optional, Union
+
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+from app.services.eviction_service import record_access
+
+logger = logging.getLogger(__name__)
+
+DIGEST_LENGTH = 16
+VERSIONED_NAME_RE = re.compile(rf"-(?P<digest>[0-9a-f]{{{DIGEST_LENGTH}}})\.[A-Za-z0-9]+$")
+VERSIONED_DIR_RE = re.compile(rf"-[0-9a-f]{{{DIGEST_LENGTH}}}$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, no-cache"
+
+# HLS and subtitle types; the system mime.types may map .ts to something unrelated
+mimetypes.add_type("application/vnd.apple.mpegurl", ".m3u8")
+mimetypes.add_type("video/mp2t", ".ts")
+mimetypes.add_type("text/vtt", ".vtt")
+
+
+def content_digest(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """Short SHA-256 of the file contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:DIGEST_LENGTH]
+
+
+def publish_versioned(path: Path, directory: Optional[Path] = None) -> Path:
+    """
+    Rename a finished file to ``<stem>-<digest><suffix>``, in ``directory`` (same
+    filesystem) or next to it, and return the new path.
+    """
+    path = Path(path)
+    target = Path(directory or path.parent) / f"{path.stem}-{content_digest(path)}{path.suffix}"
+    os.replace(path, target)
+    logger.info(f"Published {path.name} as {target.name}")
+    return target
+
+
+def cache_headers_for(path: Path) -> dict:
+    """Validators and Cache-Control for a media file, based on its name or its directory's name."""
+    path = Path(path)
+    match = VERSIONED_NAME_RE.search(path.name)
+    if match:
+        return {"ETag": f'"{match.group("digest")}"', "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    # Derived outputs (e.g. hls-<digest>/360p/segment_000.ts) live in a versioned directory
+    if any(VERSIONED_DIR_RE.search(parent.name) for parent in path.parents):
+        return {"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    return {"Cache-Control": REVALIDATE_CACHE_CONTROL}
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that adds cache headers and honours If-None-Match against them."""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if self.directory and response.status_code in (200, 206, 304):
+            # Feeds the eviction daemon's LRU order
+            await record_access(Path(self.directory) / path)
+        return response
+
+    def file_response(
+        self, full_path: Union[str, os.PathLike[str]], stat_result: os.stat_result, scope: Scope, status_code: int = 200
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            headers=cache_headers_for(Path(full_path)),
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,180 @@
+"""
+Prometheus Metrics
+Usage:
+    from app.services.metrics_service import stage_timer, external_call
+
+    with stage_timer("render"):
+        ...
+    with external_call("runware"):
+        ...
+
+Gunicorn and Celery run several processes, so when PROMETHEUS_MULTIPROC_DIR is set
+(gunicorn.conf.py and worker.py set it) every process writes its samples to that
+directory and a scrape aggregates them. Without it, the default in-process registry
+is used, which is fine for a single uvicorn process.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.trace_service import span
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages run from seconds (story) to minutes (render)
+STAGE_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 180, 300, 600)
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "wizetale_pipeline_stage_seconds",
+    "Wall time of each video pipeline stage",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+PIPELINE_STAGE_FAILURES = Counter(
+    "wizetale_pipeline_stage_failures_total",
+    "Pipeline stages that raised",
+    ["stage"],
+)
+EXTERNAL_API_SECONDS = Histogram(
+    "wizetale_external_api_seconds",
+    "Latency of calls to external services",
+    ["service"],
+    buckets=STAGE_BUCKETS,
+)
+EXTERNAL_API_REQUESTS = Counter(
+    "wizetale_external_api_requests_total",
+    "Calls to external services by outcome",
+    ["service", "outcome"],
+)
+CACHE_REQUESTS = Counter(
+    "wizetale_cache_requests_total",
+    "Cache lookups by result (hit / miss)",
+    ["cache", "result"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "wizetale_http_request_duration_seconds",
+    "API request latency",
+    ["method", "route", "status"],
+)
+TASKS_IN_FLIGHT = Gauge(
+    "wizetale_tasks_in_flight",
+    "Video generation tasks currently running",
+    multiprocess_mode="livesum",
+)
+
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Time one pipeline stage; failures are counted separately. Also opens a trace span."""
+    started = time.perf_counter()
+    try:
+        with span(stage, kind="stage"):
+            yield
+    except Exception:
+        PIPELINE_STAGE_FAILURES.labels(stage=stage).inc()
+        raise
+    finally:
+        PIPELINE_STAGE_SECONDS.labels(stage=stage).observe(time.perf_counter() - started)
+
+
+@contextmanager
+def external_call(service: str) -> Iterator[None]:
+    """Time one call to an external service and count its outcome. Also opens a trace span."""
+    started = time.perf_counter()
+    try:
+        with span(service, kind="external"):
+            yield
+    except Exception:
+        EXTERNAL_API_REQUESTS.labels(service=service, outcome="error").inc()
+        raise
+    else:
+        EXTERNAL_API_REQUESTS.labels(service=service, outcome="success").inc()
+    finally:
+        EXTERNAL_API_SECONDS.labels(service=service).observe(time.perf_counter() - started)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+class _StaticGauges(Collector):
+    """Collector for values measured at scrape time (e.g. queue depth)."""
+
+    def __init__(self, values: dict[str, tuple[str, float]]) -> None:
+        self.values = values
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        for name, (documentation, value) in self.values.items():
+            yield GaugeMetricFamily(name, documentation, value=value)
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording API request latency per route template."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route (or mount) in the scope; use its
+            # template so ids in the path do not explode the label set
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status["code"],
+            ).observe(time.perf_counter() - started)
+
+
+def render_metrics(scrape_values: Optional[dict[str, tuple[str, float]]] = None) -> tuple[bytes, str]:
+    """
+    Serialize all metrics in the text exposition format.
+    ``scrape_values`` maps extra gauge names to ``(documentation, value)``.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    output = generate_latest(registry)
+    if scrape_values:
+        extra = CollectorRegistry()
+        extra.register(_StaticGauges(scrape_values))
+        output += generate_latest(extra)
+    return output, CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a dead worker's live gauges from the multiprocess directory."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
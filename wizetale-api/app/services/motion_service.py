@@ -0,0 +1,119 @@
+"""
+Ken Burns frame synthesis in NumPy
+Usage:
+    from app.services.motion_service import slideshow_frames
+
+    frames = slideshow_frames(images, durations, transition=1.0)   # canvas-sized stills
+    run_with_rusage(["ffmpeg", "-f", "rawvideo", "-pix_fmt", "rgb24", ..., "-i", "pipe:0", ...],
+                    "ffmpeg", stdin=frames)
+
+The alternative to the ``zoompan`` filter (see MOTION_ENGINES in video_pipeline). The
+zoom of every frame is known up front: it grows by ZOOM_STEP per frame until ZOOM_MAX,
+centered on the still, exactly like the zoompan expression. Each frame is sampled
+bilinearly at subpixel offsets from a 2x Lanczos-upscaled copy of the still. zoompan
+snaps the crop to whole pixels, which is where its jitter at low zoom rates comes from.
+Once the zoom stops changing the last frame is reused, so a clip costs about
+(ZOOM_MAX - 1) / ZOOM_STEP renders however long it is shown.
+
+Clips are cross-faded like ffmpeg's ``xfade=transition=fade`` chain and streamed as raw
+rgb24 frames, so only the current clips are ever held in memory.
+"""
+import bisect
+import math
+from typing import Iterator, Optional
+
+import numpy as np
+from PIL import Image
+
+# Shared with the zoompan expression in video_pipeline, so both engines follow one path
+FRAME_RATE = 25
+ZOOM_STEP = 0.002
+ZOOM_MAX = 1.1
+UPSCALE = 2
+
+
+def zoom_at(frame: int) -> float:
+    # zoompan starts from zoom=1 and evaluates min(zoom+step, max) once per output frame.
+    # Its pan term (in*0.2, in*0.15) scales with the input frame number, which stays 0
+    # for the whole clip, so the crop is always centered.
+    return min(1.0 + ZOOM_STEP * (frame + 1), ZOOM_MAX)
+
+
+def _taps(start: float, length: float, out: int, limit: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Source indices and 8-bit weights for ``out`` samples across [start, start + length)."""
+    u = start + (np.arange(out) + 0.5) * (length / out) - 0.5
+    u = np.clip(u, 0, limit - 1)
+    i0 = np.floor(u).astype(np.intp)
+    i1 = np.minimum(i0 + 1, limit - 1)
+    weight = np.round((u - i0) * 256).astype(np.uint16)
+    return i0, i1, weight
+
+
+def _blend(a: np.ndarray, b: np.ndarray, weight_b: np.ndarray | np.uint16) -> np.ndarray:
+    blended: np.ndarray = ((a * (256 - weight_b) + b * weight_b + 128) >> 8).astype(np.uint8)
+    return blended
+
+
+class KenBurnsClip:
+    def __init__(self, image_path: str) -> None:
+        with Image.open(image_path) as opened:
+            image = opened.convert("RGBA")
+            self.width, self.height = image.size
+            image = image.resize((self.width * UPSCALE, self.height * UPSCALE), Image.Resampling.LANCZOS)
+        # RGBX: one pixel is one uint32, so the column pass gathers whole pixels at once
+        self.source = np.asarray(image)
+        self._zoom: Optional[float] = None
+        self._frame: Optional[np.ndarray] = None
+
+    def _render(self, zoom: float) -> np.ndarray:
+        height, width = self.source.shape[:2]
+        crop_w, crop_h = width / zoom, height / zoom
+        x0, x1, wx = _taps((width - crop_w) / 2, crop_w, self.width, width)
+        y0, y1, wy = _taps((height - crop_h) / 2, crop_h, self.height, height)
+        # Rows first, on the column span the crop covers
+        left, right = x0[0], x1[-1] + 1
+        rows = _blend(self.source[y0, left:right], self.source[y1, left:right], wy[:, None, None])
+        pixels = rows.view(np.uint32).reshape(self.height, -1)
+        a = np.ascontiguousarray(pixels[:, x0 - left]).view(np.uint8).reshape(self.height, self.width, 4)
+        b = np.ascontiguousarray(pixels[:, x1 - left]).view(np.uint8).reshape(self.height, self.width, 4)
+        return np.ascontiguousarray(_blend(a, b, wx[None, :, None])[..., :3])
+
+    def frame(self, index: int) -> np.ndarray:
+        zoom = zoom_at(index)
+        if self._frame is None or zoom != self._zoom:
+            self._frame = self._render(zoom)
+            self._zoom = zoom
+        return self._frame
+
+
+def slideshow_frames(images: list[str], durations: list[float], transition: float,
+                     fps: int = FRAME_RATE) -> Iterator[memoryview]:
+    """
+    Raw rgb24 frames of the whole slideshow: clip ``k`` starts at the sum of the previous
+    durations and fades in over ``transition`` seconds, like the xfade chain in
+    create_video_slideshow. The last clip runs ``transition`` seconds past the end.
+    """
+    starts = [0.0]
+    for duration in durations[:-1]:
+        starts.append(starts[-1] + duration)
+    # xfade takes the next clip's first frame at the first output frame at or after its offset
+    first_frames = [math.ceil(round(start * fps, 6)) for start in starts]
+    total = math.ceil(round((sum(durations) + transition) * fps, 6))
+    clips: dict[int, KenBurnsClip] = {}
+
+    def composite(k: int, n: int) -> np.ndarray:
+        if k not in clips:
+            clips[k] = KenBurnsClip(images[k])
+        frame = clips[k].frame(n - first_frames[k])
+        elapsed = n / fps - starts[k]
+        if k > 0 and elapsed < transition:
+            # fade: the previous composite weighs 1 - elapsed/transition
+            weight = np.uint16(round(256 * elapsed / transition))
+            frame = _blend(composite(k - 1, n), frame, weight)
+        return frame
+
+    for n in range(total):
+        k = bisect.bisect_right(first_frames, n) - 1
+        for done in [j for j in clips if starts[j] + durations[j] + transition < n / fps]:
+            del clips[done]
+        yield memoryview(composite(k, n)).cast("B")
@@ -0,0 +1,191 @@
+"""
+Write-behind Firestore persistence
+Usage:
+    from app.services.persistence_service import record_task, record_story, record_usage
+
+    record_task(task_id, user_id, status="STARTED", subject=subject, topic=topic)
+    record_story(user_id, task_id, {...})
+    record_usage(user_id, stories=1, video_seconds=74.2)
+
+    # Worker / API shutdown
+    write_behind.flush()
+
+The record_* helpers only append to an in-memory queue and return immediately; a
+background thread commits the queued writes as Firestore batch writes every
+FIRESTORE_FLUSH_INTERVAL seconds or as soon as FIRESTORE_BATCH_SIZE writes are pending.
+A failed batch is retried with exponential backoff (FIRESTORE_MAX_RETRIES) before it is
+dropped. Without Firestore (local development) records are discarded.
+
+Documents (the layout the web app reads):
+    users/{uid}/stories/{task_id}   one per finished video, ordered by createdAt
+    generations/{task_id}           task status, merged as it changes
+    users/{uid}                     stats.storiesGenerated / stats.videoSeconds counters
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from firebase_admin import firestore
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Firestore rejects batches with more writes
+FIRESTORE_BATCH_LIMIT = 500
+MAX_BACKOFF_SECONDS = 60
+
+
+@dataclass
+class Write:
+    path: str
+    data: dict
+    merge: bool = True
+    attempts: int = 0
+
+
+class WriteBehindQueue:
+    def __init__(self, flush_interval: float, batch_size: int, max_retries: int, max_pending: int):
+        self.flush_interval = flush_interval
+        self.batch_size = min(batch_size, FIRESTORE_BATCH_LIMIT)
+        self.max_retries = max_retries
+        self.max_pending = max_pending
+        self._retry_at = 0.0
+        self.dropped = 0
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self) -> None:
+        # A forked Celery pool process starts empty and runs its own flusher
+        self._pending: deque[Write] = deque()
+        self._lock = threading.Lock()
+        # Serializes commits, so writes to one document are applied in the order they were queued
+        self._commit_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _db(self) -> Any:
+        from app.services.firebase_service import firebase_service
+        return firebase_service.db
+
+    def enqueue(self, path: str, data: dict, merge: bool = True) -> None:
+        """Queue one ``set`` (merged by default); never blocks on Firestore."""
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                self.dropped += 1
+                return
+            self._pending.append(Write(path, data, merge))
+            size = len(self._pending)
+            self._ensure_thread()
+        if size >= self.batch_size:
+            self._wakeup.set()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="firestore-write-behind", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if time.monotonic() < self._retry_at:
+                continue
+            while self._commit_batch():
+                pass
+
+    def _take(self) -> list[Write]:
+        with self._lock:
+            count = min(self.batch_size, len(self._pending))
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _commit_batch(self) -> bool:
+        """Commit up to batch_size writes; True if a full batch went out and more may be waiting."""
+        with self._commit_lock:
+            return self._commit_locked()
+
+    def _commit_locked(self) -> bool:
+        writes = self._take()
+        if not writes:
+            return False
+        db = self._db()
+        if db is None:
+            logger.debug(f"Firestore unavailable, discarding {len(writes)} writes")
+            return False
+        try:
+            batch = db.batch()
+            for write in writes:
+                batch.set(db.document(write.path), write.data, merge=write.merge)
+            batch.commit()
+            self._retry_at = 0.0
+            logger.debug(f"💾 Committed {len(writes)} Firestore writes")
+            return len(writes) == self.batch_size
+        except Exception as e:
+            self._requeue(writes, e)
+            return False
+
+    def _requeue(self, writes: list[Write], error: Exception) -> None:
+        retry: list[Write] = []
+        for write in writes:
+            write.attempts += 1
+            if write.attempts <= self.max_retries:
+                retry.append(write)
+        lost = len(writes) - len(retry)
+        if lost:
+            logger.error(f"❌ Dropping {lost} Firestore writes after {self.max_retries} retries: {error}")
+        if retry:
+            attempts = max(write.attempts for write in retry)
+            delay = min(MAX_BACKOFF_SECONDS, 2 ** attempts)
+            self._retry_at = time.monotonic() + delay
+            logger.warning(f"⚠️ Firestore batch of {len(writes)} failed, retrying in {delay}s: {error}")
+            with self._lock:
+                # Back in front, so writes to the same document keep their order
+                self._pending.extendleft(reversed(retry))
+
+    def flush(self, timeout: float = 10.0) -> None:
+        """Commit everything queued so far (shutdown); gives up on retries after ``timeout``."""
+        deadline = time.monotonic() + timeout
+        self._retry_at = 0.0
+        while self._pending and time.monotonic() < deadline:
+            if not self._commit_batch() and self._retry_at:
+                time.sleep(min(1.0, max(0.0, deadline - time.monotonic())))
+                self._retry_at = 0.0
+        if self._pending:
+            logger.error(f"❌ {len(self._pending)} Firestore writes not persisted at shutdown")
+        if self.dropped:
+            logger.error(f"❌ {self.dropped} Firestore writes dropped: write-behind queue was full")
+            self.dropped = 0
+
+
+write_behind = WriteBehindQueue(
+    settings.FIRESTORE_FLUSH_INTERVAL, settings.FIRESTORE_BATCH_SIZE,
+    settings.FIRESTORE_MAX_RETRIES, settings.FIRESTORE_MAX_PENDING,
+)
+atexit.register(write_behind.flush)
+
+
+def _is_user(user_id: str) -> bool:
+    return bool(user_id) and user_id != "anonymous"
+
+
+def record_task(task_id: str, user_id: str, status: str, **fields: Any) -> None:
+    data = {"task_id": task_id, "user_id": user_id, "status": status, "updated_at": firestore.SERVER_TIMESTAMP, **fields}
+    if status == "STARTED":
+        data["created_at"] = firestore.SERVER_TIMESTAMP
+    write_behind.enqueue(f"generations/{task_id}", data)
+
+
+def record_story(user_id: str, task_id: str, story: dict) -> None:
+    if _is_user(user_id):
+        write_behind.enqueue(f"users/{user_id}/stories/{task_id}", {**story, "createdAt": firestore.SERVER_TIMESTAMP})
+
+
+def record_usage(user_id: str, stories: int = 0, video_seconds: float = 0.0) -> None:
+    if _is_user(user_id):
+        stats = {"storiesGenerated": firestore.Increment(stories), "videoSeconds": firestore.Increment(round(video_seconds, 1))}
+        write_behind.enqueue(f"users/{user_id}", {"stats": stats})
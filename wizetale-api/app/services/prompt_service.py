@@ -0,0 +1,189 @@
+"""
+Prompt Enhancement Service
+Usage:
+    from app.services.prompt_service import prompt_service
+
+    async with prompt_service.slot():            # EnhancementBusy when the worker is saturated
+        text = await prompt_service.enhance(description, language)
+
+    async with prompt_service.slot():
+        async for delta in prompt_service.stream(description, language):
+            ...
+
+    # Result cache
+    text = await prompt_service.cached(description, language)   # None on a miss
+    await prompt_service.remember(description, language, text)
+
+Completions go through AsyncAzureOpenAI, so a slow upstream only suspends the request
+that is waiting on it. ``slot()`` caps concurrent completions per API worker
+(ENHANCE_PROMPT_CONCURRENCY); a burst beyond the cap is rejected instead of queued
+against the upstream quota. The openai SDK is imported on first use only.
+
+Results are cached in Redis per normalized description and language
+(ENHANCE_PROMPT_CACHE_TTL), bounded to ENHANCE_PROMPT_CACHE_MAX_ENTRIES descriptions by
+least recent use. With ENHANCE_PROMPT_CACHE_VARIANTS > 1 a key collects that many
+completions before repeats are served, round-robin, from the cache.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+
+from app.core.config import settings
+from app.services.metrics_service import external_call, record_cache_lookup
+from app.services.redis_service import get_shared_redis
+
+if TYPE_CHECKING:
+    from openai import AsyncAzureOpenAI
+
+logger = logging.getLogger(__name__)
+
+API_VERSION = "2024-02-01"
+MAX_TOKENS = 800
+TEMPERATURE = 0.8
+
+CACHE_PREFIX = "enhance-prompt"
+CACHE_INDEX_KEY = f"{CACHE_PREFIX}:index"  # zset: digest -> last use
+
+ENHANCE_PROMPT_TEMPLATE = """
+You are a creative writing assistant. Take the following story idea and enhance it to make it more engaging, detailed, and suitable for video generation.
+The original idea is in {language}. Please provide the enhanced version in the SAME language.
+
+Original idea: "{description}"
+
+Please enhance this idea by:
+1. Adding more vivid details and atmosphere
+2. Developing characters and their motivations
+3. Creating a clear narrative arc with beginning, middle, and end
+4. Adding emotional depth and conflict
+5. Making it more cinematic and visual
+
+Return only the enhanced story description, in {language}, nothing else. Keep it under 500 words but make it rich and engaging.
+"""
+
+
+def normalize_description(description: str) -> str:
+    """Case, Unicode form, whitespace and trailing punctuation do not change the result."""
+    text = unicodedata.normalize("NFKC", description).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.strip(" .!?…\"'«»")
+
+
+def cache_digest(description: str, language: str) -> str:
+    key = f"{language.strip().lower()}\n{normalize_description(description)}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class EnhancementBusy(Exception):
+    """All completion slots of this worker stayed taken for ENHANCE_PROMPT_WAIT_SECONDS."""
+
+
+class PromptService:
+    def __init__(self, concurrency: int, wait_seconds: float) -> None:
+        self.wait_seconds = wait_seconds
+        self._slots = asyncio.Semaphore(concurrency)
+        self._client: Optional["AsyncAzureOpenAI"] = None
+
+    @property
+    def client(self) -> "AsyncAzureOpenAI":
+        # One client per worker: its connection pool is reused across requests
+        if self._client is None:
+            from openai import AsyncAzureOpenAI
+
+            self._client = AsyncAzureOpenAI(
+                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+                api_key=settings.AZURE_OPENAI_API_KEY,
+                api_version=API_VERSION,
+            )
+        return self._client
+
+    def saturated(self) -> bool:
+        return self._slots.locked()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.wait_seconds)
+        except asyncio.TimeoutError:
+            raise EnhancementBusy()
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def _request(self, description: str, language: str, stream: bool) -> dict:
+        return {
+            "model": settings.AZURE_OPENAI_DEPLOYMENT_NAME,
+            "messages": [{"role": "user", "content": ENHANCE_PROMPT_TEMPLATE.format(description=description, language=language)}],
+            "temperature": TEMPERATURE,
+            "max_tokens": MAX_TOKENS,
+            "stream": stream,
+        }
+
+    async def enhance(self, description: str, language: str) -> str:
+        with external_call("azure_openai"):
+            response = await self.client.chat.completions.create(**self._request(description, language, stream=False))
+        content: str = response.choices[0].message.content or ""
+        return content.strip()
+
+    async def stream(self, description: str, language: str) -> AsyncIterator[str]:
+        """Yields the completion as it is generated, one text delta at a time."""
+        with external_call("azure_openai"):
+            stream = await self.client.chat.completions.create(**self._request(description, language, stream=True))
+            async for chunk in stream:
+                # Azure sends chunks without choices (content filter results)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+    # Result cache
+
+    async def cached(self, description: str, language: str) -> Optional[str]:
+        """A cached enhancement, or None while the key has fewer than ENHANCE_PROMPT_CACHE_VARIANTS."""
+        digest = cache_digest(description, language)
+        try:
+            async with get_shared_redis().pipeline(transaction=False) as pipe:
+                pipe.lrange(f"{CACHE_PREFIX}:{digest}", 0, -1)
+                pipe.incr(f"{CACHE_PREFIX}:{digest}:next")
+                pipe.expire(f"{CACHE_PREFIX}:{digest}:next", settings.ENHANCE_PROMPT_CACHE_TTL)
+                # Last use for the size bound; xx: misses do not enter the index
+                pipe.zadd(CACHE_INDEX_KEY, {digest: time.time()}, xx=True)
+                variants, turn, _, _ = await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Enhance prompt cache read failed: {e}")
+            return None
+        hit = len(variants) >= settings.ENHANCE_PROMPT_CACHE_VARIANTS
+        record_cache_lookup("enhance_prompt", hit)
+        if not hit:
+            return None
+        choice: str = variants[turn % len(variants)]
+        return choice
+
+    async def remember(self, description: str, language: str, text: str) -> None:
+        if not text:
+            return
+        digest = cache_digest(description, language)
+        key = f"{CACHE_PREFIX}:{digest}"
+        redis = get_shared_redis()
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.rpush(key, text)
+                pipe.ltrim(key, -settings.ENHANCE_PROMPT_CACHE_VARIANTS, -1)
+                pipe.expire(key, settings.ENHANCE_PROMPT_CACHE_TTL)
+                pipe.zadd(CACHE_INDEX_KEY, {digest: time.time()})
+                # Entries whose TTL ran out leave the index here as well
+                pipe.zremrangebyscore(CACHE_INDEX_KEY, "-inf", time.time() - settings.ENHANCE_PROMPT_CACHE_TTL)
+                pipe.zcard(CACHE_INDEX_KEY)
+                size = (await pipe.execute())[-1]
+            overflow = size - settings.ENHANCE_PROMPT_CACHE_MAX_ENTRIES
+            if overflow > 0:
+                evicted = [member for member, _ in await redis.zpopmin(CACHE_INDEX_KEY, overflow)]
+                await redis.delete(*[f"{CACHE_PREFIX}:{d}{suffix}" for d in evicted for suffix in ("", ":next")])
+        except Exception as e:
+            logger.warning(f"Enhance prompt cache write failed: {e}")
+
+
+prompt_service = PromptService(settings.ENHANCE_PROMPT_CONCURRENCY, settings.ENHANCE_PROMPT_WAIT_SECONDS)
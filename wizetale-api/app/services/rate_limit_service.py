@@ -0,0 +1,162 @@
+"""
+Rate Limit Service
+Usage:
+    limit = parse_limit("5/minute")
+    result = await rate_limiter.hit("generate", f"user:{uid}", limit)
+    if not result.allowed:
+        ...
+
+A sliding-window log kept in Redis, so every worker of every API container shares
+the same counters. One Lua script trims the window, counts, records the hit and
+refreshes the TTL in a single atomic round trip; timestamps come from the Redis
+clock so containers with skewed clocks agree.
+"""
+import ipaddress
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Optional
+from uuid import uuid4
+
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.services.redis_service import get_shared_redis
+
+logger = logging.getLogger(__name__)
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# KEYS[1] window zset; ARGV: limit, window (ms), unique member
+# Returns {allowed, remaining, ms until the oldest hit leaves the window}
+SLIDING_WINDOW_LUA = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+local allowed = 0
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    count = count + 1
+    allowed = 1
+end
+redis.call('PEXPIRE', KEYS[1], window)
+local reset = window
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+if oldest[2] then
+    reset = tonumber(oldest[2]) + window - now
+end
+return {allowed, limit - count, reset}
+"""
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    amount: int
+    seconds: int
+
+    def __str__(self) -> str:
+        return f"{self.amount} per {self.seconds}s"
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_seconds: int
+
+    @property
+    def headers(self) -> dict:
+        return {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(self.remaining, 0)),
+            "X-RateLimit-Reset": str(self.reset_seconds),
+        }
+
+
+def parse_limit(value: str) -> RateLimit:
+    """Parse slowapi-style limits such as ``"5/minute"`` or ``"100/10 seconds"``."""
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)?\s*(second|minute|hour|day)s?\s*", value)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {value!r}")
+    amount, multiplier, period = match.groups()
+    return RateLimit(int(amount), int(multiplier or 1) * _PERIODS[period])
+
+
+def _trusted_networks() -> list[ipaddress.IPv4Network | ipaddress.IPv6Network]:
+    return [ipaddress.ip_network(net.strip()) for net in settings.RATE_LIMIT_TRUSTED_PROXIES.split(",") if net.strip()]
+
+
+_trusted = _trusted_networks()
+
+
+def client_ip(request: HTTPConnection) -> str:
+    """
+    The real client address. X-Real-IP / X-Forwarded-For are only believed when the
+    connection comes from a trusted proxy (nginx), otherwise anyone could pick their key.
+    """
+    peer = request.client.host if request.client else "unknown"
+    try:
+        trusted = any(ipaddress.ip_address(peer) in net for net in _trusted)
+    except ValueError:
+        trusted = False
+    if trusted:
+        real_ip = request.headers.get("x-real-ip")
+        if real_ip:
+            return real_ip.strip()
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return peer
+
+
+class RedisRateLimiter:
+    def __init__(self) -> None:
+        self._script: Optional[Any] = None
+
+    async def hit(self, scope: str, identity: str, limit: RateLimit) -> RateLimitResult:
+        """Count one request against ``limit``; fails open if Redis is unavailable."""
+        try:
+            if self._script is None:
+                self._script = get_shared_redis().register_script(SLIDING_WINDOW_LUA)
+            allowed, remaining, reset_ms = await self._script(
+                keys=[f"ratelimit:{scope}:{identity}"],
+                args=[limit.amount, limit.seconds * 1000, uuid4().hex],
+            )
+        except Exception as e:
+            logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+            return RateLimitResult(True, limit.amount, limit.amount, limit.seconds)
+        return RateLimitResult(bool(allowed), limit.amount, int(remaining), max(1, -(-int(reset_ms) // 1000)))
+
+
+rate_limiter = RedisRateLimiter()
+
+
+class RateLimitHeadersMiddleware:
+    """ASGI middleware adding the X-RateLimit-* headers recorded by the ``rate_limit`` dependency."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                result = scope.get("state", {}).get("rate_limit")
+                if result:
+                    existing = list(message.get("headers", []))
+                    present = {name.lower() for name, _ in existing}
+                    # A 429 already carries them through the HTTPException
+                    headers = [(k.lower().encode(), v.encode()) for k, v in result.headers.items()
+                               if k.lower().encode() not in present]
+                    message["headers"] = existing + headers
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -2,12 +2,16 @@
 Redis Service Utility
 Usage:
     from app.services.redis_service import get_redis_client
-    redis = get_redis_client()
+    redis = await get_redis_client()
     if redis:
-        redis.set('key', 'value')
-        value = redis.get('key')
+        await redis.set('key', 'value')
+        value = await redis.get('key')
+
+All callers share one bounded connection pool per process, so the API
+workers never open a fresh connection per request.
 """
 import os
+from typing import Optional
 import redis.asyncio as redis
 from dotenv import load_dotenv
 import logging
@@ -15,15 +19,32 @@ import logging
 load_dotenv()
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
 logger = logging.getLogger(__name__)
 
-async def get_redis_client():
+_shared_client: Optional[redis.Redis] = None
+
+
+def get_shared_redis() -> redis.Redis:
+    """Return the process-wide async client. Connections are opened lazily, after fork."""
+    global _shared_client
+    if _shared_client is None:
+        pool = redis.ConnectionPool.from_url(
+            REDIS_URL,
+            decode_responses=True,
+            max_connections=REDIS_MAX_CONNECTIONS,
+        )
+        _shared_client = redis.Redis(connection_pool=pool)
+    return _shared_client
+
+
+async def get_redis_client() -> Optional[redis.Redis]:
     """Get Redis client, returns None if Redis is unavailable"""
     try:
-        client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+        client = get_shared_redis()
         # Test connection
         await client.ping()
         return client
     except Exception as e:
         logger.warning(f"Redis unavailable, running without cache: {e}")
-        return None 
\ No newline at end of file
+        return None
@@ -3,29 +3,35 @@ import asyncio
 from uuid import uuid4
 import logging
 import json
+from typing import Any
 
 from app.core.config import settings
+from app.services.metrics_service import external_call
 
 logger = logging.getLogger(__name__)
 
 class RunwareService:
-    def __init__(self):
-        if not settings.RUNWARE_API_KEY:
-            raise ValueError("RUNWARE_API_KEY is not set in the environment variables.")
-        
+    def __init__(self) -> None:
+        # The key is checked on first use, so importing this module never fails
         self.api_key = settings.RUNWARE_API_KEY
         self.base_url = "https://api.runware.ai/v1"
-        self.headers = {
+
+    @property
+    def headers(self) -> dict:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
 
-    async def _send_request(self, payload: dict | list):
+    async def _send_request(self, payload: dict | list) -> Any:
+        if not self.api_key:
+            raise ValueError("RUNWARE_API_KEY is not set in the environment variables.")
         async with httpx.AsyncClient(timeout=120.0) as client:
             try:
-                response = await client.post(f"{self.base_url}/tasks", headers=self.headers, json=payload)
-                response.raise_for_status()
+                with external_call("runware"):
+                    response = await client.post(f"{self.base_url}/tasks", headers=self.headers, json=payload)
+                    response.raise_for_status()
                 return response.json()
             except httpx.HTTPStatusError as e:
                 logger.error(f"Runware API request failed with status {e.response.status_code}: {e.response.text}")
@@ -62,7 +68,8 @@ class RunwareService:
             })
 
         try:
-            logger.info(f"Sending payload to Runware: {json.dumps(tasks_payload, indent=2)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Sending payload to Runware: {json.dumps(tasks_payload)}")
             response_data = await self._send_request(tasks_payload)
             
             if response_data.get("errors"):
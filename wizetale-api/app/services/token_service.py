@@ -0,0 +1,99 @@
+"""
+Firebase ID Token Verification
+Usage:
+    from app.services.token_service import token_verifier
+
+    claims = await token_verifier.verify(id_token)   # ValueError if the token is invalid
+    uid = claims["uid"]
+
+Decoded tokens are kept in a bounded LRU until their ``exp``, so the same client
+polling every two seconds is verified once per token lifetime (about an hour). A miss
+runs ``firebase_admin.auth.verify_id_token`` in a thread, so the RSA check never blocks
+the event loop. The SDK fetches Google's signing certificates through its own
+Cache-Control aware session and reuses them until their max-age runs out.
+"""
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import firebase_admin
+from firebase_admin import auth
+
+from app.core.config import settings
+from app.services.metrics_service import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+
+class FirebaseTokenVerifier:
+    def __init__(self, cache_size: int) -> None:
+        self.cache_size = cache_size
+        self._tokens: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._tokens_lock = threading.Lock()
+        self._inflight: dict[str, asyncio.Future[dict]] = {}
+
+    def _verify_sync(self, id_token: str) -> dict:
+        if not firebase_admin._apps:
+            raise ConnectionError("Cannot verify token, Firebase not initialized.")
+        try:
+            # Signature, exp, iat, auth_time, aud, iss and sub; no revocation check
+            claims: dict = auth.verify_id_token(id_token)
+            return claims
+        except auth.InvalidIdTokenError as e:
+            raise ValueError(f"Invalid ID token: {e}")
+
+    def _cached(self, key: str) -> Optional[dict]:
+        with self._tokens_lock:
+            entry = self._tokens.get(key)
+            if entry is None:
+                return None
+            claims, expires_at = entry
+            if expires_at <= time.time():
+                del self._tokens[key]
+                return None
+            self._tokens.move_to_end(key)
+            return claims
+
+    def _remember(self, key: str, claims: dict) -> None:
+        with self._tokens_lock:
+            self._tokens[key] = (claims, float(claims.get("exp", 0)))
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.cache_size:
+                self._tokens.popitem(last=False)
+
+    async def verify(self, id_token: str) -> dict:
+        """Decoded claims (with ``uid``) of a Firebase ID token; raises ValueError if it is invalid."""
+        key = hashlib.sha256(id_token.encode()).hexdigest()
+        claims = self._cached(key)
+        record_cache_lookup("auth_token", claims is not None)
+        if claims is not None:
+            return claims
+
+        # Concurrent requests with the same new token share one verification
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            claims = await asyncio.to_thread(self._verify_sync, id_token)
+            self._remember(key, claims)
+            future.set_result(claims)
+            return claims
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieved here so an unawaited future does not log "exception never retrieved"
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+
+token_verifier = FirebaseTokenVerifier(cache_size=settings.AUTH_TOKEN_CACHE_SIZE)
@@ -0,0 +1,189 @@
+"""
+Task Trace Service
+Usage:
+    trace = start_trace(task_id)
+    try:
+        with span("render"):
+            process = run_with_rusage(ffmpeg_cmd, "ffmpeg")
+    finally:
+        save_trace(trace.finish())
+
+    # API
+    trace = await get_trace(task_id)
+
+A trace is a tree of spans (pipeline stages, external calls, child processes) for one
+Celery task. ``stage_timer`` and ``external_call`` in metrics_service open spans
+automatically, so most of the pipeline is covered without extra code. Spans opened
+while no trace is active are no-ops. Finished traces are kept in Redis next to the
+Celery result.
+"""
+import io
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import IO, Any, Iterable, Iterator, Optional, Union
+
+import redis as redis_sync
+
+from app.core.config import settings
+from app.services.redis_service import get_shared_redis
+
+logger = logging.getLogger(__name__)
+
+TRACE_TTL_SECONDS = 24 * 3600  # Same as Celery's default result_expires
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("wizetale_trace_span", default=None)
+
+
+def _trace_key(task_id: str) -> str:
+    return f"task-trace:{task_id}"
+
+
+class Span:
+    def __init__(self, name: str, kind: str, origin: float) -> None:
+        self.name = name
+        self.kind = kind
+        self.origin = origin
+        self.started = time.perf_counter()
+        self.ended: Optional[float] = None
+        self.attributes: dict = {}
+        self.children: list["Span"] = []
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        ended = self.ended if self.ended is not None else time.perf_counter()
+        data: dict[str, Any] = {
+            "name": self.name,
+            "kind": self.kind,
+            "start": round(self.started - self.origin, 4),
+            "duration": round(ended - self.started, 4),
+        }
+        if self.attributes:
+            data["attributes"] = self.attributes
+        if self.error:
+            data["error"] = self.error
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+
+class TaskTrace:
+    """Root of a task's span tree; the root span is the current span until ``finish``."""
+
+    def __init__(self, task_id: str) -> None:
+        self.task_id = task_id
+        self.started_at = time.time()
+        self.root = Span("task", "task", time.perf_counter())
+        self._token = _current_span.set(self.root)
+
+    def finish(self, status: str = "SUCCESS") -> dict:
+        self.root.ended = time.perf_counter()
+        _current_span.reset(self._token)
+        return {
+            "task_id": self.task_id,
+            "status": status,
+            "started_at": self.started_at,
+            "duration": round(self.root.ended - self.root.started, 4),
+            "spans": [child.to_dict() for child in self.root.children],
+        }
+
+
+def start_trace(task_id: str) -> TaskTrace:
+    return TaskTrace(task_id)
+
+
+@contextmanager
+def span(name: str, kind: str = "stage", **attributes: Any) -> Iterator[Optional[Span]]:
+    """Record a child span of the current span; does nothing outside a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    current = Span(name, kind, parent.origin)
+    current.attributes.update(attributes)
+    parent.children.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.ended = time.perf_counter()
+        _current_span.reset(token)
+
+
+def annotate(**attributes: Any) -> None:
+    """Attach attributes (e.g. bytes transferred) to the current span."""
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+
+def _feed(pipe: IO[bytes], chunks: Iterable[Union[bytes, memoryview]], errors: list[BaseException]) -> None:
+    try:
+        for chunk in chunks:
+            pipe.write(chunk)
+    except BrokenPipeError:
+        pass  # The child stopped reading, e.g. ffmpeg -shortest at the end of the audio
+    except BaseException as e:
+        errors.append(e)
+    finally:
+        try:
+            pipe.close()
+        except BrokenPipeError:
+            pass
+
+
+def run_with_rusage(cmd: list[str], name: str, stdin: Optional[Iterable[Union[bytes, memoryview]]] = None) -> subprocess.CompletedProcess[str]:
+    """
+    Run a child process in its own span and record its CPU time and peak RSS.
+    The child is reaped with ``os.wait4`` so the usage is that of this child alone.
+    Stdout is discarded; stderr is captured as text. ``stdin`` chunks (bytes-like) are
+    written to the child from a thread while stderr is read; an exception raised while
+    producing them is re-raised once the child has exited.
+    """
+    with span(name, kind="process"):
+        process = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE if stdin is not None else None,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+        )
+        errors: list[BaseException] = []
+        feeder: Optional[threading.Thread] = None
+        if stdin is not None:
+            feeder = threading.Thread(target=_feed, args=(process.stdin, stdin, errors), name=f"{name}-stdin", daemon=True)
+            feeder.start()
+        assert process.stderr is not None
+        with io.TextIOWrapper(process.stderr, errors="replace") as stderr_text:
+            stderr = stderr_text.read()
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        if feeder:
+            feeder.join()
+        annotate(
+            returncode=process.returncode,
+            cpu_user_seconds=round(usage.ru_utime, 3),
+            cpu_system_seconds=round(usage.ru_stime, 3),
+            max_rss_mb=round(usage.ru_maxrss / 1024, 1),  # ru_maxrss is in KiB on Linux
+        )
+        if errors:
+            raise errors[0]
+        return subprocess.CompletedProcess(cmd, process.returncode, stdout="", stderr=stderr)
+
+
+def save_trace(trace: dict) -> None:
+    try:
+        client = redis_sync.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+        client.set(_trace_key(trace["task_id"]), json.dumps(trace, default=str), ex=TRACE_TTL_SECONDS)
+    except Exception as e:
+        logger.warning(f"Failed to save trace for task {trace['task_id']}: {e}")
+
+
+async def get_trace(task_id: str) -> Optional[dict]:
+    raw = await get_shared_redis().get(_trace_key(task_id))
+    return json.loads(raw) if raw else None
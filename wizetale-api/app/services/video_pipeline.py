@@ -0,0 +1,805 @@
+"""
+Video Generation Pipeline
+Usage:
+    pipeline = VideoGenerationPipeline(user_id=user_id, temp_dir=temp_dir)
+    story = pipeline.generate_story_text(subject, topic, language)
+    audio_path, duration = pipeline.generate_audio_from_text(story, voice, language)
+    images = pipeline.normalize_images(image_paths)   # drops unreadable downloads
+    video_path = pipeline.create_video_slideshow(audio_path, duration, images, story)
+
+    # New narration under an existing render (re-voice / re-language)
+    video_path = pipeline.remux_narration(rendered_path, audio_path, duration, story, subtitles="soft")
+
+Only the Celery worker imports this module. It pulls in the Azure Speech SDK, the
+OpenAI client and requests, which the API processes never need.
+"""
+import asyncio
+import logging
+import math
+import re
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Optional
+from uuid import uuid4
+
+import azure.cognitiveservices.speech as speechsdk
+import requests
+from openai import AzureOpenAI
+from PIL import Image, ImageOps
+
+from app.core.config import settings
+from app.services.metrics_service import external_call, stage_timer
+from app.services.motion_service import FRAME_RATE, ZOOM_MAX, ZOOM_STEP, slideshow_frames
+from app.services.runware_service import runware_service
+from app.services.trace_service import annotate, run_with_rusage
+
+logger = logging.getLogger(__name__)
+
+# Define base directory for static files
+static_dir = Path("static")
+
+
+# MP4 layouts for the rendered video. Both put the index before the media data,
+# so playback can start from the first bytes instead of fetching the file tail:
+# - faststart: a regular MP4 with the moov atom moved to the front after encoding
+#   (ffmpeg rewrites the file once at the end)
+# - fragmented: an empty moov followed by self-contained 2 s fragments; the file is
+#   only ever appended to, so it can be played and uploaded while it is still written
+CONTAINER_MOVFLAGS = {
+    "faststart": ['-movflags', '+faststart'],
+    "fragmented": ['-movflags', '+frag_keyframe+empty_moov+default_base_moof', '-g', '50'],
+}
+APPEND_ONLY_CONTAINERS = {"fragmented"}
+
+# Video encoder of the slideshow render (libx264 defaults: preset medium, CRF 23)
+VIDEO_ENCODER_ARGS = ['-c:v', 'libx264']
+
+# Subtitle delivery per render. Burn-in rasterizes the text onto every frame with libass;
+# the soft modes leave the frames alone and ship the text for the player to draw:
+# - webvtt: sidecar subtitles-<digest>.vtt next to the video (<track> in the web player)
+# - mov_text: subtitle track embedded in the MP4
+SUBTITLE_MODES = {
+    "burn": {"burn"},
+    "soft": {"webvtt", "mov_text"},
+    "webvtt": {"webvtt"},
+    "mov_text": {"mov_text"},
+    "none": set(),
+}
+
+# Ken Burns motion: ffmpeg's zoompan filter, or frames synthesized in NumPy
+# (motion_service) and piped to ffmpeg as raw video; both follow the same zoom path
+MOTION_ENGINES = ("zoompan", "numpy")
+
+# Output canvas; normalize_images brings every still to exactly this size
+RENDER_SIZE = (1280, 720)
+# Decoding and resampling release the GIL, so threads run in parallel (and, unlike a
+# process pool, work inside Celery's daemonic prefork children)
+NORMALIZE_WORKERS = 4
+
+# HLS renditions produced by package_hls: (height, video bitrate)
+HLS_LADDER = [(360, "800k"), (480, "1400k"), (720, "2800k")]
+HLS_SEGMENT_SECONDS = 4
+
+
+def media_duration(path: Path) -> float:
+    cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', str(path)]
+    return float(subprocess.check_output(cmd).decode('utf-8').strip())
+
+
+class VideoGenerationPipeline:
+    def __init__(self, user_id: str, temp_dir: Path):
+        """Initializes the pipeline with user and temporary directory context."""
+        self.user_id = user_id
+        self.temp_dir = temp_dir
+        self.user_dir = static_dir / self.user_id
+        # Outputs are written under a name unique to this job: jobs of one user (every
+        # API-key-only caller is "anonymous") run concurrently. The directory sits on the
+        # static volume, so publishing is an atomic rename into user_dir.
+        self.work_dir = self.user_dir / f".work-{self.temp_dir.name}"
+        self.output_video_path = self.work_dir / "video.mp4"
+        self.webvtt_path = self.work_dir / "subtitles.vtt"
+
+        # Ensure the user-specific directory exists
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Pipeline initialized for user '{user_id}' with temp dir '{temp_dir}' and user dir '{self.user_dir}'")
+
+    def cleanup(self) -> None:
+        """Remove this job's unpublished outputs."""
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def _clean_markdown_for_speech(self, text: str) -> str:
+        text = re.sub(r'\*\*(.*?)\*\*', r'\1', text)
+        text = re.sub(r'_(.*?)_', r'\1', text)
+        text = re.sub(r'#+\s*', '', text)
+        text = text.replace('\n', ' ').strip()
+        return text
+
+    def _seconds_to_srt_time(self, seconds: float) -> str:
+        millis = int((seconds - int(seconds)) * 1000)
+        mins, secs = divmod(int(seconds), 60)
+        hours, mins = divmod(mins, 60)
+        return f"{hours:02d}:{mins:02d}:{secs:02d},{millis:03d}"
+
+    def _create_subtitles(self, transcript: str, srt_file_path: Path, total_duration: float) -> None:
+        """
+        Create SRT subtitles with intelligent text segmentation and improved timing
+        """
+        # Clean the transcript first
+        clean_transcript = self._clean_markdown_for_speech(transcript)
+
+        # Split into sentences using multiple delimiters
+        import re
+        sentences = re.split(r'[.!?]+', clean_transcript)
+        sentences = [s.strip() for s in sentences if s.strip()]
+
+        if not sentences:
+            return
+
+        # Further split long sentences into phrases for better readability
+        phrases = []
+        for sentence in sentences:
+            # If sentence is too long (>80 chars), split it into phrases
+            if len(sentence) > 80:
+                # Split on common phrase boundaries
+                parts = re.split(r'[,;:]+|\s+(?:and|but|or|because|since|while|when|where|which|that|after|before|during|until)\s+', sentence)
+                parts = [p.strip() for p in parts if p.strip()]
+                phrases.extend(parts)
+            else:
+                phrases.append(sentence)
+
+        # Remove empty phrases and ensure minimum length
+        phrases = [p for p in phrases if len(p.strip()) > 5]
+
+        if not phrases:
+            # Fallback to original sentence splitting
+            phrases = sentences
+
+        num_phrases = len(phrases)
+
+        # Calculate timing based on phrase length and speech rate
+        phrase_timings = []
+        total_words = sum(len(phrase.split()) for phrase in phrases)
+
+        if total_words > 0:
+            words_per_second = total_words / total_duration
+
+            current_time = 0
+            for phrase in phrases:
+                words_in_phrase = len(phrase.split())
+                # Calculate duration based on word count with minimum/maximum bounds
+                phrase_duration = max(1.5, min(6.0, words_in_phrase / words_per_second))
+
+                # Add small pause between phrases (0.2-0.5 seconds)
+                pause_duration = 0.3 if len(phrase) > 40 else 0.2
+
+                start_time = current_time
+                end_time = current_time + phrase_duration
+
+                phrase_timings.append((start_time, end_time, phrase))
+                current_time = end_time + pause_duration
+        else:
+            # Fallback to equal distribution
+            duration_per_phrase = total_duration / num_phrases
+            for i, phrase in enumerate(phrases):
+                start_time = i * duration_per_phrase
+                end_time = (i + 1) * duration_per_phrase
+                phrase_timings.append((start_time, end_time, phrase))
+
+        # Write SRT file with improved timing
+        with open(srt_file_path, 'w', encoding='utf-8') as f:
+            for i, (start_time, end_time, phrase) in enumerate(phrase_timings):
+                # Ensure we don't exceed total duration
+                end_time = min(end_time, total_duration)
+
+                # Clean up the phrase
+                phrase = phrase.strip()
+                if not phrase.endswith(('.', '!', '?', ',', ';', ':')):
+                    phrase += '.'
+
+                # Ensure subtitle text is not too long (max 2 lines, ~45 chars per line)
+                if len(phrase) > 90:
+                    # Split into two lines at a natural break
+                    words = phrase.split()
+                    mid_point = len(words) // 2
+                    
+                    # Try to find a better split point near the middle
+                    for j in range(max(1, mid_point - 2), min(len(words), mid_point + 3)):
+                        if words[j-1].endswith((',', ';', ':', 'and', 'but', 'or')):
+                            mid_point = j
+                            break
+                    
+                    line1 = ' '.join(words[:mid_point])
+                    line2 = ' '.join(words[mid_point:])
+                    phrase = f"{line1}\n{line2}"
+
+                f.write(f"{i + 1}\n")
+                f.write(f"{self._seconds_to_srt_time(start_time)} --> {self._seconds_to_srt_time(end_time)}\n")
+                f.write(f"{phrase}\n\n")
+
+    def _srt_to_webvtt(self, srt_path: Path, vtt_path: Path) -> None:
+        """WebVTT is SRT with a header and '.' as the millisecond separator."""
+        srt = srt_path.read_text(encoding='utf-8')
+        cues = re.sub(r"(\d{2}:\d{2}:\d{2}),(\d{3})", r"\1.\2", srt)
+        vtt_path.write_text(f"WEBVTT\n\n{cues}", encoding='utf-8')
+
+    def _write_subtitles(self, transcript: str, duration: float, outputs: set[str]) -> Path:
+        """Writes the SRT (and the WebVTT sidecar) a subtitle mode needs; returns the SRT path."""
+        srt_path = self.temp_dir / "subtitles.srt"
+        if outputs:
+            self._create_subtitles(transcript, srt_path, duration)
+        if "webvtt" in outputs:
+            self._srt_to_webvtt(srt_path, self.webvtt_path)
+        return srt_path
+
+    def generate_story_text(self, subject: str, topic: str, language: str = "en-US") -> str:
+        logger.info(f"Generating story text in {language} with Azure OpenAI...")
+        try:
+            client = AzureOpenAI(
+                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+                api_key=settings.AZURE_OPENAI_API_KEY,
+                api_version="2024-02-01"
+            )
+
+            system_prompt = f"You are an expert storyteller. Your task is to generate a detailed and engaging narrative about '{topic}' in the style of {subject}. The story MUST be written entirely in {language}. Do not use any other language."
+
+            # More intelligent prompt selection based on the subject
+            if subject.lower() in ["history", "historical events", "historical figures"]:
+                user_prompt = f"""
+Act as an expert historian and storyteller. Your task is to generate a detailed and historically accurate narrative about '{topic}'.
+
+First, create a clear plan for the story. This plan should outline the key sections:
+1.  **Introduction:** Set the scene and introduce the core conflict or context.
+2.  **Key Causes & Background:** Explain the main reasons leading up to the event.
+3.  **Major Events & Turning Points:** Detail the most significant moments in chronological order. Mention key figures, dates, and locations.
+4.  **Climax:** Describe the peak of the event or conflict.
+5.  **Resolution & Aftermath:** Explain the outcome and its immediate consequences.
+6.  **Conclusion & Legacy:** Summarize the event's long-term significance and what we can learn from it.
+
+Second, based on that plan, write a comprehensive and engaging story of at least 1000 words.
+The narrative should be rich with detail, creating a vivid atmosphere for the reader.
+The output MUST be only the final story text, written in {language}, without the plan, titles, or any other introductory text.
+IMPORTANT: The entire story must be in {language}.
+"""
+            else:
+                user_prompt = f"""
+As an expert storyteller, write a captivating and immersive short story about '{topic}' within the context of {subject}.
+Focus on building a strong narrative, developing characters, and creating a vivid atmosphere that brings the subject to life.
+The tone should be engaging and imaginative, suitable for a curious adult.
+Do not write a simple summary or a children's fairy tale.
+Ensure the story is complete and has a clear beginning, middle, and end of at least 1000 words.
+The output must be only the story text itself, written in {language}, without any introductions, summaries, or author's notes.
+IMPORTANT: The entire story must be in {language}.
+"""
+
+            with external_call("azure_openai"):
+                response = client.chat.completions.create(
+                    model=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.7,
+                    max_tokens=3500
+                )
+            story = response.choices[0].message.content.strip()
+            logger.info(f"Successfully generated story text ({len(story)} chars) in {language}.")
+            return story
+        except Exception as e:
+            logger.error(f"Azure OpenAI text generation failed in {language}: {e}", exc_info=True)
+            raise
+
+    def translate_story(self, story: str, language: str) -> str:
+        logger.info(f"Translating story text to {language} with Azure OpenAI...")
+        try:
+            client = AzureOpenAI(
+                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+                api_key=settings.AZURE_OPENAI_API_KEY,
+                api_version="2024-02-01"
+            )
+            with external_call("azure_openai"):
+                response = client.chat.completions.create(
+                    model=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
+                    messages=[
+                        {"role": "system", "content": f"You are a literary translator. Translate the user's story into {language}. Keep the paragraph breaks, names and tone. The output must be only the translated story."},
+                        {"role": "user", "content": story}
+                    ],
+                    temperature=0.3,
+                    max_tokens=4000
+                )
+            translated = response.choices[0].message.content.strip()
+            logger.info(f"Successfully translated story text ({len(translated)} chars) to {language}.")
+            return translated
+        except Exception as e:
+            logger.error(f"Azure OpenAI translation to {language} failed: {e}", exc_info=True)
+            raise
+
+    def generate_audio_from_text(self, text: str, voice: str = "female", language: str = "en-US") -> tuple[str, float]:
+        logger.info(f"Generating audio in {language} with Azure Speech Service, voice '{voice}'...")
+        try:
+            speech_config = speechsdk.SpeechConfig(subscription=settings.AZURE_SPEECH_KEY, region=settings.AZURE_SPEECH_REGION)
+
+            # Set the output audio format for higher quality
+            speech_config.set_speech_synthesis_output_format(speechsdk.SpeechSynthesisOutputFormat.Audio24Khz160KBitRateMonoMp3)
+
+            # Select voice based on user choice
+            if voice.lower() == 'male':
+                voice_name = "en-US-Andrew:DragonHDLatestNeural"
+            else:  # Default to female
+                voice_name = "en-US-Ava:DragonHDLatestNeural"
+
+            speech_config.speech_synthesis_voice_name = voice_name
+
+            audio_file_path = self.temp_dir / f"{uuid4().hex}.mp3"
+
+            file_config = speechsdk.audio.AudioOutputConfig(filename=str(audio_file_path))
+            speech_synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=file_config)
+
+            # Using SSML to control the style of the speech and set language
+            ssml_text = f"""
+<speak version="1.0" xmlns="http://www.w3.org/2001/10/synthesis" xml:lang="{language}">
+<voice name="{voice_name}">
+{text}
+</voice>
+</speak>
+"""
+            with external_call("azure_speech"):
+                result = speech_synthesizer.speak_ssml_async(ssml_text).get()
+
+                if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+                    error_details = result.cancellation_details
+                    logger.error(f"Audio synthesis failed: {result.reason}. Details: {error_details}")
+                    raise Exception(f"Audio synthesis failed: {result.reason}. Details: {error_details}")
+
+            try:
+                cmd = ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', str(audio_file_path)]
+                duration_str = subprocess.check_output(cmd).decode('utf-8').strip()
+                duration = float(duration_str)
+            except (subprocess.CalledProcessError, FileNotFoundError):
+                # Fallback estimation if ffprobe is not available
+                audio_data = result.audio_data
+                duration = len(audio_data) / (24000 * 2)  # A rough estimate for 24kHz, 16-bit mono
+
+            logger.info(f"Audio generation successful. File: {audio_file_path}, Duration: {duration:.2f}s, Language: {language}")
+            return str(audio_file_path), duration
+        except Exception as e:
+            logger.error(f"Azure Speech audio generation failed: {e}", exc_info=True)
+            raise
+
+    def _generate_prompts_from_story(self, story_text: str, topic: str, count: int, language: str = "en-US") -> list[str]:
+        logger.info(f"Generating {count} image prompts from story text in {language}...")
+        try:
+            client = AzureOpenAI(
+                azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+                api_key=settings.AZURE_OPENAI_API_KEY,
+                api_version="2024-02-01"
+            )
+
+            if count == 1:
+                # For single image, create one comprehensive prompt
+                prompt_generation_prompt = f"""
+Based on the following story about '{topic}', create a single, comprehensive, and vivid prompt for an AI image generator.
+The story is written in {language}. The prompt you generate MUST be in English.
+The prompt should capture the essence and main theme of the entire story in a cinematic, photorealistic style.
+Focus on the most important visual elements, atmosphere, and setting that would best represent this story.
+The prompt must be in English and should be detailed but concise.
+
+Story:
+\"\"\"{story_text}\"\"\"
+
+Create a single image prompt that captures the story's essence (in English):
+"""
+
+                with external_call("azure_openai"):
+                    response = client.chat.completions.create(
+                        model=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
+                        messages=[{"role": "user", "content": prompt_generation_prompt}],
+                        temperature=0.7,
+                        max_tokens=200
+                    )
+
+                prompt = response.choices[0].message.content
+                if prompt:
+                    result = [prompt.strip().replace('"', '')]
+                    logger.info(f"Successfully generated single prompt: {result}")
+                    return result
+                else:
+                    logger.warning("OpenAI returned empty response for single prompt generation")
+                    return [f"A cinematic scene about {topic}"]
+
+            else:
+                # New logic: split story into paragraphs to preserve natural order.
+                paragraphs = [p.strip() for p in re.split(r"\n\s*\n", story_text) if p.strip()]
+
+                if not paragraphs:
+                    # Fallback: basic word chunking
+                    words = story_text.split()
+                    chunk_size = math.ceil(len(words) / count)
+                    paragraphs = [" ".join(words[i:i + chunk_size]) for i in range(0, len(words), chunk_size)]
+
+                # Adjust number of chunks to requested count
+                if len(paragraphs) > count:
+                    # Merge neighbouring paragraphs to fit exactly `count` chunks while preserving order
+                    merged_chunks = []
+                    chunk_size = math.ceil(len(paragraphs) / count)
+                    for i in range(0, len(paragraphs), chunk_size):
+                        merged_chunks.append(" ".join(paragraphs[i:i + chunk_size]))
+                    story_chunks = merged_chunks[:count]
+                else:
+                    story_chunks = paragraphs  # may be fewer than count; caller will still request same amount
+
+                # Step 2: Generate a prompt for each scene
+                prompts = []
+                for chunk in story_chunks:
+                    prompt_generation_prompt = f"""
+Based on the following story segment about '{topic}' (written in {language}), create a single, concise, and vivid prompt for an AI image generator.
+The prompt must be in English.
+The prompt should be in a "cinematic" or "photorealistic" style, focusing on visual details, atmosphere, and action.
+Do not just summarize the text. Create an artistic and descriptive instruction for generating a compelling image.
+
+Story Segment:
+\"\"\"{chunk}\"\"\"
+
+Prompt (in English):
+"""
+                    try:
+                        with external_call("azure_openai"):
+                            response = client.chat.completions.create(
+                                model=settings.AZURE_OPENAI_DEPLOYMENT_NAME,
+                                messages=[{"role": "user", "content": prompt_generation_prompt}],
+                                temperature=0.7,
+                                max_tokens=150
+                            )
+                        prompt = response.choices[0].message.content
+                        if prompt:
+                            prompts.append(prompt.strip().replace('"', ''))
+                        else:
+                            logger.warning("OpenAI returned empty response for prompt generation")
+                            prompts.append(f"A cinematic scene about {topic}")
+                    except Exception as e:
+                        logger.error(f"Error calling OpenAI for prompt generation: {e}")
+                        prompts.append(f"A cinematic scene about {topic}")
+
+                logger.info(f"Successfully generated {len(prompts)} prompts: {prompts}")
+                return prompts
+
+        except Exception as e:
+            logger.error(f"Failed to generate prompts from story: {e}")
+            return [f"A cinematic scene about {topic}" for _ in range(count)]
+
+    def generate_images_ai(self, topic: str, subject: str, story: str, count: int = 1, language: str = "en-US") -> list[str]:
+        logger.info(f"Generating {count} AI images for '{topic}'...")
+        try:
+            with stage_timer("prompts"):
+                image_prompts = self._generate_prompts_from_story(story, topic, count, language)
+            if not image_prompts:
+                logger.warning("Could not generate prompts from story.")
+                return []
+
+            # runware_service.generate_images_from_prompts is async, so we must run it in an event loop
+            with stage_timer("runware"):
+                ai_images = asyncio.run(runware_service.generate_images_from_prompts(image_prompts))
+
+            if ai_images and len(ai_images) >= count // 2:
+                logger.info(f"Successfully generated {len(ai_images)} images with Runware.")
+                return ai_images
+
+            logger.warning("Runware image generation failed or returned too few images.")
+            return []
+        except Exception as e:
+            logger.error(f"Image generation failed: {e}", exc_info=True)
+            return []
+
+    def download_image(self, url: str, path: Path) -> bool:
+        try:
+            with external_call("image_download"):
+                response = requests.get(url, stream=True, timeout=20)
+                response.raise_for_status()
+                size = 0
+                with open(path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        f.write(chunk)
+                        size += len(chunk)
+                annotate(bytes=size)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to download image {url}: {e}")
+            return False
+
+    def _normalize_image(self, source: str, target: Path) -> Optional[str]:
+        """Decode, center-crop and resize one still to RENDER_SIZE; None if it cannot be read."""
+        try:
+            with Image.open(source) as image:
+                # load() decodes the whole file, so truncated downloads fail here
+                image.load()
+                image = ImageOps.exif_transpose(image).convert("RGB")
+                image = ImageOps.fit(image, RENDER_SIZE, Image.Resampling.LANCZOS)
+            # Uncompressed: ffmpeg re-reads looped stills for every frame, BMP needs no decoding
+            image.save(target, "BMP")
+            return str(target)
+        except Exception as e:
+            logger.warning(f"⚠️ Skipping unreadable image {source}: {e}")
+            return None
+
+    def normalize_images(self, images: list[str]) -> list[str]:
+        """
+        Brings the downloaded stills to the render canvas once, before rendering, so the
+        filter graph does no per-frame scaling or padding. Corrupt or truncated files are
+        dropped (and logged) here instead of failing the ffmpeg run; order is preserved.
+        """
+        targets = [self.temp_dir / f"frame_{idx}.bmp" for idx in range(len(images))]
+        with stage_timer("normalize"), ThreadPoolExecutor(max_workers=min(NORMALIZE_WORKERS, len(images) or 1)) as pool:
+            normalized = list(pool.map(self._normalize_image, images, targets))
+        return [path for path in normalized if path]
+
+    def _split_transcript(self, transcript: str, n_chunks: int) -> list[str]:
+        """Splits the transcript into *roughly* ``n_chunks`` segments preserving order."""
+        # Try paragraph-based first
+        paragraphs = [p.strip() for p in re.split(r"\n\s*\n", transcript) if p.strip()]
+
+        if len(paragraphs) >= n_chunks:
+            # Merge paragraphs to fit exactly n_chunks
+            merged: list[str] = []
+            chunk_size = math.ceil(len(paragraphs) / n_chunks)
+            for i in range(0, len(paragraphs), chunk_size):
+                merged.append(" ".join(paragraphs[i:i + chunk_size]))
+            return merged[:n_chunks]
+
+        # Fallback: even word slicing
+        words = transcript.split()
+        if not words:
+            return [transcript] * n_chunks
+
+        chunk_word_len = math.ceil(len(words) / n_chunks)
+        return [" ".join(words[i:i + chunk_word_len]) for i in range(0, len(words), chunk_word_len)][:n_chunks]
+
+    def create_video_slideshow(self, audio_path: str, audio_duration: float, images: list[str], transcript: str, task_instance: Any = None, container: Optional[str] = None, subtitles: Optional[str] = None, encoder_args: Optional[list[str]] = None, motion: Optional[str] = None) -> str:
+        """
+        Renders the slideshow to ``self.output_video_path``. ``images`` must already be at
+        RENDER_SIZE (see normalize_images).
+        ``container`` selects the MP4 layout (see CONTAINER_MOVFLAGS); defaults to settings.VIDEO_CONTAINER_MODE.
+        ``subtitles`` is one of SUBTITLE_MODES, defaulting to settings.SUBTITLE_MODE; the webvtt modes
+        also write ``self.webvtt_path``. ``encoder_args`` replaces VIDEO_ENCODER_ARGS.
+        ``motion`` is one of MOTION_ENGINES, defaulting to settings.VIDEO_MOTION_ENGINE.
+        """
+        container = container or settings.VIDEO_CONTAINER_MODE
+        if container not in CONTAINER_MOVFLAGS:
+            raise ValueError(f"Unknown video container mode: {container}")
+        subtitles = subtitles or settings.SUBTITLE_MODE
+        if subtitles not in SUBTITLE_MODES:
+            raise ValueError(f"Unknown subtitle mode: {subtitles}")
+        subtitle_outputs = SUBTITLE_MODES[subtitles]
+        motion = motion or settings.VIDEO_MOTION_ENGINE
+        if motion not in MOTION_ENGINES:
+            raise ValueError(f"Unknown motion engine: {motion}")
+
+        if not images:
+            logger.error("No images provided for video slideshow.")
+            raise ValueError("Cannot create video without images.")
+
+        logger.info(f"Creating video slideshow with {len(images)} images and audio duration {audio_duration:.2f}s.")
+
+        # Ensure the final output directory exists
+        output_video_path = self.output_video_path
+
+        # Generate subtitles file
+        srt_path = self._write_subtitles(transcript, audio_duration, subtitle_outputs)
+
+        # Dynamically allocate durations based on transcript chunk lengths
+        chunks = self._split_transcript(transcript, len(images))
+        total_words = sum(len(c.split()) for c in chunks) or 1
+        durations: list[float] = []
+        for c in chunks:
+            chunk_words = len(c.split())
+            durations.append(audio_duration * chunk_words / total_words)
+
+        ffmpeg_cmd = ['ffmpeg', '-y']
+        filter_parts: list[str] = []
+        transition_dur = 1.0  # seconds for each cross-fade
+        cum_time = 0.0
+        frames_in = None
+
+        if motion == "numpy":
+            # The finished slideshow (motion and cross-fades) arrives as raw frames on stdin
+            ffmpeg_cmd.extend(['-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f"{RENDER_SIZE[0]}x{RENDER_SIZE[1]}",
+                               '-r', str(FRAME_RATE), '-i', 'pipe:0'])
+            frames_in = slideshow_frames(images, durations, transition_dur)
+            video_inputs = 1
+            final_label = "0:v"
+        else:
+            # Build ffmpeg inputs for each image (looped stills)
+            for idx, (image_path, dur) in enumerate(zip(images, durations)):
+                ffmpeg_cmd.extend(['-loop', '1', '-t', f"{dur + transition_dur}", '-i', image_path])
+                # Gentle Ken Burns (zoom); the stills are already canvas-sized, so no scale/pad
+                frames = int((dur + transition_dur) * FRAME_RATE)
+                filter_parts.append(
+                    # Start at original size (1.0) and zoom in to 1.1 with slight diagonal pan. fps=25 guarantees frame duplication for still images.
+                    f"[{idx}:v]zoompan=z='min(zoom+{ZOOM_STEP},{ZOOM_MAX})':fps={FRAME_RATE}:d={frames}:x='iw/2-(iw/zoom/2)+in*0.2':y='ih/2-(ih/zoom/2)+in*0.15':s={RENDER_SIZE[0]}x{RENDER_SIZE[1]},"
+                    f"setpts=PTS-STARTPTS[v{idx}]"
+                )
+
+            # Chain xfade filters
+            for idx in range(len(images) - 1):
+                offset = cum_time + durations[idx]  # start of transition
+                input_a = f"v{idx}" if idx == 0 else f"x{idx}"
+                input_b = f"v{idx + 1}"
+                out_label = f"x{idx + 1}"
+                filter_parts.append(f"[{input_a}][{input_b}]xfade=transition=fade:duration={transition_dur}:offset={offset}[{out_label}]")
+                cum_time += durations[idx]
+
+            video_inputs = len(images)
+            # Final video label
+            final_label = f"x{len(images) - 1}" if len(images) > 1 else "v0"
+
+        # Add subtitles overlay on the final composite if enabled
+        if "burn" in subtitle_outputs:
+            filter_parts.append(f"[{final_label}]subtitles={srt_path}:fontsdir=/usr/share/fonts[vout]")
+            final_label = "vout"
+
+        ffmpeg_cmd.extend(['-i', audio_path])
+        if "mov_text" in subtitle_outputs:
+            ffmpeg_cmd.extend(['-i', str(srt_path)])
+        if filter_parts:
+            ffmpeg_cmd.extend(['-filter_complex', ";".join(filter_parts), '-map', f"[{final_label}]"])
+        else:
+            ffmpeg_cmd.extend(['-map', final_label])
+        ffmpeg_cmd.extend(['-map', f"{video_inputs}:a"])
+        if "mov_text" in subtitle_outputs:
+            # Text samples muxed as-is: no rendering, negligible cost
+            ffmpeg_cmd.extend(['-map', f"{video_inputs + 1}:s", '-c:s', 'mov_text', '-disposition:s:0', 'default'])
+        ffmpeg_cmd.extend(encoder_args or VIDEO_ENCODER_ARGS)
+        ffmpeg_cmd.extend(['-c:a', 'aac', '-b:a', '192k', '-pix_fmt', 'yuv420p', '-shortest'])
+        ffmpeg_cmd.extend(CONTAINER_MOVFLAGS[container])
+        ffmpeg_cmd.append(str(output_video_path))
+        # Note: audio follows the video inputs (index video_inputs), then the SRT for mov_text
+        
+        try:
+            logger.info("Running ffmpeg command to create video...")
+            logger.debug(f"FFMPEG command: {' '.join(ffmpeg_cmd)}")
+
+            # Synchronous run; the child's CPU time and peak RSS go into the task trace
+            process = run_with_rusage(ffmpeg_cmd, "ffmpeg", stdin=frames_in)
+
+            # --- Progress reporting from stderr ---
+            if process.stderr:
+                time_regex = re.compile(r"time=(\d{2}):(\d{2}):(\d{2})\.(\d{2})")
+                last_reported_progress = -1
+                for line in process.stderr.splitlines():
+                    match = time_regex.search(line)
+                    if match:
+                        hours, mins, secs, ms = map(int, match.groups())
+                        processed_time = hours * 3600 + mins * 60 + secs + ms / 100
+                        
+                        if audio_duration > 0:
+                            progress = 85 + int((processed_time / audio_duration) * 10)
+                            progress = min(progress, 95)
+                            
+                            if task_instance and progress > last_reported_progress:
+                                logger.info(f"FFMPEG progress: {progress}% (processed {processed_time:.2f}s / {audio_duration:.2f}s)",
+                                            extra={"sample_rate": 0.2})
+                                task_instance.update_state(
+                                    state='PROGRESS',
+                                    meta={'progress': progress, 'message': f'Rendering video... {progress}%', 'step': 'video_creation'}
+                                )
+                                last_reported_progress = progress
+                    else:
+                        if line:
+                            logger.debug(f"ffmpeg_stderr: {line}")
+            # --- End of progress reporting ---
+
+            if process.returncode != 0:
+                logger.error(f"ffmpeg failed with return code {process.returncode}")
+                logger.error(f"ffmpeg stderr:\n{process.stderr}")
+                if process.stdout:
+                    logger.error(f"ffmpeg stdout:\n{process.stdout}")
+                raise RuntimeError("ffmpeg failed to create video. Check logs for details.")
+            else:
+                logger.info("ffmpeg command completed successfully.")
+                if process.stdout:
+                    logger.debug(f"ffmpeg stdout:\n{process.stdout}")
+
+            return str(output_video_path)
+        finally:
+            pass  # no temp concat file to remove now
+
+    def remux_narration(self, video_path: Path, audio_path: str, audio_duration: float, transcript: str, subtitles: str, container: Optional[str] = None) -> str:
+        """
+        Puts a new narration under an already rendered slideshow and writes it to
+        ``self.output_video_path``; the Ken Burns render is never repeated.
+
+        If the narration is longer or shorter, every cut moves with it: the video track's
+        timestamps are scaled by the duration ratio. Within REVOICE_MAX_STRETCH the
+        stream is copied as is; beyond it, or to burn ``subtitles`` in, it is re-encoded
+        at FRAME_RATE, which is still only one encode.
+        """
+        container = container or settings.VIDEO_CONTAINER_MODE
+        if container not in CONTAINER_MOVFLAGS:
+            raise ValueError(f"Unknown video container mode: {container}")
+        if subtitles not in SUBTITLE_MODES:
+            raise ValueError(f"Unknown subtitle mode: {subtitles}")
+        subtitle_outputs = SUBTITLE_MODES[subtitles]
+        srt_path = self._write_subtitles(transcript, audio_duration, subtitle_outputs)
+
+        stretch = audio_duration / media_duration(video_path)
+        reencode = "burn" in subtitle_outputs or abs(stretch - 1) > settings.REVOICE_MAX_STRETCH
+        logger.info(f"Remuxing narration onto {video_path}: stretch {stretch:.3f}, video {'re-encoded' if reencode else 'copied'}.")
+
+        ffmpeg_cmd = ['ffmpeg', '-y']
+        if abs(stretch - 1) > 0.001:
+            ffmpeg_cmd.extend(['-itsscale', f"{stretch:.6f}"])
+        ffmpeg_cmd.extend(['-i', str(video_path), '-i', audio_path])
+        if "mov_text" in subtitle_outputs:
+            ffmpeg_cmd.extend(['-i', str(srt_path)])
+        ffmpeg_cmd.extend(['-map', '0:v', '-map', '1:a'])
+        if "mov_text" in subtitle_outputs:
+            ffmpeg_cmd.extend(['-map', '2:s', '-c:s', 'mov_text', '-disposition:s:0', 'default'])
+        if reencode:
+            video_filter = f"fps={FRAME_RATE}"
+            if "burn" in subtitle_outputs:
+                video_filter += f",subtitles={srt_path}:fontsdir=/usr/share/fonts"
+            ffmpeg_cmd.extend(['-vf', video_filter, *VIDEO_ENCODER_ARGS, '-pix_fmt', 'yuv420p'])
+        else:
+            ffmpeg_cmd.extend(['-c:v', 'copy'])
+        ffmpeg_cmd.extend(['-c:a', 'aac', '-b:a', '192k', '-shortest'])
+        ffmpeg_cmd.extend(CONTAINER_MOVFLAGS[container])
+        ffmpeg_cmd.append(str(self.output_video_path))
+
+        logger.debug(f"FFMPEG command: {' '.join(ffmpeg_cmd)}")
+        process = run_with_rusage(ffmpeg_cmd, "ffmpeg")
+        if process.returncode != 0:
+            logger.error(f"ffmpeg remux failed with return code {process.returncode}")
+            logger.error(f"ffmpeg stderr:\n{process.stderr}")
+            raise RuntimeError("ffmpeg failed to remux the narration. Check logs for details.")
+        return str(self.output_video_path)
+
+    def package_hls(self, video_path: Path) -> Path:
+        """
+        Packages a rendered video into an HLS ladder (see HLS_LADDER) next to it and
+        returns the master playlist path.
+
+        The source is decoded once and the frames are split across the renditions,
+        so the slideshow is never rendered again. Keyframes are forced on segment
+        boundaries so players can switch renditions at any segment.
+        """
+        # Named after the video's content digest, so the URLs are as immutable as the video itself
+        digest = video_path.stem.rsplit("-", 1)[-1]
+        hls_dir = self.user_dir / f"hls-{digest}"
+        for height, _ in HLS_LADDER:
+            (hls_dir / f"{height}p").mkdir(parents=True, exist_ok=True)
+
+        split_labels = "".join(f"[s{height}]" for height, _ in HLS_LADDER)
+        # A remuxed video (-itsscale) no longer runs at FRAME_RATE; resampled so the GOP
+        # below lines keyframes up with segment boundaries
+        filter_parts = [f"[0:v]fps={FRAME_RATE},split={len(HLS_LADDER)}{split_labels}"]
+        filter_parts += [f"[s{height}]scale=-2:{height}[v{height}]" for height, _ in HLS_LADDER]
+
+        gop = HLS_SEGMENT_SECONDS * FRAME_RATE
+        ffmpeg_cmd = ['ffmpeg', '-y', '-i', str(video_path), '-filter_complex', ";".join(filter_parts)]
+        for idx, (height, bitrate) in enumerate(HLS_LADDER):
+            ffmpeg_cmd.extend(['-map', f"[v{height}]", f'-c:v:{idx}', 'libx264', f'-b:v:{idx}', bitrate, f'-maxrate:v:{idx}', bitrate, f'-bufsize:v:{idx}', bitrate])
+        for _ in HLS_LADDER:
+            # The narration is already AAC; every rendition shares it untouched
+            ffmpeg_cmd.extend(['-map', '0:a'])
+        ffmpeg_cmd.extend([
+            '-c:a', 'copy', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+            '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0',
+            '-f', 'hls', '-hls_time', str(HLS_SEGMENT_SECONDS), '-hls_playlist_type', 'vod',
+            '-hls_flags', 'independent_segments',
+            '-hls_segment_filename', str(hls_dir / "%v" / "segment_%03d.ts"),
+            '-master_pl_name', 'master.m3u8',
+            '-var_stream_map', " ".join(f"v:{idx},a:{idx},name:{height}p" for idx, (height, _) in enumerate(HLS_LADDER)),
+            str(hls_dir / "%v" / "index.m3u8"),
+        ])
+
+        logger.info(f"Packaging HLS ladder {[f'{h}p' for h, _ in HLS_LADDER]} into {hls_dir}...")
+        logger.debug(f"FFMPEG command: {' '.join(ffmpeg_cmd)}")
+        process = run_with_rusage(ffmpeg_cmd, "ffmpeg")
+        if process.returncode != 0:
+            logger.error(f"ffmpeg HLS packaging failed with return code {process.returncode}")
+            logger.error(f"ffmpeg stderr:\n{process.stderr}")
+            shutil.rmtree(hls_dir, ignore_errors=True)
+            raise RuntimeError("ffmpeg failed to package HLS. Check logs for details.")
+
+        logger.info("HLS packaging completed successfully.")
+        return hls_dir / "master.m3u8"
@@ -0,0 +1,442 @@
+"""
+Celery tasks of the video pipeline
+The worker registers them through celery_app's include list. The API enqueues them by
+name (see VIDEO_TASK_NAME in app.celery_utils) and never imports this module.
+"""
+import contextvars
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional, TypeVar
+from urllib.parse import unquote, urlparse
+
+import requests
+from celery import Task
+from celery.result import AsyncResult
+
+from app.celery_utils import REVOICE_TASK_NAME, VIDEO_TASK_NAME, celery_app
+from app.core.config import settings
+from app.services.eviction_service import pin_artifacts, unpin_artifacts
+from app.services.firebase_service import OverlappedUpload, firebase_service
+from app.services.media_service import IMMUTABLE_CACHE_CONTROL, publish_versioned
+from app.services.metrics_service import TASKS_IN_FLIGHT, stage_timer
+from app.services.persistence_service import record_story, record_task, record_usage
+from app.services.trace_service import save_trace, start_trace
+from app.services.video_pipeline import APPEND_ONLY_CONTAINERS, SUBTITLE_MODES, VideoGenerationPipeline, static_dir
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _start_upload(task_id: str, pipeline: VideoGenerationPipeline) -> Optional[OverlappedUpload]:
+    """Storage uploader for the video about to be written, or None to serve it locally."""
+    if not settings.STORAGE_UPLOAD_ENABLED:
+        return None
+    # Append-only containers can be shipped to storage while ffmpeg is still writing them
+    try:
+        return firebase_service.start_upload(
+            pipeline.output_video_path, f"uploads/{task_id}",
+            watch=settings.VIDEO_CONTAINER_MODE in APPEND_ONLY_CONTAINERS,
+        )
+    except Exception as e:
+        logger.warning(f"Storage upload unavailable, serving video locally: {e}")
+        return None
+
+
+def _publish_video(task: Task, pipeline: VideoGenerationPipeline, user_id: str, video_path: str, subtitles: str,
+                   uploader: Optional[OverlappedUpload]) -> dict:
+    """
+    Publishes a finished video (and its WebVTT sidecar) under content-addressed names,
+    completes or aborts ``uploader`` and packages HLS; returns the media URLs.
+    """
+    # Content-addressed name: the URL is immutable, so browsers and nginx can cache it forever
+    published_path = publish_versioned(Path(video_path), pipeline.user_dir)
+    relative_video_path = os.path.join(user_id, published_path.name)
+    video_url = f"/static/{relative_video_path}"
+    subtitles_url = None
+    if "webvtt" in SUBTITLE_MODES[subtitles]:
+        subtitles_path = publish_versioned(pipeline.webvtt_path, pipeline.user_dir)
+        subtitles_url = f"/static/{os.path.join(user_id, subtitles_path.name)}"
+
+    if uploader:
+        try:
+            with stage_timer("upload"):
+                video_url = uploader.finish(
+                    f"videos/{relative_video_path}",
+                    content_type="video/mp4",
+                    cache_control=IMMUTABLE_CACHE_CONTROL,
+                    source_path=published_path,
+                )
+        except Exception as e:
+            logger.error(f"Storage upload failed, serving video locally: {e}", exc_info=True)
+            uploader.abort()
+
+    hls_url = None
+    if settings.HLS_PACKAGING_ENABLED:
+        task.update_state(state='PROGRESS', meta={'progress': 97, 'message': 'Packaging adaptive streams...', 'step': 'video_packaging'})
+        try:
+            with stage_timer("package"):
+                master_playlist = pipeline.package_hls(published_path)
+            hls_url = f"/static/{master_playlist.relative_to(static_dir)}"
+        except Exception as e:
+            # The single MP4 is still served, so a packaging failure does not fail the task
+            logger.error(f"HLS packaging failed: {e}", exc_info=True)
+
+    return {'video_url': video_url, 'hls_url': hls_url, 'subtitles_url': subtitles_url}
+
+
+def _variant_key(variant: dict) -> str:
+    return f"{variant['language']}:{variant['voice']}"
+
+
+def _variants(request_data: dict) -> list[dict]:
+    """The (language, voice) pairs to produce, primary first; a plain request is one variant."""
+    requested = request_data.get('variants') or [
+        {'language': request_data.get('language', 'en-US'), 'voice': request_data.get('voice', 'female')}
+    ]
+    unique: dict[str, dict] = {}
+    for variant in requested:
+        variant = {'language': variant['language'], 'voice': variant.get('voice') or 'female'}
+        unique.setdefault(_variant_key(variant), variant)
+    return list(unique.values())
+
+
+def _narrate_variants(pipeline: VideoGenerationPipeline, story: str, variants: list[dict]) -> list[dict]:
+    """
+    Script and narration of every variant. The story is translated once per extra
+    language, and all variants are narrated in parallel; the Azure calls are I/O-bound.
+    """
+    primary = variants[0]['language']
+    languages = list(dict.fromkeys(v['language'] for v in variants if v['language'] != primary))
+    with ThreadPoolExecutor(max_workers=len(variants) + len(languages)) as pool:
+        def submit(fn: Callable[..., T], *args: Any) -> Future[T]:
+            # A copy of the task's context per call, so the calls land in its trace
+            return pool.submit(contextvars.copy_context().run, fn, *args)
+
+        translations = {language: submit(pipeline.translate_story, story, language) for language in languages}
+
+        def narrate(variant: dict) -> dict:
+            script = translations[variant['language']].result() if variant['language'] in translations else story
+            audio_path, duration = pipeline.generate_audio_from_text(script, variant['voice'], variant['language'])
+            return {**variant, 'script': script, 'audio_path': audio_path, 'duration': duration}
+
+        return [future.result() for future in [submit(narrate, variant) for variant in variants]]
+
+
+def _cleanup_temp_dir(temp_dir_str: Optional[str]) -> None:
+    # Clean up temporary files but keep the generated files in static directory
+    if temp_dir_str and Path(temp_dir_str).exists():
+        import shutil
+        try:
+            shutil.rmtree(temp_dir_str)
+            logger.info(f"Temporary directory {temp_dir_str} and its contents have been removed.")
+        except Exception as e:
+            logger.warning(f"Failed to remove temporary directory {temp_dir_str}: {e}")
+
+
+@celery_app.task(bind=True, name=VIDEO_TASK_NAME)
+def generate_story_video_task(self: Task, request_data: dict, user_id: str) -> dict:
+    """
+    Celery task to generate a story video.
+    This task is now fully synchronous.
+    """
+    temp_dir_str = None
+    pipeline = None
+    uploader = None
+    TASKS_IN_FLIGHT.inc()
+    trace = start_trace(self.request.id)
+    trace_status = "FAILURE"
+    error = None
+    try:
+        # Create a permanent directory for this task instead of temporary
+        temp_dir_str = f"/tmp/wizetale_task_{self.request.id}"
+        temp_dir_path = Path(temp_dir_str)
+        temp_dir_path.mkdir(exist_ok=True)
+
+        pipeline = VideoGenerationPipeline(user_id=user_id, temp_dir=temp_dir_path)
+        # Keep the eviction daemon out of the user's directory while this job writes into it
+        pin_artifacts(f"static/{user_id}", self.request.id)
+
+        # Unpack request data for easier access
+        subject = request_data['subject']
+        topic = request_data['topic']
+        variants = _variants(request_data)
+        # The story is written in the first variant's language
+        language = variants[0]['language']
+        voice = variants[0]['voice']
+        subtitles = request_data.get('subtitles') or settings.SUBTITLE_MODE
+        # Queued for the write-behind flusher; never waits on Firestore
+        record_task(self.request.id, user_id, "STARTED", subject=subject, topic=topic, language=language, voice=voice)
+
+        # Step 1: Text generation (0-20%)
+        self.update_state(state='PROGRESS', meta={'progress': 5, 'message': 'Generating story text...', 'step': 'text_generation'})
+        with stage_timer("story"):
+            story = pipeline.generate_story_text(subject, topic, language)
+        self.update_state(state='PROGRESS', meta={'progress': 20, 'message': 'Story text generated successfully!', 'step': 'text_generation'})
+
+        # Determine the number of images based on story length (number of paragraphs)
+        num_paragraphs = len([p for p in story.split('\n\n') if p.strip()])
+        image_count = max(5, min(20, num_paragraphs))  # Clamp between 5 and 20
+        logger.info(f"Story has {num_paragraphs} paragraphs, planning to generate {image_count} images.")
+
+        # Step 2: Audio generation (20-40%)
+        message = 'Generating audio narration...' if len(variants) == 1 else f'Narrating {len(variants)} variants...'
+        self.update_state(state='PROGRESS', meta={'progress': 25, 'message': message, 'step': 'audio_generation'})
+        with stage_timer("tts"):
+            narrations = _narrate_variants(pipeline, story, variants)
+        audio_path, audio_duration = narrations[0]['audio_path'], narrations[0]['duration']
+        self.update_state(state='PROGRESS', meta={'progress': 40, 'message': 'Audio narration completed!', 'step': 'audio_generation'})
+
+        # Step 3: Image generation (40-60%)
+        self.update_state(state='PROGRESS', meta={'progress': 45, 'message': f'Generating {image_count} images for the story...', 'step': 'image_generation'})
+        image_urls = pipeline.generate_images_ai(topic, subject, story, count=image_count, language=language)
+        if not image_urls:
+            raise ValueError("Failed to generate or find any images for the story.")
+        self.update_state(state='PROGRESS', meta={'progress': 60, 'message': f'Generated {len(image_urls)} images!', 'step': 'image_generation'})
+
+        # Step 4: Image download (60-80%)
+        self.update_state(state='PROGRESS', meta={'progress': 65, 'message': 'Downloading images...', 'step': 'image_download'})
+        downloaded_images = []
+
+        # Download images sequentially
+        with stage_timer("download"):
+            for i, url in enumerate(image_urls):
+                success = pipeline.download_image(url, temp_dir_path / f"image_{i}.jpg")
+                if success:
+                    downloaded_images.append(str(temp_dir_path / f"image_{i}.jpg"))
+
+        if not downloaded_images:
+            raise Exception("Failed to download any images for the video.")
+        # Decoded and cropped to the render canvas once; corrupt downloads are dropped here
+        downloaded_images = pipeline.normalize_images(downloaded_images)
+        if not downloaded_images:
+            raise Exception("None of the downloaded images could be decoded.")
+
+        self.update_state(state='PROGRESS', meta={'progress': 80, 'message': f'Downloaded {len(downloaded_images)} images successfully!', 'step': 'image_download'})
+
+        # Step 5: Video creation (80-100%)
+        self.update_state(state='PROGRESS', meta={'progress': 85, 'message': 'Creating video...' if subtitles == 'none' else 'Creating video with subtitles...', 'step': 'video_creation'})
+        variant_media = None
+        if len(variants) == 1:
+            uploader = _start_upload(self.request.id, pipeline)
+            with stage_timer("render"):
+                video_path = pipeline.create_video_slideshow(
+                    audio_path=audio_path,
+                    audio_duration=audio_duration,
+                    images=downloaded_images,
+                    transcript=story,
+                    task_instance=self,
+                    subtitles=subtitles,
+                )
+
+            self.update_state(state='PROGRESS', meta={'progress': 95, 'message': 'Finalizing video...', 'step': 'video_creation'})
+
+            media = _publish_video(self, pipeline, user_id, video_path, subtitles, uploader)
+            uploader = None
+        else:
+            # One slideshow without subtitles for all variants; each variant only gets its
+            # narration and subtitles remuxed in (see remux_narration)
+            with stage_timer("render"):
+                base_path = Path(pipeline.create_video_slideshow(
+                    audio_path=audio_path,
+                    audio_duration=audio_duration,
+                    images=downloaded_images,
+                    transcript=story,
+                    task_instance=self,
+                    subtitles='none',
+                ))
+            base_path = base_path.replace(pipeline.work_dir / "base.mp4")
+
+            variant_media = {}
+            for idx, narration in enumerate(narrations):
+                key = _variant_key(narration)
+                self.update_state(state='PROGRESS', meta={'progress': 95, 'message': f'Finalizing video {idx + 1} of {len(narrations)} ({key})...', 'step': 'video_creation'})
+                uploader = _start_upload(f"{self.request.id}-{idx}", pipeline)
+                with stage_timer("remux"):
+                    video_path = pipeline.remux_narration(
+                        base_path, narration['audio_path'], narration['duration'], narration['script'], subtitles,
+                    )
+                variant_media[key] = {
+                    **_publish_video(self, pipeline, user_id, video_path, subtitles, uploader),
+                    'language': narration['language'],
+                    'voice': narration['voice'],
+                    'script': narration['script'],
+                    'duration': narration['duration'],
+                }
+                uploader = None
+            primary = variant_media[_variant_key(variants[0])]
+            media = {k: primary[k] for k in ('video_url', 'hls_url', 'subtitles_url')}
+
+        logger.info(f"Task {self.request.id} completed. Video available at: {media['video_url']}")
+
+        trace_status = "SUCCESS"
+        result = {
+            'status': 'SUCCESS', 
+            **media,
+            'audio_url': f"/static/{os.path.join(user_id, 'audio.mp3')}",
+            'script': story,
+            'images_used': image_urls,
+            # What a re-voice of this video starts from, and who may start it
+            'user_id': user_id,
+            'language': language,
+            'voice': voice,
+            'subtitles': subtitles,
+            'duration': audio_duration,
+        }
+        if variant_media:
+            result['variants'] = variant_media
+        record_story(user_id, self.request.id, {
+            'task_id': self.request.id, 'subject': subject, 'topic': topic,
+            **{k: v for k, v in result.items() if k != 'status'},
+        })
+        record_usage(user_id, stories=1, video_seconds=sum(n['duration'] for n in narrations))
+        # Return the final result without updating state
+        return result
+
+    except Exception as e:
+        error = str(e)
+        raise
+
+    finally:
+        TASKS_IN_FLIGHT.dec()
+        # Kept for failed tasks too, that is when it is needed most
+        finished_trace = trace.finish(trace_status)
+        save_trace(finished_trace)
+        record_task(self.request.id, user_id, trace_status, duration_seconds=finished_trace["duration"], error=error)
+        if pipeline:
+            pipeline.cleanup()
+        unpin_artifacts(f"static/{user_id}", self.request.id)
+
+        if uploader:
+            # The render failed before the upload could be completed
+            uploader.abort()
+
+        _cleanup_temp_dir(temp_dir_str)
+
+
+def _source_video(video_url: str, user_id: str, temp_dir: Path) -> Path:
+    """Local copy of a finished task's video: the published file if it is still on disk, else a download."""
+    name = unquote(urlparse(video_url).path).rsplit("/", 1)[-1]
+    if video_url.startswith("/static/"):
+        local = static_dir / video_url[len("/static/"):]
+    else:
+        # Uploaded videos keep their published copy under the same name
+        local = static_dir / user_id / name
+    if local.exists():
+        return local
+    if not video_url.startswith(("http://", "https://")):
+        raise FileNotFoundError(f"Rendered video {video_url} is no longer available.")
+    target = temp_dir / name
+    with stage_timer("download"):
+        response = requests.get(video_url, stream=True, timeout=60)
+        response.raise_for_status()
+        with open(target, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                f.write(chunk)
+    return target
+
+
+@celery_app.task(bind=True, name=REVOICE_TASK_NAME)
+def revoice_story_video_task(self: Task, source_task_id: str, request_data: dict, user_id: str) -> dict:
+    """
+    Celery task to give a finished story video a new voice and/or language.
+    The rendered video track and the images are reused; only the narration and the
+    subtitles are produced again, then remuxed with the video stream copied.
+    """
+    temp_dir_str = None
+    pipeline = None
+    uploader = None
+    TASKS_IN_FLIGHT.inc()
+    trace = start_trace(self.request.id)
+    trace_status = "FAILURE"
+    error = None
+    try:
+        source = AsyncResult(source_task_id, app=celery_app)
+        # Only the owner's own videos; results from before ownership was recorded are not re-voiced
+        if not source.successful() or source.result.get('user_id') != user_id:
+            raise ValueError(f"Task {source_task_id} has no finished video to re-voice.")
+        source_result = source.result
+
+        temp_dir_str = f"/tmp/wizetale_task_{self.request.id}"
+        temp_dir_path = Path(temp_dir_str)
+        temp_dir_path.mkdir(exist_ok=True)
+
+        pipeline = VideoGenerationPipeline(user_id=user_id, temp_dir=temp_dir_path)
+        pin_artifacts(f"static/{user_id}", self.request.id)
+
+        source_language = source_result.get('language')
+        language = request_data.get('language') or source_language or 'en-US'
+        # Results from before re-voicing do not record a language; a requested one counts as new
+        relanguage = bool(request_data.get('language')) and language != source_language
+        voice = request_data.get('voice') or source_result.get('voice', 'female')
+        # Videos from before subtitle modes existed always had them burned in
+        source_subtitles = source_result.get('subtitles', 'burn')
+        subtitles = request_data.get('subtitles') or source_subtitles
+        if source_subtitles == 'burn':
+            if relanguage:
+                raise ValueError("The subtitles of this video are burned in; a new language needs a full render.")
+            # The burned-in text stays in the (re-timed) frames; nothing to add
+            subtitles = 'burn'
+        record_task(self.request.id, user_id, "STARTED", source_task_id=source_task_id, language=language, voice=voice)
+
+        story = source_result['script']
+        if relanguage:
+            self.update_state(state='PROGRESS', meta={'progress': 10, 'message': f'Translating story to {language}...', 'step': 'text_generation'})
+            with stage_timer("story"):
+                story = pipeline.translate_story(story, language)
+
+        self.update_state(state='PROGRESS', meta={'progress': 30, 'message': 'Generating audio narration...', 'step': 'audio_generation'})
+        with stage_timer("tts"):
+            audio_path, audio_duration = pipeline.generate_audio_from_text(story, voice, language)
+
+        self.update_state(state='PROGRESS', meta={'progress': 70, 'message': 'Replacing narration...', 'step': 'video_creation'})
+        source_video = _source_video(source_result['video_url'], user_id, temp_dir_path)
+        uploader = _start_upload(self.request.id, pipeline)
+        with stage_timer("remux"):
+            video_path = pipeline.remux_narration(
+                source_video, audio_path, audio_duration, story,
+                # Already burned in: burning again would print the text twice
+                subtitles='none' if source_subtitles == 'burn' else subtitles,
+            )
+
+        self.update_state(state='PROGRESS', meta={'progress': 95, 'message': 'Finalizing video...', 'step': 'video_creation'})
+        media = _publish_video(self, pipeline, user_id, video_path, subtitles, uploader)
+        uploader = None
+
+        logger.info(f"Task {self.request.id} re-voiced {source_task_id}. Video available at: {media['video_url']}")
+
+        trace_status = "SUCCESS"
+        result = {
+            'status': 'SUCCESS',
+            **media,
+            'audio_url': f"/static/{os.path.join(user_id, 'audio.mp3')}",
+            'script': story,
+            'images_used': source_result.get('images_used', []),
+            'user_id': user_id,
+            'language': language,
+            'voice': voice,
+            'subtitles': subtitles,
+            'duration': audio_duration,
+            'source_task_id': source_task_id,
+        }
+        record_story(user_id, self.request.id, {'task_id': self.request.id, **{k: v for k, v in result.items() if k != 'status'}})
+        record_usage(user_id, stories=1, video_seconds=audio_duration)
+        return result
+
+    except Exception as e:
+        error = str(e)
+        raise
+
+    finally:
+        TASKS_IN_FLIGHT.dec()
+        finished_trace = trace.finish(trace_status)
+        save_trace(finished_trace)
+        record_task(self.request.id, user_id, trace_status, duration_seconds=finished_trace["duration"], error=error)
+        if pipeline:
+            pipeline.cleanup()
+        unpin_artifacts(f"static/{user_id}", self.request.id)
+        if uploader:
+            uploader.abort()
+        _cleanup_temp_dir(temp_dir_str)
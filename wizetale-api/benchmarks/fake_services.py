@@ -0,0 +1,255 @@
+"""
+Local stand-ins for the external services used by the video pipeline
+Usage:
+    profile = ServiceProfile.parse(["runware=3.0"], ["runware=0.05"])
+    with FakeServices(profile) as fakes:
+        settings.AZURE_OPENAI_ENDPOINT = fakes.base_url
+        runware_service.base_url = f"{fakes.base_url}/v1"
+
+One threaded HTTP server answers:
+- POST /openai/deployments/<name>/chat/completions   (Azure OpenAI chat completions)
+- POST /v1/tasks                                      (Runware imageInference batches)
+- GET  /images/<id>.jpg                               (the image URLs returned by Runware)
+
+Azure Speech talks a websocket protocol through its native SDK, so it is replaced
+in-process by ``fake_speech`` instead, which writes a sine tone of the expected length.
+Every service has a latency (mean seconds, +/- jitter) and an error rate.
+"""
+import io
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+import wave
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+from uuid import uuid4
+
+from PIL import Image, ImageDraw
+
+SERVICES = ["azure_openai", "azure_speech", "runware", "image_download"]
+
+DEFAULT_LATENCY = {
+    "azure_openai": 0.5,
+    "azure_speech": 2.0,
+    "runware": 3.0,
+    "image_download": 0.05,
+}
+
+WORDS = ("river mountain ancient kingdom merchant voyage storm lantern harbor empire "
+         "scholar forest bridge festival winter caravan temple garden market legend").split()
+
+SPEECH_WORDS_PER_SECOND = 2.5  # ~150 words per minute
+SPEECH_SAMPLE_RATE = 24000
+
+
+class FakeServiceError(Exception):
+    pass
+
+
+@dataclass
+class ServiceProfile:
+    latency: dict[str, float] = field(default_factory=lambda: dict(DEFAULT_LATENCY))
+    error_rate: dict[str, float] = field(default_factory=dict)
+    jitter: float = 0.2  # latency is drawn uniformly from mean * (1 +/- jitter)
+    story_paragraphs: int = 8
+    paragraph_words: int = 40
+
+    @staticmethod
+    def _pairs(values: list[str]) -> dict[str, float]:
+        parsed: dict[str, float] = {}
+        for value in values or []:
+            name, _, number = value.partition("=")
+            if name not in SERVICES:
+                raise ValueError(f"Unknown service '{name}', expected one of {SERVICES}")
+            parsed[name] = float(number)
+        return parsed
+
+    @classmethod
+    def parse(cls, latencies: list[str], error_rates: list[str], **kwargs: Any) -> "ServiceProfile":
+        """Build a profile from ``service=value`` command line pairs."""
+        profile = cls(**kwargs)
+        profile.latency.update(cls._pairs(latencies))
+        profile.error_rate.update(cls._pairs(error_rates))
+        return profile
+
+    def delay(self, service: str) -> None:
+        mean = self.latency.get(service, 0)
+        if mean > 0:
+            time.sleep(random.uniform(mean * (1 - self.jitter), mean * (1 + self.jitter)))
+
+    def fails(self, service: str) -> bool:
+        return random.random() < self.error_rate.get(service, 0)
+
+
+def make_story(paragraphs: int, words: int) -> str:
+    return "\n\n".join(
+        " ".join(random.choice(WORDS) for _ in range(words)).capitalize() + "."
+        for _ in range(paragraphs)
+    )
+
+
+def make_images(count: int = 8, size: tuple[int, int] = (1280, 768)) -> list[bytes]:
+    """Distinct JPEGs with enough detail that the encoder has real work to do."""
+    images = []
+    for n in range(count):
+        rng = random.Random(n)
+        image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        for _ in range(60):
+            x, y = rng.randrange(size[0]), rng.randrange(size[1])
+            r = rng.randrange(20, 200)
+            draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def write_tone(path: Path, seconds: float, frequency: int = 220) -> float:
+    """16-bit mono sine tone; one period is computed and repeated."""
+    period = SPEECH_SAMPLE_RATE // frequency
+    cycle = b"".join(
+        struct.pack("<h", int(8000 * math.sin(2 * math.pi * i / period))) for i in range(period)
+    )
+    periods = int(seconds * SPEECH_SAMPLE_RATE / period)
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SPEECH_SAMPLE_RATE)
+        f.writeframes(cycle * periods)
+    return periods * period / SPEECH_SAMPLE_RATE
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_FakeServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Any) -> None:
+        self._send(status, json.dumps(payload).encode("utf-8"))
+
+    def _read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"null")
+
+    def do_POST(self) -> None:
+        profile = self.server.profile
+        payload = self._read_json()
+
+        if re.match(r"^/openai/deployments/[^/]+/chat/completions", self.path):
+            profile.delay("azure_openai")
+            if profile.fails("azure_openai"):
+                self._send_json(500, {"error": {"code": "InternalServerError", "message": "fake failure"}})
+                return
+            # The story request asks for a long completion, prompt requests for a short one
+            if payload.get("max_tokens", 0) > 1000:
+                content = make_story(profile.story_paragraphs, profile.paragraph_words)
+            else:
+                content = "A cinematic photorealistic scene of " + " ".join(random.sample(WORDS, 8))
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "fake",
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+            return
+
+        if self.path == "/v1/tasks":
+            profile.delay("runware")
+            if profile.fails("runware"):
+                self._send_json(500, {"errors": [{"message": "fake failure"}]})
+                return
+            data = [
+                {
+                    "taskType": "imageInference",
+                    "taskUUID": task["taskUUID"],
+                    "imageUUID": str(uuid4()),
+                    "imageURL": f"{self.server.base_url}/images/{n % len(self.server.images)}-{uuid4().hex}.jpg",
+                    "cost": 0,
+                }
+                for n, task in enumerate(payload)
+            ]
+            self._send_json(200, {"data": data})
+            return
+
+        self._send_json(404, {"error": "not found"})
+
+    def do_GET(self) -> None:
+        match = re.match(r"^/images/(\d+)-[0-9a-f]+\.jpg$", self.path)
+        if not match:
+            self._send_json(404, {"error": "not found"})
+            return
+        profile = self.server.profile
+        profile.delay("image_download")
+        if profile.fails("image_download"):
+            self._send_json(503, {"error": "fake failure"})
+            return
+        self._send(200, self.server.images[int(match.group(1))], "image/jpeg")
+
+
+class _FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, profile: ServiceProfile):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.profile = profile
+        self.images = make_images()
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeServices:
+    """Runs the fake HTTP services in a background thread for the duration of a ``with`` block."""
+
+    def __init__(self, profile: ServiceProfile):
+        self.profile = profile
+        self.server = _FakeServer(profile)
+        self.base_url = self.server.base_url
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "FakeServices":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def fake_speech(profile: ServiceProfile) -> Callable[..., tuple[str, float]]:
+    """
+    Replacement for ``VideoGenerationPipeline.generate_audio_from_text`` that keeps the
+    metrics/trace accounting of the real call and writes a tone as long as the narration.
+    """
+    from app.services.metrics_service import external_call
+
+    def generate_audio_from_text(pipeline: Any, text: str, voice: str = "female", language: str = "en-US") -> tuple[str, float]:
+        audio_file_path = pipeline.temp_dir / f"{uuid4().hex}.wav"
+        with external_call("azure_speech"):
+            profile.delay("azure_speech")
+            if profile.fails("azure_speech"):
+                raise FakeServiceError("Audio synthesis failed: fake failure")
+            duration = write_tone(audio_file_path, max(1.0, len(text.split()) / SPEECH_WORDS_PER_SECOND))
+        return str(audio_file_path), duration
+
+    return generate_audio_from_text
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+API load test replaying a recorded request mix
+Virtual users pick requests from a traffic mix (JSONL, see traffic_mix.jsonl) by weight
+and replay them at the given concurrency. The report gives throughput, p50/p95/p99
+latency and error rate per route.
+
+Usage (from wizetale-api/):
+    # Start the FastAPI app in-process with Celery and the pipeline stubbed out
+    python -m benchmarks.load_test --local --concurrency 50 --duration 60
+
+    # Against a running deployment; generate entries are skipped unless --allow-generate
+    python -m benchmarks.load_test --url http://localhost:8000 --api-key $API_KEY \\
+        --task-id <id> --video-path /static/<uid>/video-<digest>.mp4
+
+Mix entries: ``{"route", "method", "path", "headers", "body", "weight"}`` for HTTP or
+``{"route", "ws", "weight"}`` for a websocket (latency = time to the first message).
+``{task_id}`` and ``{video_path}`` in paths are filled from tasks created during the run
+or from the command line. Any status below 400 counts as success (an entry may list its
+own ``ok_statuses``); 429 counts as an error.
+In --local mode, Redis is used when REDIS_URL is reachable and skipped with warnings otherwise.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Union
+from uuid import uuid4
+
+import httpx
+
+os.environ.setdefault("REDIS_URL", "redis://127.0.0.1:6379/0")
+
+from benchmarks.report import environment, print_table, summarize, write_json
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+DEFAULT_MIX = Path(__file__).with_name("traffic_mix.jsonl")
+LOCAL_API_KEY = "load-test"
+
+
+def load_mix(path: Path) -> list[dict]:
+    entries = [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+    for entry in entries:
+        entry.setdefault("route", entry.get("path") or entry.get("ws"))
+        entry.setdefault("weight", 1)
+    return entries
+
+
+class RouteStats:
+    def __init__(self) -> None:
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.statuses: dict[str, int] = {}
+
+    def record(self, latency: float, status: Union[int, str], ok: bool) -> None:
+        self.latencies.append(latency)
+        self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+        if not ok:
+            self.errors += 1
+
+
+class LoadTest:
+    def __init__(self, base_url: str, entries: list[dict], api_key: str, task_ids: list[str], video_path: str,
+                 allow_generate: bool):
+        self.base_url = base_url.rstrip("/")
+        self.ws_url = "ws" + self.base_url[len("http"):]
+        self.api_key = api_key
+        self.task_ids = list(task_ids)
+        self.video_path = video_path
+        self.stats: dict[str, RouteStats] = {}
+
+        usable = []
+        for entry in entries:
+            if entry.get("ws") and websockets is None:
+                logging.warning(f"⚠️ websockets is not installed, skipping {entry['route']}")
+            elif entry.get("path") == "/api/v1/generate" and not allow_generate:
+                logging.warning(f"⚠️ Skipping {entry['route']} (pass --allow-generate to start real jobs)")
+            elif "{video_path}" in entry.get("path", "") and not video_path:
+                logging.warning(f"⚠️ Skipping {entry['route']} (no --video-path)")
+            else:
+                usable.append(entry)
+        self.entries = usable
+        self.weights = [entry["weight"] for entry in usable]
+
+    def _fill(self, template: str) -> str:
+        return template.replace("{task_id}", random.choice(self.task_ids)).replace("{video_path}", self.video_path)
+
+    async def _http(self, client: httpx.AsyncClient, entry: dict) -> tuple:
+        headers = dict(entry.get("headers", {}))
+        if self.api_key:
+            headers["X-API-KEY"] = self.api_key
+        response = await client.request(entry.get("method", "GET"), self._fill(entry["path"]),
+                                        headers=headers, json=entry.get("body"))
+        await response.aread()
+        if entry.get("path") == "/api/v1/generate" and response.status_code == 202:
+            self.task_ids.append(response.json()["task_id"])
+        if "ok_statuses" in entry:
+            return response.status_code, response.status_code in entry["ok_statuses"]
+        return response.status_code, response.status_code < 400
+
+    async def _ws(self, entry: dict) -> tuple:
+        async with websockets.connect(self.ws_url + self._fill(entry["ws"])) as ws:
+            await ws.recv()
+        return 101, True
+
+    async def _user(self, client: httpx.AsyncClient, deadline: float, budget: list[float]) -> None:
+        while time.monotonic() < deadline and budget[0] > 0:
+            budget[0] -= 1
+            entry = random.choices(self.entries, self.weights)[0]
+            if ("{task_id}" in json.dumps(entry)) and not self.task_ids:
+                continue
+            started = time.perf_counter()
+            try:
+                if entry.get("ws"):
+                    status, ok = await self._ws(entry)
+                else:
+                    status, ok = await self._http(client, entry)
+            except Exception as e:
+                status, ok = type(e).__name__, False
+            self.stats.setdefault(entry["route"], RouteStats()).record(time.perf_counter() - started, status, ok)
+
+    async def run(self, concurrency: int, duration: float, max_requests: int) -> float:
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=30) as client:
+            budget = [max_requests or float("inf")]
+            deadline = time.monotonic() + duration
+            started = time.perf_counter()
+            await asyncio.gather(*(self._user(client, deadline, budget) for _ in range(concurrency)))
+            return time.perf_counter() - started
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_local_app(workdir: Path, task_seconds: float, disable_limits: bool) -> tuple[str, str, list[str]]:
+    """
+    Serve app.main in a background uvicorn thread. Celery uses an in-memory result backend
+    and celery_app.send_task is replaced by a stub that reports progress and
+    succeeds after ``task_seconds``, so no broker, worker or external service is needed.
+    """
+    import uvicorn
+
+    os.chdir(workdir)
+    from app.celery_utils import VIDEO_TASK_NAME, celery_app
+    from app.core.config import settings
+    from app.main import app
+    from app.services.media_service import publish_versioned
+
+    settings.API_KEY = LOCAL_API_KEY
+    settings.MEDIA_ACCEL_REDIRECT_PREFIX = None
+    celery_app.conf.result_backend = "cache+memory://"
+    settings.RATE_LIMIT_ENABLED = not disable_limits
+
+    video = Path("static/loadtest/video.mp4")
+    video.parent.mkdir(parents=True, exist_ok=True)
+    video.write_bytes(os.urandom(8 * 1024 * 1024))
+    video_path = f"/{publish_versioned(video)}"
+
+    def send_task(name: str, args: list, **kwargs: Any) -> SimpleNamespace:
+        task_id = str(uuid4())
+        backend = celery_app.backend
+        backend.store_result(task_id, {"progress": 25, "message": "Generating audio narration...", "step": "audio_generation"}, "PROGRESS")
+        result = {"status": "SUCCESS", "video_url": video_path, "hls_url": None, "audio_url": None,
+                  "script": "Load test story.", "images_used": []}
+        threading.Timer(task_seconds, backend.store_result, args=(task_id, result, "SUCCESS")).start()
+        return SimpleNamespace(id=task_id)
+
+    celery_app.send_task = send_task
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    # A finished task so status/result/ws entries have something to read from the start
+    seed = send_task(VIDEO_TASK_NAME, [{}, "loadtest"]).id
+    celery_app.backend.store_result(seed, {"status": "SUCCESS", "video_url": video_path}, "SUCCESS")
+    return f"http://127.0.0.1:{port}", video_path, [seed]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay a request mix against the API")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running API")
+    target.add_argument("--local", action="store_true", help="Start the app in-process with stubbed Celery")
+    parser.add_argument("--mix", type=Path, default=DEFAULT_MIX)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests")
+    parser.add_argument("--api-key", default=os.getenv("API_KEY"))
+    parser.add_argument("--task-id", action="append", default=[], help="Existing task id for status entries")
+    parser.add_argument("--video-path", help="URL path of a video for range entries")
+    parser.add_argument("--allow-generate", action="store_true", help="Replay POST /generate against --url")
+    parser.add_argument("--task-seconds", type=float, default=20, help="--local: time until a stub task succeeds")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="--local: keep the API rate limits")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the report to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+    random.seed(args.seed)
+    json_path = os.path.abspath(args.json) if args.json else None
+    entries = load_mix(args.mix.resolve())
+
+    workdir = None
+    if args.local:
+        workdir = Path(tempfile.mkdtemp(prefix="wizetale-load-test-"))
+        base_url, video_path, task_ids = start_local_app(workdir, args.task_seconds, not args.keep_rate_limits)
+        api_key, allow_generate = LOCAL_API_KEY, True
+    else:
+        base_url, video_path, task_ids = args.url, args.video_path, args.task_id
+        api_key, allow_generate = args.api_key, args.allow_generate
+
+    test = LoadTest(base_url, entries, api_key, task_ids, video_path, allow_generate)
+    print(f"🚀 Replaying {len(test.entries)} request kinds from {args.mix.name} against {base_url} "
+          f"with {args.concurrency} users for {args.duration:.0f}s")
+    wall = asyncio.run(test.run(args.concurrency, args.duration, args.requests))
+
+    total = sum(len(s.latencies) for s in test.stats.values())
+    routes = {}
+    for route, stats in test.stats.items():
+        routes[route] = {
+            **summarize(stats.latencies),
+            "throughput_rps": round(len(stats.latencies) / wall, 1),
+            "error_rate": round(stats.errors / len(stats.latencies), 4) if stats.latencies else 0.0,
+            "statuses": stats.statuses,
+        }
+    report = {
+        "environment": environment(),
+        "target": base_url,
+        "concurrency": args.concurrency,
+        "wall_seconds": round(wall, 2),
+        "requests": total,
+        "throughput_rps": round(total / wall, 1) if wall else 0.0,
+        "routes": routes,
+    }
+
+    print(f"\n✅ {total} requests in {wall:.1f}s → {report['throughput_rps']} req/s")
+    print_table("Latency per route (seconds)", routes)
+    print(f"\n{'route':<24}{'req/s':>9}{'errors':>9}  statuses")
+    for route, stats in sorted(routes.items()):
+        print(f"{route:<24}{stats['throughput_rps']:>9}{stats['error_rate']:>9.2%}  {stats['statuses']}")
+
+    if json_path:
+        write_json(json_path, report)
+    if workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Offline end-to-end benchmark of the video pipeline
+Runs VideoGenerationPipeline (--mode pipeline) or generate_story_video_task (--mode task,
+executed eagerly without a broker) against the local fakes in fake_services.py, and
+reports jobs/hour, per-stage and per-service p50/p95, ffmpeg CPU time and peak memory.
+
+Usage (from wizetale-api/, ffmpeg must be installed):
+    python -m benchmarks.pipeline_benchmark --jobs 6 --concurrency 2
+    python -m benchmarks.pipeline_benchmark --mode task --latency runware=5 --error-rate runware=0.1 --json report.json
+
+Jobs run in threads of one process; every job still renders in its own ffmpeg child.
+All output goes to a temporary working directory that is removed unless --keep is given.
+"""
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import ModuleType
+
+# Must be set before app.core.config is imported
+os.environ.setdefault("REDIS_URL", "redis://127.0.0.1:6379/0")
+
+from benchmarks.fake_services import FakeServices, ServiceProfile, fake_speech
+from benchmarks.report import environment, peak_memory_mb, print_table, summarize, write_json
+
+logger = logging.getLogger("pipeline_benchmark")
+
+
+def _collect_spans(spans: list[dict], stages: dict, external: dict, processes: list) -> None:
+    for span in spans:
+        if span["kind"] == "stage":
+            stages.setdefault(span["name"], []).append(span["duration"])
+        elif span["kind"] == "external":
+            external.setdefault(span["name"], []).append(span["duration"])
+        elif span["kind"] == "process":
+            processes.append(span)
+        _collect_spans(span.get("children", []), stages, external, processes)
+
+
+def _run_pipeline_job(job_id: str, request_data: dict) -> dict:
+    """The task's stage sequence, called directly on VideoGenerationPipeline."""
+    from app.services.metrics_service import stage_timer
+    from app.services.trace_service import start_trace
+    from app.services.video_pipeline import VideoGenerationPipeline
+
+    temp_dir = Path(tempfile.mkdtemp(prefix=f"wizetale_bench_{job_id}_"))
+    pipeline = VideoGenerationPipeline(user_id=f"bench-{job_id}", temp_dir=temp_dir)
+    trace = start_trace(job_id)
+    status = "FAILURE"
+    try:
+        with stage_timer("story"):
+            story = pipeline.generate_story_text(request_data["subject"], request_data["topic"])
+        paragraphs = [p for p in story.split("\n\n") if p.strip()]
+        image_count = max(5, min(20, len(paragraphs)))
+        with stage_timer("tts"):
+            audio_path, audio_duration = pipeline.generate_audio_from_text(story)
+        image_urls = pipeline.generate_images_ai(request_data["topic"], request_data["subject"], story, count=image_count)
+        if not image_urls:
+            raise ValueError("Failed to generate or find any images for the story.")
+        images = []
+        with stage_timer("download"):
+            for i, url in enumerate(image_urls):
+                if pipeline.download_image(url, temp_dir / f"image_{i}.jpg"):
+                    images.append(str(temp_dir / f"image_{i}.jpg"))
+        images = pipeline.normalize_images(images)
+        with stage_timer("render"):
+            pipeline.create_video_slideshow(audio_path, audio_duration, images, story)
+        status = "SUCCESS"
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {e}")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    return trace.finish(status)
+
+
+def _run_task_job(video_tasks: ModuleType, job_id: str, request_data: dict, traces: dict) -> dict:
+    result = video_tasks.generate_story_video_task.apply(args=(request_data, f"bench-{job_id}"), task_id=job_id)
+    if not result.successful():
+        logger.error(f"Job {job_id} failed: {result.result}")
+    return traces.pop(job_id)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline video pipeline benchmark")
+    parser.add_argument("--mode", choices=["pipeline", "task"], default="pipeline")
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--latency", action="append", default=[], metavar="SERVICE=SECONDS",
+                        help="Mean latency of a fake service (azure_openai, azure_speech, runware, image_download)")
+    parser.add_argument("--error-rate", action="append", default=[], metavar="SERVICE=RATE",
+                        help="Fraction of failed calls of a fake service")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--paragraphs", type=int, default=8, help="Story paragraphs (images per job, clamped to 5-20)")
+    parser.add_argument("--paragraph-words", type=int, default=40, help="Words per paragraph (~2.5 words per narrated second)")
+    parser.add_argument("--hls", action="store_true", help="Also package HLS in task mode")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep the working directory")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    if not shutil.which("ffmpeg"):
+        print("❌ ffmpeg is required for the render stage")
+        sys.exit(1)
+
+    profile = ServiceProfile.parse(
+        args.latency, args.error_rate,
+        jitter=args.jitter, story_paragraphs=args.paragraphs, paragraph_words=args.paragraph_words,
+    )
+    json_path = os.path.abspath(args.json) if args.json else None
+    workdir = tempfile.mkdtemp(prefix="wizetale-bench-")
+    # The pipeline writes to static/ relative to the working directory
+    os.chdir(workdir)
+
+    from app.services.video_pipeline import VideoGenerationPipeline
+    from app.tasks import video as video_tasks
+    from app.celery_utils import celery_app
+    from app.core.config import settings
+    from app.services.runware_service import runware_service
+
+    logging.getLogger().setLevel(args.log_level)
+    logger.setLevel(logging.INFO)
+
+    traces: dict[str, dict] = {}
+    if args.mode == "task":
+        # Eager execution: progress updates go to an in-memory result backend, traces to this process
+        celery_app.conf.result_backend = "cache+memory://"
+        video_tasks.save_trace = lambda trace: traces.__setitem__(trace["task_id"], trace)
+    VideoGenerationPipeline.generate_audio_from_text = fake_speech(profile)
+    settings.STORAGE_UPLOAD_ENABLED = False
+    settings.HLS_PACKAGING_ENABLED = args.hls
+
+    request_data = {"subject": "history", "topic": "The Silk Road", "language": "en-US", "voice": "female"}
+    with FakeServices(profile) as fakes:
+        settings.AZURE_OPENAI_ENDPOINT = fakes.base_url
+        settings.AZURE_OPENAI_API_KEY = "benchmark"
+        settings.AZURE_OPENAI_DEPLOYMENT_NAME = "fake"
+        runware_service.base_url = f"{fakes.base_url}/v1"
+        runware_service.api_key = "benchmark"
+
+        print(f"🚀 {args.jobs} {args.mode} jobs, concurrency {args.concurrency}, fakes at {fakes.base_url}")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            if args.mode == "task":
+                futures = [pool.submit(_run_task_job, video_tasks, f"job-{n}", request_data, traces) for n in range(args.jobs)]
+            else:
+                futures = [pool.submit(_run_pipeline_job, f"job-{n}", request_data) for n in range(args.jobs)]
+            results = [future.result() for future in futures]
+        wall = time.perf_counter() - started
+
+    stages, external, processes = {}, {}, []
+    for trace in results:
+        _collect_spans(trace["spans"], stages, external, processes)
+    succeeded = sum(1 for trace in results if trace["status"] == "SUCCESS")
+
+    report = {
+        "environment": environment(),
+        "config": {**vars(args), "latency": profile.latency, "error_rate": profile.error_rate},
+        "jobs": args.jobs,
+        "succeeded": succeeded,
+        "failed": args.jobs - succeeded,
+        "wall_seconds": round(wall, 2),
+        "jobs_per_hour": round(succeeded / wall * 3600, 1) if wall else 0.0,
+        "job_seconds": summarize([trace["duration"] for trace in results]),
+        "stages": {name: summarize(values) for name, values in stages.items()},
+        "external": {name: summarize(values) for name, values in external.items()},
+        "ffmpeg": {
+            "cpu_seconds": summarize([p["attributes"]["cpu_user_seconds"] + p["attributes"]["cpu_system_seconds"]
+                                      for p in processes if "attributes" in p]),
+            "max_rss_mb": max((p["attributes"]["max_rss_mb"] for p in processes if "attributes" in p), default=0.0),
+        },
+        "peak_memory_mb": peak_memory_mb(),
+    }
+
+    print(f"\n✅ {succeeded}/{args.jobs} jobs succeeded in {wall:.1f}s → {report['jobs_per_hour']} jobs/hour")
+    print_table("Stages (seconds)", report["stages"])
+    print_table("External calls (seconds)", report["external"])
+    print(f"\n🎬 ffmpeg CPU p50 {report['ffmpeg']['cpu_seconds']['p50']:.2f}s, peak RSS {report['ffmpeg']['max_rss_mb']} MB")
+    print(f"🧠 Peak RSS: benchmark process {report['peak_memory_mb']['self']} MB, "
+          f"largest child {report['peak_memory_mb']['children']} MB")
+
+    if json_path:
+        write_json(json_path, report)
+    if args.keep:
+        print(f"📁 Outputs kept in {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
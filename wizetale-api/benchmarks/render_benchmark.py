@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Render micro-benchmark for VideoGenerationPipeline.create_video_slideshow
+Generates synthetic images, a narration tone and a transcript locally, then renders
+every combination of image count, audio duration, subtitles, motion engine and encoder settings.
+Each case records wall time, ffmpeg CPU time and peak RSS, realtime factor
+(audio seconds rendered per wall second) and output size.
+
+Usage (from wizetale-api/, ffmpeg must be installed):
+    python -m benchmarks.render_benchmark
+    python -m benchmarks.render_benchmark --images 5,20 --durations 60 --subtitles burn --motion zoompan,numpy \\
+        --encoder "x264-medium=-c:v libx264" --encoder "x264-veryfast=-c:v libx264 -preset veryfast" \\
+        --json render.json --csv render.csv
+"""
+import argparse
+import csv
+import itertools
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_services import SPEECH_WORDS_PER_SECOND, make_images, make_story, write_tone
+from benchmarks.report import environment, write_json
+
+DEFAULT_ENCODERS = [
+    "x264-medium=-c:v libx264",
+    "x264-veryfast=-c:v libx264 -preset veryfast",
+    "x264-ultrafast=-c:v libx264 -preset ultrafast",
+]
+
+CSV_FIELDS = ["encoder", "motion", "images", "audio_seconds", "subtitles", "repeat", "wall_seconds", "cpu_seconds",
+              "max_rss_mb", "realtime_factor", "output_bytes", "error"]
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _parse_encoder(value: str) -> tuple[str, list[str]]:
+    name, _, arguments = value.partition("=")
+    return name, arguments.split()
+
+
+def _ffmpeg_span(trace: dict) -> dict:
+    for span in trace["spans"]:
+        if span["name"] == "ffmpeg":
+            return span.get("attributes", {})
+    return {}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="create_video_slideshow render matrix")
+    parser.add_argument("--images", type=_int_list, default=[5, 10, 20], help="Comma separated image counts")
+    parser.add_argument("--durations", type=_int_list, default=[30, 90], help="Comma separated audio durations (s)")
+    parser.add_argument("--subtitles", default="burn,soft,none", help="Comma separated subtitle modes (see SUBTITLE_MODES)")
+    parser.add_argument("--motion", default="zoompan", help="Comma separated motion engines (see MOTION_ENGINES)")
+    parser.add_argument("--encoder", action="append", help="NAME=ffmpeg video encoder args (repeatable)")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--csv", help="Write one row per case to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep the working directory")
+    args = parser.parse_args()
+
+    if not shutil.which("ffmpeg"):
+        print("❌ ffmpeg is required")
+        sys.exit(1)
+
+    encoders = [_parse_encoder(e) for e in (args.encoder or DEFAULT_ENCODERS)]
+    subtitle_modes = args.subtitles.split(",")
+    motions = args.motion.split(",")
+    json_path = os.path.abspath(args.json) if args.json else None
+    csv_path = os.path.abspath(args.csv) if args.csv else None
+
+    workdir = Path(tempfile.mkdtemp(prefix="wizetale-render-bench-"))
+    os.chdir(workdir)
+
+    from app.services.video_pipeline import VideoGenerationPipeline
+    from app.services.trace_service import start_trace
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    inputs = workdir / "inputs"
+    inputs.mkdir()
+    images = []
+    for n, data in enumerate(make_images(max(args.images))):
+        path = inputs / f"image_{n}.jpg"
+        path.write_bytes(data)
+        images.append(str(path))
+    audio = {}
+    transcripts = {}
+    for duration in args.durations:
+        audio[duration] = str(inputs / f"tone_{duration}.wav")
+        write_tone(Path(audio[duration]), duration)
+        words = int(duration * SPEECH_WORDS_PER_SECOND)
+        transcripts[duration] = make_story(max(1, words // 40), min(words, 40))
+
+    pipeline = VideoGenerationPipeline(user_id="render-bench", temp_dir=inputs)
+    # Done once per job in production as well, so it is timed apart from the render cases
+    started = time.perf_counter()
+    images = pipeline.normalize_images(images)
+    print(f"🖼️  Normalized {len(images)} images in {time.perf_counter() - started:.2f}s")
+    cases = list(itertools.product(encoders, motions, args.images, args.durations, subtitle_modes, range(args.repeat)))
+    print(f"🎬 {len(cases)} render cases in {workdir}")
+
+    rows = []
+    for (encoder_name, encoder_args), motion, image_count, duration, subtitles, repeat in cases:
+        trace = start_trace(f"{encoder_name}-{motion}-{image_count}-{duration}-{subtitles}-{repeat}")
+        error = None
+        started = time.perf_counter()
+        try:
+            pipeline.create_video_slideshow(
+                audio[duration], float(duration), images[:image_count], transcripts[duration],
+                subtitles=subtitles, encoder_args=encoder_args, motion=motion,
+            )
+        except Exception as e:
+            error = str(e)
+        wall = time.perf_counter() - started
+        usage = _ffmpeg_span(trace.finish())
+
+        output = pipeline.output_video_path
+        row = {
+            "encoder": encoder_name,
+            "motion": motion,
+            "images": image_count,
+            "audio_seconds": duration,
+            "subtitles": subtitles,
+            "repeat": repeat,
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(usage.get("cpu_user_seconds", 0) + usage.get("cpu_system_seconds", 0), 3),
+            "max_rss_mb": usage.get("max_rss_mb", 0),
+            "realtime_factor": round(duration / wall, 2) if wall and not error else 0.0,
+            "output_bytes": output.stat().st_size if output.exists() and not error else 0,
+            "error": error,
+        }
+        output.unlink(missing_ok=True)
+        rows.append(row)
+        status = "❌ " + error if error else f"{row['realtime_factor']}x realtime"
+        print(f"{encoder_name:<18} {motion:<7} {image_count:>3} img {duration:>4}s subs={subtitles:<8} "
+              f"wall {row['wall_seconds']:>7.2f}s cpu {row['cpu_seconds']:>7.2f}s "
+              f"{row['output_bytes'] / 1024 / 1024:>6.1f} MB  {status}")
+
+    if json_path:
+        write_json(json_path, {"environment": environment(), "cpu_count": os.cpu_count(), "cases": rows})
+    if csv_path:
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"💾 CSV written to {csv_path}")
+    if args.keep:
+        print(f"📁 Inputs kept in {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
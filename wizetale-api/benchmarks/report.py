@@ -0,0 +1,59 @@
+"""
+Shared helpers for the benchmark reports
+"""
+import json
+import platform
+import resource
+import sys
+from datetime import datetime
+from pathlib import Path
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Linear-interpolated percentile, ``q`` in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4) if values else 0.0,
+    }
+
+
+def peak_memory_mb() -> dict:
+    """Peak RSS of this process and of the largest reaped child (e.g. ffmpeg); KiB on Linux."""
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    }
+
+
+def environment() -> dict:
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def print_table(title: str, rows: dict[str, dict]) -> None:
+    print(f"\n📊 {title}")
+    print(f"{'name':<24}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for name, stats in sorted(rows.items()):
+        print(f"{name:<24}{stats['count']:>7}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}{stats['max']:>10.3f}")
+
+
+def write_json(path: str, report: dict) -> None:
+    Path(path).write_text(json.dumps(report, indent=2, default=str))
+    print(f"\n💾 Report written to {path}")
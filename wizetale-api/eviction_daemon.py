@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Media eviction daemon for Wizetale API.
+Keeps generated media under the global and per-user byte quotas by evicting the
+least recently accessed artifacts. Replaces the old age-only cron cleanup.
+"""
+
+import logging
+import signal
+import threading
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+from app.services.eviction_service import EvictionDaemon
+
+logger = logging.getLogger("eviction_daemon")
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evict generated media to stay within disk quotas")
+    parser.add_argument("--once", action="store_true",
+                        help="Run a single eviction cycle and exit")
+    parser.add_argument("--interval", type=int, default=None,
+                        help="Seconds between cycles (default: MEDIA_EVICTION_INTERVAL)")
+
+    args = parser.parse_args()
+
+    daemon = EvictionDaemon()
+    if args.once:
+        logger.info(f"Eviction cycle: {daemon.run_once()}")
+    else:
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+        daemon.run_forever(args.interval, stop)
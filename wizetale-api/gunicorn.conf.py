@@ -1,5 +1,13 @@
 import os
 import multiprocessing
+import shutil
+from typing import Any
+
+# Prometheus multiprocess mode: every worker writes its samples here and /metrics
+# aggregates them. Cleared on start so samples of a previous run are not reported.
+prometheus_multiproc_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/dev/shm/wizetale-metrics")
+shutil.rmtree(prometheus_multiproc_dir, ignore_errors=True)
+os.makedirs(prometheus_multiproc_dir, exist_ok=True)
 
 # Server socket
 bind = "0.0.0.0:8000"
@@ -30,4 +38,17 @@ proc_name = "wizetale-api"
 
 # Memory management
 max_requests_jitter = 50
-worker_tmp_dir = "/dev/shm"  # Use RAM for temporary files 
\ No newline at end of file
+worker_tmp_dir = "/dev/shm"  # Use RAM for temporary files
+
+
+def post_worker_init(worker: Any) -> None:
+    # UvicornWorker attaches gunicorn's stream handlers to the uvicorn loggers; send their
+    # records through the app's log queue instead
+    from app.core.logging_config import route_server_loggers
+    route_server_loggers()
+
+
+def child_exit(server: Any, worker: Any) -> None:
+    # Drop the dead worker's live gauges (e.g. tasks in flight)
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,25 @@
+from typing import Iterator
+
+import fakeredis
+import pytest
+
+from app.services import eviction_service, redis_service
+from app.services.rate_limit_service import rate_limiter
+
+
+@pytest.fixture
+def async_redis(monkeypatch: pytest.MonkeyPatch) -> Iterator[fakeredis.aioredis.FakeRedis]:
+    """In-memory stand-in for the shared async client (get_shared_redis)."""
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(redis_service, "_shared_client", client)
+    # The registered Lua script is bound to the client it was created on
+    monkeypatch.setattr(rate_limiter, "_script", None)
+    yield client
+
+
+@pytest.fixture
+def sync_redis(monkeypatch: pytest.MonkeyPatch) -> fakeredis.FakeRedis:
+    """In-memory stand-in for the eviction daemon's synchronous client."""
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(eviction_service, "_sync_redis", lambda: client)
+    return client
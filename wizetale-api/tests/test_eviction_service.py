@@ -0,0 +1,177 @@
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+import fakeredis
+import pytest
+
+from app.core.config import settings
+from app.services.eviction_service import (
+    ACCESS_KEY,
+    PINS_KEY,
+    AccessLogReader,
+    Artifact,
+    EvictionDaemon,
+    artifact_key,
+)
+
+NOW = 1_700_000_000.0
+DAY = 86400
+
+
+@pytest.fixture
+def quotas(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "MEDIA_QUOTA_BYTES", 1000)
+    monkeypatch.setattr(settings, "MEDIA_USER_QUOTA_BYTES", 100)
+    monkeypatch.setattr(settings, "MEDIA_EVICTION_LOW_WATERMARK", 0.5)
+    monkeypatch.setattr(settings, "MEDIA_MAX_IDLE_DAYS", 7)
+    monkeypatch.setattr(settings, "MEDIA_ACCESS_LOG", "")
+
+
+def _daemon(tmp_path: Path, artifacts: list[tuple[str, int, float]]) -> EvictionDaemon:
+    """A daemon whose index holds ``(key, size, age in seconds)`` artifacts."""
+    daemon = EvictionDaemon(tmp_path)
+    for key, size, age in artifacts:
+        container = key.rsplit("/", 1)[0]
+        user_id: Optional[str] = container.split("/")[1] if container.startswith("static/") else None
+        daemon.index.artifacts[key] = Artifact(key, container, user_id, size, NOW - age)
+    return daemon
+
+
+def _planned(daemon: EvictionDaemon, pinned: frozenset[str] = frozenset()) -> list[str]:
+    return [artifact.key for artifact in daemon.plan(set(pinned), NOW)]
+
+
+@pytest.mark.parametrize("path, key", [
+    ("static/u1/video-0123456789abcdef.mp4", "static/u1/video-0123456789abcdef.mp4"),
+    ("static/u1/hls-0123456789abcdef/360p/segment_000.ts", "static/u1/hls-0123456789abcdef"),
+    ("generated_videos/clip.mp4", "generated_videos/clip.mp4"),
+    ("generated_images/batch/1.jpg", "generated_images/batch"),
+    ("static/u1", None),
+    ("app/main.py", None),
+    ("../static/u1/video.mp4", None),
+])
+def test_artifact_key(path: str, key: Optional[str]) -> None:
+    assert artifact_key(path) == key
+
+
+def test_user_over_quota_loses_least_recently_used_first(tmp_path: Path, sync_redis: fakeredis.FakeRedis,
+                                                        quotas: None) -> None:
+    daemon = _daemon(tmp_path, [
+        ("static/a/video-1.mp4", 40, 30),
+        ("static/a/video-2.mp4", 40, 10),
+        ("static/a/video-3.mp4", 40, 20),
+        ("static/b/video-1.mp4", 90, 40),
+    ])
+    # a: 120 > 100, evicted down to the 50-byte watermark; b is within its quota
+    assert _planned(daemon) == ["static/a/video-1.mp4", "static/a/video-3.mp4"]
+
+
+def test_global_quota_evicts_across_users(tmp_path: Path, sync_redis: fakeredis.FakeRedis, quotas: None,
+                                          monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "MEDIA_QUOTA_BYTES", 200)
+    daemon = _daemon(tmp_path, [
+        ("static/a/video-1.mp4", 60, 10),
+        ("static/b/video-1.mp4", 60, 40),
+        ("generated_videos/old.mp4", 60, 30),
+        ("static/c/video-1.mp4", 60, 20),
+    ])
+    # 240 > 200, evicted down to 100
+    assert _planned(daemon) == ["static/b/video-1.mp4", "generated_videos/old.mp4", "static/c/video-1.mp4"]
+
+
+def test_idle_artifacts_go_regardless_of_quota(tmp_path: Path, sync_redis: fakeredis.FakeRedis, quotas: None) -> None:
+    daemon = _daemon(tmp_path, [
+        ("static/a/video-1.mp4", 1, 8 * DAY),
+        ("static/a/video-2.mp4", 1, 6 * DAY),
+    ])
+    assert _planned(daemon) == ["static/a/video-1.mp4"]
+
+
+def test_pinned_containers_are_never_planned(tmp_path: Path, sync_redis: fakeredis.FakeRedis, quotas: None) -> None:
+    daemon = _daemon(tmp_path, [
+        ("static/a/video-1.mp4", 80, 8 * DAY),
+        ("static/a/video-2.mp4", 80, 10),
+        ("static/b/video-1.mp4", 10, 8 * DAY),
+    ])
+    assert _planned(daemon, frozenset({"static/a"})) == ["static/b/video-1.mp4"]
+
+
+def test_run_once_deletes_files_and_honours_recorded_access(tmp_path: Path, sync_redis: fakeredis.FakeRedis,
+                                                            quotas: None) -> None:
+    now = time.time()
+    user_dir = tmp_path / "static" / "u1"
+    user_dir.mkdir(parents=True)
+    for n, age in enumerate([300, 200, 100]):
+        path = user_dir / f"video-{n}.mp4"
+        path.write_bytes(b"\x00" * 40)
+        os.utime(path, (now - age, now - age))
+    hls = user_dir / "hls-0"
+    (hls / "360p").mkdir(parents=True)
+    (hls / "360p" / "segment_000.ts").write_bytes(b"\x00" * 10)
+    # The oldest file was just served
+    sync_redis.zadd(ACCESS_KEY, {"static/u1/video-0.mp4": now})
+
+    stats = EvictionDaemon(tmp_path).run_once()
+
+    # 130 > 100: the least recently used go until usage is at most 50
+    assert sorted(p.name for p in user_dir.iterdir()) == ["hls-0", "video-0.mp4"]
+    assert stats["artifacts"] == 2 and stats["total_bytes"] == 50
+    assert stats["evicted_count_total"] == 2 and stats["evicted_bytes_total"] == 80
+    assert sync_redis.hget("media:eviction:stats", "artifacts") == "2"
+
+
+def test_run_once_skips_pinned_users(tmp_path: Path, sync_redis: fakeredis.FakeRedis, quotas: None) -> None:
+    user_dir = tmp_path / "static" / "u1"
+    user_dir.mkdir(parents=True)
+    for n in range(3):
+        (user_dir / f"video-{n}.mp4").write_bytes(b"\x00" * 50)
+    sync_redis.zadd(PINS_KEY, {"static/u1|task-1": 10**10})
+
+    stats = EvictionDaemon(tmp_path).run_once()
+
+    assert len(list(user_dir.iterdir())) == 3
+    assert stats["pinned_containers"] == 1 and stats["evicted_count_total"] == 0
+
+
+def test_access_log_reader_follows_the_log(tmp_path: Path) -> None:
+    log = tmp_path / "access.log"
+    log.write_text(
+        "1000.5 /static/u1/video-0123456789abcdef.mp4\n"
+        "2000.0 /static/u1/hls-0123456789abcdef/360p/segment_001.ts\n"
+        "1800.0 /static/u1/video-0123456789abcdef.mp4\n"
+        "garbage\n"
+        "1900.0 /static/u1/video-ff"
+    )
+    reader = AccessLogReader(log, max_bytes=10_000)
+
+    assert reader.read() == {
+        "static/u1/video-0123456789abcdef.mp4": 1800.0,
+        "static/u1/hls-0123456789abcdef": 2000.0,
+    }
+    # The partial last line is read once it is complete
+    with open(log, "a") as f:
+        f.write("ffffffffffffff.mp4\n")
+    assert reader.read() == {"static/u1/video-ffffffffffffffff.mp4": 1900.0}
+    assert reader.read() == {}
+
+    # Rotated: the new file is read from the start
+    log.unlink()
+    log.write_text("3000.0 /static/u2/video-0123456789abcdef.mp4\n")
+    assert reader.read() == {"static/u2/video-0123456789abcdef.mp4": 3000.0}
+
+
+def test_access_log_reader_truncates_past_max_bytes(tmp_path: Path) -> None:
+    log = tmp_path / "access.log"
+    line = "1000.0 /static/u1/video-0123456789abcdef.mp4\n"
+    log.write_text(line * 3)
+    reader = AccessLogReader(log, max_bytes=len(line) * 2)
+
+    assert len(reader.read()) == 1
+    assert log.stat().st_size == 0
+    with open(log, "a") as f:
+        f.write(line.replace("1000.0", "1100.0"))
+    assert reader.read() == {"static/u1/video-0123456789abcdef.mp4": 1100.0}
+    assert reader.read() == {}
+    assert AccessLogReader(tmp_path / "missing.log", max_bytes=1).read() == {}
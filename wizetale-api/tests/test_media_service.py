@@ -0,0 +1,99 @@
+from pathlib import Path
+
+import pytest
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app.services import media_service
+from app.services.media_service import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    VERSIONED_NAME_RE,
+    CachedStaticFiles,
+    cache_headers_for,
+    content_digest,
+    publish_versioned,
+)
+
+
+@pytest.fixture
+def accessed(monkeypatch: pytest.MonkeyPatch) -> list[Path]:
+    paths: list[Path] = []
+
+    async def record_access(path: Path) -> None:
+        paths.append(path)
+
+    monkeypatch.setattr(media_service, "record_access", record_access)
+    return paths
+
+
+def test_publish_versioned_moves_into_directory(tmp_path: Path) -> None:
+    work_dir, user_dir = tmp_path / ".work-job", tmp_path / "user"
+    work_dir.mkdir()
+    user_dir.mkdir()
+    rendered = work_dir / "video.mp4"
+    rendered.write_bytes(b"frames")
+    digest = content_digest(rendered)
+
+    published = publish_versioned(rendered, user_dir)
+
+    assert published == user_dir / f"video-{digest}.mp4"
+    assert published.read_bytes() == b"frames"
+    assert not rendered.exists()
+    match = VERSIONED_NAME_RE.search(published.name)
+    assert match and match.group("digest") == digest
+
+
+def test_same_content_same_name(tmp_path: Path) -> None:
+    first, second = tmp_path / "a.vtt", tmp_path / "b.vtt"
+    first.write_text("WEBVTT\n")
+    second.write_text("WEBVTT\n")
+    assert content_digest(first) == content_digest(second)
+    second.write_text("WEBVTT\n\n1\n")
+    assert content_digest(first) != content_digest(second)
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("static/u1/video-0123456789abcdef.mp4",
+     {"ETag": '"0123456789abcdef"', "Cache-Control": IMMUTABLE_CACHE_CONTROL}),
+    ("static/u1/hls-0123456789abcdef/360p/segment_000.ts", {"Cache-Control": IMMUTABLE_CACHE_CONTROL}),
+    ("static/u1/video.mp4", {"Cache-Control": REVALIDATE_CACHE_CONTROL}),
+    ("static/u1/video-0123.mp4", {"Cache-Control": REVALIDATE_CACHE_CONTROL}),
+])
+def test_cache_headers_for(path: str, expected: dict) -> None:
+    assert cache_headers_for(Path(path)) == expected
+
+
+def test_static_files_answer_if_none_match_with_304(tmp_path: Path, accessed: list[Path]) -> None:
+    (tmp_path / "video-0123456789abcdef.mp4").write_bytes(b"\x00" * 1024)
+    client = TestClient(Starlette(routes=[Mount("/static", CachedStaticFiles(directory=str(tmp_path)))]))
+    url = "/static/video-0123456789abcdef.mp4"
+
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers["etag"] == '"0123456789abcdef"'
+    assert first.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+    revalidated = client.get(url, headers={"If-None-Match": '"0123456789abcdef"'})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == '"0123456789abcdef"'
+
+    assert client.get(url, headers={"If-None-Match": '"ffffffffffffffff"'}).status_code == 200
+    assert client.get(url, headers={"Range": "bytes=0-99"}).status_code == 206
+    assert accessed == [tmp_path / "video-0123456789abcdef.mp4"] * 4
+
+
+def test_static_files_revalidate_unversioned_files(tmp_path: Path, accessed: list[Path]) -> None:
+    (tmp_path / "video.mp4").write_bytes(b"\x00" * 16)
+    client = TestClient(Starlette(routes=[Mount("/static", CachedStaticFiles(directory=str(tmp_path)))]))
+
+    response = client.get("/static/video.mp4")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+    # Starlette's own weak validator
+    assert client.get("/static/video.mp4", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+    assert client.get("/static/missing.mp4").status_code == 404
+    assert accessed == [tmp_path / "video.mp4"] * 2
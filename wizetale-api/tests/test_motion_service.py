@@ -0,0 +1,98 @@
+import math
+from pathlib import Path
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from app.services.motion_service import (
+    ZOOM_MAX,
+    ZOOM_STEP,
+    KenBurnsClip,
+    _blend,
+    _taps,
+    slideshow_frames,
+    zoom_at,
+)
+
+WIDTH, HEIGHT = 32, 16
+
+
+def _still(tmp_path: Path, name: str, color: tuple[int, int, int]) -> str:
+    path = tmp_path / f"{name}.png"
+    Image.new("RGB", (WIDTH, HEIGHT), color).save(path)
+    return str(path)
+
+
+def _frames(chunks: list[memoryview]) -> list[np.ndarray]:
+    return [np.frombuffer(chunk, dtype=np.uint8).reshape(HEIGHT, WIDTH, 3) for chunk in chunks]
+
+
+def test_zoom_follows_the_zoompan_expression() -> None:
+    zooms = [zoom_at(n) for n in range(200)]
+    assert zooms[0] == pytest.approx(1 + ZOOM_STEP)
+    assert all(b >= a for a, b in zip(zooms, zooms[1:]))
+    assert max(zooms) == ZOOM_MAX
+    # Capped once (ZOOM_MAX - 1) / ZOOM_STEP frames have been shown
+    assert zoom_at(math.ceil((ZOOM_MAX - 1) / ZOOM_STEP)) == ZOOM_MAX
+
+
+def test_taps_without_scaling_hit_source_pixels() -> None:
+    i0, i1, weight = _taps(0, 8, 8, 8)
+    assert i0.tolist() == list(range(8))
+    assert i1.tolist() == [1, 2, 3, 4, 5, 6, 7, 7]
+    assert weight.tolist() == [0] * 8
+
+
+def test_taps_at_half_pixel_offsets_weigh_both_neighbours() -> None:
+    i0, i1, weight = _taps(0.5, 4, 4, 8)
+    assert i0.tolist() == [0, 1, 2, 3]
+    assert i1.tolist() == [1, 2, 3, 4]
+    assert weight.tolist() == [128] * 4
+
+
+def test_blend_weights() -> None:
+    a = np.full((2, 2, 3), 200, dtype=np.uint8)
+    b = np.full((2, 2, 3), 100, dtype=np.uint8)
+    weights = np.array([0, 128, 256], dtype=np.uint16)
+    assert [_blend(a, b, w)[0, 0, 0] for w in weights] == [200, 150, 100]
+
+
+def test_clip_of_a_solid_still_keeps_its_size_and_color(tmp_path: Path) -> None:
+    clip = KenBurnsClip(_still(tmp_path, "red", (200, 10, 30)))
+    for index in (0, 10, 1000):
+        frame = clip.frame(index)
+        assert frame.shape == (HEIGHT, WIDTH, 3) and frame.dtype == np.uint8
+        assert (frame == [200, 10, 30]).all()
+    # The zoom stopped changing, so the last render is reused
+    assert clip.frame(1001) is clip.frame(1000)
+
+
+def test_clip_zooms_into_the_center(tmp_path: Path) -> None:
+    path = tmp_path / "edge.png"
+    image = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    image[:, :2] = 255
+    Image.fromarray(image).save(path)
+    clip = KenBurnsClip(str(path))
+    # The white left border leaves the frame as the zoom grows
+    assert clip.frame(0)[:, 0].mean() > clip.frame(1000)[:, 0].mean()
+
+
+def test_slideshow_cross_fades_between_stills(tmp_path: Path) -> None:
+    red, blue = _still(tmp_path, "red", (255, 0, 0)), _still(tmp_path, "blue", (0, 0, 255))
+    frames = _frames(list(slideshow_frames([red, blue], [1.0, 1.0], transition=0.4, fps=10)))
+
+    # Both durations plus the tail of the last transition
+    assert len(frames) == math.ceil((1.0 + 1.0 + 0.4) * 10)
+    colors = [tuple(frame[HEIGHT // 2, WIDTH // 2]) for frame in frames]
+    assert colors[0] == colors[9] == colors[10] == (255, 0, 0)
+    # 0.2 s into a 0.4 s fade the clips weigh half each
+    assert colors[12] == (128, 0, 128)
+    assert colors[11][0] > colors[12][0] > colors[13][0]
+    assert colors[14] == colors[-1] == (0, 0, 255)
+
+
+def test_single_clip_runs_past_its_duration(tmp_path: Path) -> None:
+    frames = list(slideshow_frames([_still(tmp_path, "red", (255, 0, 0))], [0.5], transition=0.2, fps=25))
+    assert len(frames) == math.ceil((0.5 + 0.2) * 25)
+    assert all(len(frame) == WIDTH * HEIGHT * 3 for frame in frames)
@@ -0,0 +1,100 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from app.core.config import settings
+from app.services import redis_service
+from app.services.prompt_service import (
+    CACHE_INDEX_KEY,
+    CACHE_PREFIX,
+    PromptService,
+    cache_digest,
+    normalize_description,
+)
+
+
+@pytest.fixture
+def service() -> PromptService:
+    return PromptService(concurrency=1, wait_seconds=0.01)
+
+
+@pytest.mark.parametrize("variant", [
+    "A dragon learns to fly",
+    "  a DRAGON learns   to fly.  ",
+    "A dragon\nlearns to fly!",
+    "A dragon learns to fly…",
+    "Ａ dragon learns to fly",  # full-width letter, NFKC
+])
+def test_equivalent_descriptions_share_a_digest(variant: str) -> None:
+    assert normalize_description(variant) == "a dragon learns to fly"
+    assert cache_digest(variant, "en-US") == cache_digest("A dragon learns to fly", " EN-us ")
+
+
+def test_digest_depends_on_language_and_wording() -> None:
+    assert cache_digest("A dragon learns to fly", "en-US") != cache_digest("A dragon learns to fly", "ru-RU")
+    assert cache_digest("A dragon learns to fly", "en-US") != cache_digest("A dragon learns to swim", "en-US")
+
+
+def test_cache_round_trip(async_redis: fakeredis.aioredis.FakeRedis, service: PromptService) -> None:
+    async def run() -> tuple:
+        miss = await service.cached("A dragon", "en-US")
+        await service.remember("A dragon", "en-US", "An enhanced dragon")
+        await service.remember("A whale", "en-US", "")
+        return miss, await service.cached("a dragon.", "en-US"), await service.cached("A whale", "en-US")
+
+    assert asyncio.run(run()) == (None, "An enhanced dragon", None)
+
+
+def test_variants_are_collected_then_served_round_robin(async_redis: fakeredis.aioredis.FakeRedis,
+                                                       service: PromptService,
+                                                       monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "ENHANCE_PROMPT_CACHE_VARIANTS", 2)
+
+    async def run() -> list:
+        await service.remember("A dragon", "en-US", "first")
+        served = [await service.cached("A dragon", "en-US")]
+        await service.remember("A dragon", "en-US", "second")
+        await service.remember("A dragon", "en-US", "third")
+        served += [await service.cached("A dragon", "en-US") for _ in range(3)]
+        return served
+
+    served = asyncio.run(run())
+    assert served[0] is None
+    # Only the newest two are kept, and repeats alternate between them
+    assert sorted(served[1:3]) == ["second", "third"]
+    assert served[3] == served[1]
+
+
+def test_cache_is_bounded_by_least_recent_use(async_redis: fakeredis.aioredis.FakeRedis, service: PromptService,
+                                              monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "ENHANCE_PROMPT_CACHE_MAX_ENTRIES", 3)
+
+    async def run() -> tuple:
+        for n in range(3):
+            await service.remember(f"story {n}", "en-US", f"enhanced {n}")
+        # A hit refreshes story 0, so story 1 is now the least recently used
+        assert await service.cached("story 0", "en-US") == "enhanced 0"
+        await service.remember("story 3", "en-US", "enhanced 3")
+        await service.remember("story 4", "en-US", "enhanced 4")
+        cached = [await service.cached(f"story {n}", "en-US") for n in range(5)]
+        stored = [await async_redis.exists(f"{CACHE_PREFIX}:{cache_digest(f'story {n}', 'en-US')}") for n in range(5)]
+        return cached, stored, await async_redis.zcard(CACHE_INDEX_KEY)
+
+    cached, stored, indexed = asyncio.run(run())
+    assert cached == ["enhanced 0", None, None, "enhanced 3", "enhanced 4"]
+    # Evicted entries are deleted, not just dropped from the index
+    assert stored == [1, 0, 0, 1, 1]
+    assert indexed == 3
+
+
+def test_cache_failures_are_misses(service: PromptService, monkeypatch: pytest.MonkeyPatch) -> None:
+    server = fakeredis.FakeServer()
+    server.connected = False
+    monkeypatch.setattr(redis_service, "_shared_client", fakeredis.aioredis.FakeRedis(server=server))
+
+    async def run() -> object:
+        await service.remember("A dragon", "en-US", "An enhanced dragon")
+        return await service.cached("A dragon", "en-US")
+
+    assert asyncio.run(run()) is None
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import fakeredis
+import pytest
+from starlette.requests import Request
+
+from app.services import rate_limit_service
+from app.services.rate_limit_service import RateLimit, client_ip, parse_limit, rate_limiter
+
+
+def _request(peer: str, headers: dict[str, str]) -> Request:
+    return Request({
+        "type": "http",
+        "client": (peer, 50000),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+    })
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("5/minute", RateLimit(5, 60)),
+    ("120/minute", RateLimit(120, 60)),
+    ("100/10 seconds", RateLimit(100, 10)),
+    (" 3 / day ", RateLimit(3, 86400)),
+])
+def test_parse_limit(value: str, expected: RateLimit) -> None:
+    assert parse_limit(value) == expected
+
+
+@pytest.mark.parametrize("value", ["5", "5/fortnight", "minute/5", ""])
+def test_parse_limit_rejects_garbage(value: str) -> None:
+    with pytest.raises(ValueError):
+        parse_limit(value)
+
+
+def test_window_allows_up_to_the_limit(async_redis: fakeredis.aioredis.FakeRedis) -> None:
+    async def hits() -> list:
+        return [await rate_limiter.hit("test", "ip:1.2.3.4", RateLimit(3, 60)) for _ in range(4)]
+
+    results = asyncio.run(hits())
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results] == [2, 1, 0, 0]
+    assert all(1 <= r.reset_seconds <= 60 for r in results)
+    assert results[-1].headers == {"X-RateLimit-Limit": "3", "X-RateLimit-Remaining": "0",
+                                   "X-RateLimit-Reset": str(results[-1].reset_seconds)}
+
+
+def test_identities_and_scopes_have_separate_windows(async_redis: fakeredis.aioredis.FakeRedis) -> None:
+    limit = RateLimit(1, 60)
+
+    async def hits() -> list[bool]:
+        return [
+            (await rate_limiter.hit("status", "ip:1.2.3.4:task_id:a", limit)).allowed,
+            (await rate_limiter.hit("status", "ip:1.2.3.4:task_id:a", limit)).allowed,
+            (await rate_limiter.hit("status", "ip:1.2.3.4:task_id:b", limit)).allowed,
+            (await rate_limiter.hit("result", "ip:1.2.3.4:task_id:a", limit)).allowed,
+        ]
+
+    assert asyncio.run(hits()) == [True, False, True, True]
+
+
+def test_hits_older_than_the_window_are_dropped(async_redis: fakeredis.aioredis.FakeRedis) -> None:
+    key = "ratelimit:test:user:u1"
+    stale = time.time() * 1000 - 61_000
+
+    async def hit() -> tuple[bool, int]:
+        await async_redis.zadd(key, {"old-1": stale, "old-2": stale})
+        result = await rate_limiter.hit("test", "user:u1", RateLimit(2, 60))
+        return result.allowed, await async_redis.zcard(key)
+
+    assert asyncio.run(hit()) == (True, 1)
+
+
+def test_fails_open_without_redis(monkeypatch: pytest.MonkeyPatch) -> None:
+    def unavailable() -> None:
+        raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(rate_limiter, "_script", None)
+    monkeypatch.setattr(rate_limit_service, "get_shared_redis", unavailable)
+    result = asyncio.run(rate_limiter.hit("test", "ip:1.2.3.4", RateLimit(1, 60)))
+    assert result.allowed and result.remaining == 1
+
+
+def test_client_ip_trusts_forwarding_headers_from_proxies_only() -> None:
+    headers = {"X-Real-IP": "203.0.113.7", "X-Forwarded-For": "198.51.100.1, 10.0.0.2"}
+    assert client_ip(_request("10.0.0.2", headers)) == "203.0.113.7"
+    assert client_ip(_request("10.0.0.2", {"X-Forwarded-For": "198.51.100.1, 10.0.0.2"})) == "198.51.100.1"
+    assert client_ip(_request("198.51.100.9", headers)) == "198.51.100.9"
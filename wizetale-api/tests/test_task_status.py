@@ -0,0 +1,66 @@
+from typing import Iterator
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1 import generate
+from app.core.config import settings
+
+
+@pytest.fixture
+def client(monkeypatch: pytest.MonkeyPatch) -> Iterator[TestClient]:
+    from app.main import app
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(generate.FastAPICache, "_backend", None)
+    yield TestClient(app)
+
+
+@pytest.fixture
+def meta(monkeypatch: pytest.MonkeyPatch) -> dict:
+    """What the result backend returns for any task id."""
+    current = {"status": "PENDING", "result": None}
+    # Patched on the class: Celery keeps one backend instance per thread
+    monkeypatch.setattr(type(generate.celery_app.backend), "get_task_meta", lambda self, task_id: current)
+    return current
+
+
+def test_etag_is_stable_and_content_based() -> None:
+    payload = {"task_id": "t1", "status": "PROGRESS", "progress": 40}
+    assert generate._etag_for(payload) == generate._etag_for(dict(reversed(payload.items())))
+    assert generate._etag_for(payload) != generate._etag_for({**payload, "progress": 41})
+
+
+def test_unchanged_status_is_answered_with_304(client: TestClient, meta: dict) -> None:
+    meta.update(status="PROGRESS", result={"progress": 40, "message": "Rendering...", "step": "video_creation"})
+
+    first = client.get("/api/v1/tasks/t1")
+    assert first.status_code == 200
+    assert first.json() == {"task_id": "t1", "status": "PROGRESS", "progress": 40,
+                            "message": "Rendering...", "step": "video_creation"}
+    assert first.headers["cache-control"] == "no-cache"
+    etag = first.headers["etag"]
+
+    unchanged = client.get("/api/v1/tasks/t1", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert unchanged.headers["etag"] == etag
+    assert client.get("/api/v1/tasks/t1", headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+
+    meta["result"] = {"progress": 60, "message": "Rendering...", "step": "video_creation"}
+    changed = client.get("/api/v1/tasks/t1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["progress"] == 60
+    assert changed.headers["etag"] != etag
+
+
+def test_status_of_finished_task_leaves_out_the_heavy_fields(client: TestClient, meta: dict) -> None:
+    meta.update(status="SUCCESS", result={
+        "video_url": "/static/u1/video-0123456789abcdef.mp4", "audio_url": None, "subtitles_url": None,
+        "script": "Once upon a time...", "images_used": ["a.jpg", "b.jpg"],
+    })
+
+    body = client.get("/api/v1/tasks/t1").json()
+    assert body["progress"] == 100
+    assert body["video_url"] == "/static/u1/video-0123456789abcdef.mp4"
+    assert "script" not in body and "images_used" not in body
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.token_service import FirebaseTokenVerifier
+
+
+class FakeFirebase:
+    """Counts verifications; a token ``<uid>:<seconds to expiry>`` decodes to those claims."""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.calls: list[str] = []
+        self.delay = delay
+
+    def __call__(self, id_token: str) -> dict:
+        self.calls.append(id_token)
+        time.sleep(self.delay)
+        uid, _, ttl = id_token.partition(":")
+        if uid == "bad":
+            raise ValueError("Invalid ID token: signature")
+        return {"uid": uid, "exp": time.time() + float(ttl or 3600)}
+
+
+@pytest.fixture
+def firebase() -> FakeFirebase:
+    return FakeFirebase()
+
+
+def _verifier(firebase: FakeFirebase, cache_size: int = 10) -> FirebaseTokenVerifier:
+    verifier = FirebaseTokenVerifier(cache_size=cache_size)
+    verifier._verify_sync = firebase  # type: ignore[method-assign]
+    return verifier
+
+
+def test_token_is_verified_once_until_it_expires(firebase: FakeFirebase) -> None:
+    verifier = _verifier(firebase)
+
+    async def run() -> list[dict]:
+        return [await verifier.verify("u1:3600") for _ in range(5)]
+
+    claims = asyncio.run(run())
+    assert {c["uid"] for c in claims} == {"u1"}
+    assert firebase.calls == ["u1:3600"]
+
+
+def test_expired_token_is_verified_again(firebase: FakeFirebase) -> None:
+    verifier = _verifier(firebase)
+
+    async def run() -> None:
+        await verifier.verify("u1:-1")
+        await verifier.verify("u1:-1")
+
+    asyncio.run(run())
+    assert firebase.calls == ["u1:-1", "u1:-1"]
+
+
+def test_cache_keeps_the_most_recently_used_tokens(firebase: FakeFirebase) -> None:
+    verifier = _verifier(firebase, cache_size=2)
+
+    async def run() -> None:
+        for token in ["a", "b", "a", "c", "a", "b"]:
+            await verifier.verify(token)
+
+    asyncio.run(run())
+    # "b" was the least recently used when "c" came in
+    assert firebase.calls == ["a", "b", "c", "b"]
+    assert len(verifier._tokens) == 2
+
+
+def test_concurrent_requests_share_one_verification() -> None:
+    firebase = FakeFirebase(delay=0.05)
+    verifier = _verifier(firebase)
+
+    async def run() -> list[dict]:
+        return await asyncio.gather(*(verifier.verify("u1") for _ in range(10)))
+
+    claims = asyncio.run(run())
+    assert len(claims) == 10 and all(c["uid"] == "u1" for c in claims)
+    assert firebase.calls == ["u1"]
+    assert verifier._inflight == {}
+
+
+def test_invalid_token_is_not_cached(firebase: FakeFirebase) -> None:
+    verifier = _verifier(firebase)
+
+    async def run() -> None:
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await verifier.verify("bad")
+
+    asyncio.run(run())
+    assert firebase.calls == ["bad", "bad"]
+    assert len(verifier._tokens) == 0
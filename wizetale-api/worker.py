@@ -3,6 +3,8 @@
 
 import logging
 import os
+import shutil
+from typing import Any, Optional
 import firebase_admin
 from firebase_admin import credentials
 from dotenv import load_dotenv
@@ -10,8 +12,14 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
-# Setup logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Prometheus multiprocess mode must be configured before prometheus_client is imported
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/wizetale-metrics")
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+# Setup logging (queue-backed, see app/core/logging_config.py)
+from app.core.logging_config import setup_logging
+setup_logging()
 
 # Initialize Firebase Admin SDK
 try:
@@ -31,5 +39,46 @@ from app.celery_utils import celery_app
 
 # Add the tasks module to the includes
 celery_app.conf.include = [
-    'app.api.v1.generate'
-] 
\ No newline at end of file
+    'app.tasks.video'
+] 
+from celery.signals import setup_logging as celery_setup_logging, worker_init, worker_process_shutdown
+
+
+@celery_setup_logging.connect
+def keep_logging_config(**kwargs: Any) -> None:
+    # Connected receivers stop Celery from replacing the root handlers with its own
+    pass
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs: Any) -> None:
+    """Expose the aggregated metrics of all pool processes for Prometheus."""
+    from prometheus_client import CollectorRegistry, multiprocess, start_http_server
+
+    port = int(os.getenv("CELERY_METRICS_PORT", "9540"))
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    try:
+        start_http_server(port, registry=registry)
+        logging.info(f"✅ Celery metrics exported on :{port}/metrics")
+    except OSError as e:
+        # Several workers on one host: only the first one binds the port
+        logging.warning(f"⚠️ Celery metrics server not started on :{port}: {e}")
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid: Optional[int] = None, **kwargs: Any) -> None:
+    from app.services.metrics_service import mark_process_dead
+    mark_process_dead(pid or os.getpid())
+
+
+@worker_process_shutdown.connect
+def flush_firestore_writes(**kwargs: Any) -> None:
+    from app.services.persistence_service import write_behind
+    write_behind.flush()
+
+
+@worker_process_shutdown.connect
+def flush_queued_logs(**kwargs: Any) -> None:
+    from app.core.logging_config import flush_logging
+    flush_logging()
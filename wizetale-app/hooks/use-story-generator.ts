@@ -6,6 +6,7 @@ import { trackEvent, trackConversion, trackFunnelStep } from '@/lib/analytics'
 import { useToast } from './use-toast';
 
 const API_URL = '/api/v1';
+const POLL_INTERVAL_MS = 2000;
 
 interface GenerateParams {
   subject: string
@@ -32,18 +33,29 @@ export const useStoryGenerator = () => {
   const { getToken } = useAuth()
 
   const pollTask = async (taskId: string): Promise<GenerationResult> => {
+    const headers: HeadersInit = {
+      'Content-Type': 'application/json',
+      'X-API-KEY': process.env.NEXT_PUBLIC_API_KEY || ''
+    }
+    // Waits out a 429 (Retry-After, else doubling up to 30s) instead of giving up
+    const retryDelay = (res: Response, attempt: number) => {
+      const retryAfter = Number(res.headers.get('Retry-After'))
+      return retryAfter > 0 ? retryAfter * 1000 : Math.min(POLL_INTERVAL_MS * 2 ** attempt, 30000)
+    }
+    const fetchWithBackoff = async (url: string) => {
+      for (let attempt = 1; ; attempt++) {
+        const res = await fetch(url, { headers })
+        if (res.status !== 429) return res
+        await new Promise((wait) => setTimeout(wait, retryDelay(res, attempt)))
+      }
+    }
+
     return new Promise((resolve, reject) => {
-      const interval = setInterval(async () => {
+      const poll = async () => {
         try {
-          const headers: HeadersInit = { 
-            'Content-Type': 'application/json',
-            'X-API-KEY': process.env.NEXT_PUBLIC_API_KEY || ''
-          }
-
-          const res = await fetch(`${API_URL}/tasks/${taskId}`, { headers })
+          const res = await fetchWithBackoff(`${API_URL}/tasks/${taskId}`)
           if (!res.ok) {
             // Stop polling on server error
-            clearInterval(interval)
             return reject(new Error('Failed to get task status.'))
           }
 
@@ -52,35 +64,42 @@ export const useStoryGenerator = () => {
           setStatus(data.message || 'Processing...')
 
           if (data.status === 'SUCCESS') {
-            clearInterval(interval)
-            
-            let fullVideoUrl: string | undefined = data.result?.video_url;
-            // If API already returns an absolute path (starts with '/'), use it directly
+            // Status polls are compact; the script and image list live behind /result
+            const resultRes = await fetchWithBackoff(`${API_URL}/tasks/${taskId}/result`)
+            if (!resultRes.ok) {
+              return reject(new Error('Failed to get task result.'))
+            }
+            const result = await resultRes.json()
+
+            let fullVideoUrl: string | undefined = result.video_url;
+            // If API already returns an absolute path (starts with '/') or a storage URL, use it directly
             // Otherwise, prefix with API_URL + '/static/' to form the full URL
-            if (fullVideoUrl && !fullVideoUrl.startsWith('/')) {
+            if (fullVideoUrl && !fullVideoUrl.startsWith('/') && !/^https?:\/\//.test(fullVideoUrl)) {
               fullVideoUrl = `${API_URL}/static/${fullVideoUrl}`;
             }
 
             resolve({
               id: taskId,
               video_url: fullVideoUrl,
-              audio_url: data.result?.audio_url,
-              transcript: data.result?.script,
-              images_used: data.result?.images_used || [],
+              audio_url: result.audio_url,
+              transcript: result.script,
+              images_used: result.images_used || [],
             })
 
           } else if (data.status === 'FAILURE') {
-            clearInterval(interval)
             const errorMessage = data.error || data.info || 'Video generation failed.'
             reject(new Error(errorMessage))
+          } else {
+            // The next poll is scheduled after this one finished, so slow replies never overlap
+            setTimeout(poll, POLL_INTERVAL_MS)
           }
         } catch (e: any) {
-          clearInterval(interval)
           console.error('Polling error:', e)
           const errorMessage = e.message || (typeof e === 'string' ? e : 'An unexpected error occurred while polling.')
           reject(new Error(errorMessage))
         }
-      }, 2000)
+      }
+      setTimeout(poll, POLL_INTERVAL_MS)
     })
   }
 